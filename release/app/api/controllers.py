@@ -4,12 +4,20 @@ This module re-exports the refactored controllers that now live in dedicated
 packages. Keeping this shim allows existing imports to keep working while the
 application is gradually updated.
 """
-from app.controllers import LogController, SystemInfoController, WebhookController
+from app.controllers import (
+    LogController, StatsController, StatsQueryError, SystemInfoController, WebhookBatchError, WebhookController,
+    WebhookQueryError, parse_batch_body
+)
 from app.streaming import StreamController
 
 __all__ = [
     "LogController",
+    "StatsController",
+    "StatsQueryError",
     "SystemInfoController",
+    "WebhookBatchError",
     "WebhookController",
+    "WebhookQueryError",
+    "parse_batch_body",
     "StreamController",
 ]
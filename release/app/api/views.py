@@ -2,32 +2,123 @@
 视图模块
 路由映射：定义URL与处理函数的关联
 """
-from flask import Blueprint, jsonify, send_from_directory, request , redirect
-from app.api.controllers import LogController, WebhookController, StreamController, SystemInfoController
+from flask import Blueprint, Response, jsonify, send_file, send_from_directory, request , redirect, stream_with_context
+from app.api.controllers import (
+    LogController, StatsController, StatsQueryError, WebhookBatchError, WebhookController, WebhookQueryError,
+    StreamController, SystemInfoController, parse_batch_body
+)
+from app.infrastructure.ingestion import DayRolloverJob, LogIngestionService
+from app.infrastructure.maintenance import MaintenanceScheduler
+from app.infrastructure.system_sampler import SystemMetricsSampler
 import os
+from typing import Any, Mapping, Optional
 
 # 创建蓝图
 api_bp = Blueprint('api', __name__)
 
+# 截图按内容哈希命名，内容不会变化，浏览器可以长期缓存
+SCREENSHOT_CACHE_SECONDS = 365 * 24 * 3600
+
 # 全局控制器实例（将在应用启动时初始化）
 log_controller = None
 webhook_controller = None
+stats_controller = None
 stream_controller = None
+system_info_controller = None
+ingestion_service = None
+rollover_job = None
+maintenance_job = None
 
 
-def init_controllers(log_dir: str):
+def init_controllers(log_dir: str, settings: Optional[Mapping[str, Any]] = None):
     """
     初始化控制器
     
     Args:
         log_dir: 日志目录路径
+        settings: 应用配置（通常为app.config），未提供时使用默认值
     """
-    global log_controller, webhook_controller, stream_controller
-    log_controller = LogController(log_dir)
-    webhook_controller = WebhookController(log_dir)
+    global log_controller, webhook_controller, stats_controller, stream_controller, system_info_controller
+    settings = settings or {}
+    log_controller = LogController(log_dir, manager_options={
+        'backfill_workers': settings.get('BACKFILL_WORKERS', 0),
+    }, freshness_window=settings.get('LOG_CACHE_TTL', 2.0))
+    webhook_controller = WebhookController(
+        log_dir,
+        writer_options={
+            'max_batch_size': settings.get('WEBHOOK_BATCH_SIZE', 100),
+            'max_delay': settings.get('WEBHOOK_BATCH_DELAY', 0.05),
+            'queue_size': settings.get('WEBHOOK_QUEUE_SIZE', 1000),
+        },
+        stream_queue_size=settings.get('WEBHOOK_STREAM_QUEUE_SIZE', 100),
+        heartbeat_interval=settings.get('WEBHOOK_STREAM_HEARTBEAT', 15.0),
+        thumbnail_width=settings.get('SCREENSHOT_THUMBNAIL_WIDTH', 320),
+        idempotency_cache_size=settings.get('WEBHOOK_IDEMPOTENCY_CACHE_SIZE', 10000),
+    )
+    stats_controller = StatsController(log_dir)
+    system_info_controller = SystemInfoController(sampler=SystemMetricsSampler(
+        interval=settings.get('SYSTEM_SAMPLE_INTERVAL', 1.0),
+        capacity=settings.get('SYSTEM_HISTORY_SIZE', 600),
+    ))
     # stream_controller将在首次请求时动态创建
 
 
+def start_background_services(settings: Optional[Mapping[str, Any]] = None):
+    """
+    启动后台服务，需要在init_controllers之后调用
+    
+    Args:
+        settings: 应用配置（通常为app.config），未提供时使用默认值
+    """
+    global ingestion_service, rollover_job, maintenance_job
+    settings = settings or {}
+    # 系统指标改为后台采样，/api/systemdetail 直接读取最近一次结果
+    if system_info_controller is not None:
+        system_info_controller.sampler.start()
+    if log_controller is None:
+        return
+    poll_interval = float(settings.get('LOG_POLL_INTERVAL', 10))
+    if poll_interval > 0 and ingestion_service is None:
+        ingestion_service = LogIngestionService(log_controller.log_manager, poll_interval)
+        ingestion_service.start()
+    # 每天零点后定稿前一天的日志
+    if rollover_job is None:
+        rollover_job = DayRolloverJob(log_controller.log_manager)
+        rollover_job.start()
+    # webhook数据改为后台批量写入
+    if webhook_controller is not None:
+        webhook_controller.start_writer()
+        # 定期清理过期的webhook数据
+        if maintenance_job is None:
+            maintenance_job = MaintenanceScheduler(
+                webhook_controller.db_manager,
+                interval=settings.get('MAINTENANCE_INTERVAL', 3600),
+                retention_days=settings.get('WEBHOOK_RETENTION_DAYS', 3),
+                screenshot_store=webhook_controller.screenshots,
+            )
+            maintenance_job.start()
+
+
+def stop_background_services():
+    """
+    停止所有后台服务
+    """
+    global ingestion_service, rollover_job, maintenance_job
+    if ingestion_service is not None:
+        ingestion_service.stop()
+        ingestion_service = None
+    if rollover_job is not None:
+        rollover_job.stop()
+        rollover_job = None
+    if maintenance_job is not None:
+        maintenance_job.stop()
+        maintenance_job = None
+    if webhook_controller is not None:
+        webhook_controller.stop_writer()
+    if system_info_controller is not None:
+        system_info_controller.sampler.stop()
+
+
 
 @api_bp.route('/')
 def serve_index():
@@ -106,6 +197,8 @@ def get_log_list_api():
 def analyse_log():
     """
     提供日志分析的API接口，默认返回所有的数据，分析交给前端进行。
+    支持查询参数?format=columnar，物品数据改为字典编码的列式格式：
+    物品名称和配置组为字符串表加整数编码，时间为与上一条相差的毫秒数（首条相对零点），日期为 [日期, 连续条数] 列表
 
     Returns:
         Response: 包含日志分析结果的JSON响应，例如：{
@@ -116,14 +209,107 @@ def analyse_log():
     if not log_controller:
         return jsonify({'error': '控制器未初始化'}), 500
     
-    result = log_controller.get_log_data()
+    columnar = request.args.get('format') == 'columnar'
+    result = log_controller.get_log_data(columnar=columnar)
     return jsonify(result)
 
 
+def _stats_response(method_name: str):
+    """
+    执行统计查询并统一处理错误
+
+    Args:
+        method_name: StatsController的查询方法名
+
+    Returns:
+        Response: JSON响应，参数错误返回400，查询失败返回500
+    """
+    if not stats_controller:
+        return jsonify({'error': '控制器未初始化'}), 500
+    try:
+        return jsonify(getattr(stats_controller, method_name)(request.args))
+    except StatsQueryError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        return jsonify({'error': f'统计查询时发生错误: {str(e)}'}), 500
+
+
+@api_bp.route('/api/stats/items', methods=['GET'])
+def stats_item_counts():
+    """
+    按日期、物品名称或配置组统计物品数量，由数据库分组计算并分页返回
+
+    查询参数：group_by（date/item/config_group），start、end（YYYYMMDD），item，config_group，
+    order（count/key），page，page_size
+
+    Returns:
+        Response: JSON响应，例如：{'group_by': 'item', 'page': 1, 'page_size': 50, 'total': 120,
+                                   'rows': [{'key': '摩拉', 'count': 300}, ...]}
+    """
+    return _stats_response('get_item_counts')
+
+
+@api_bp.route('/api/stats/top-items', methods=['GET'])
+def stats_top_items():
+    """
+    拾取数量最多的前K个物品
+
+    查询参数：k，start、end（YYYYMMDD），config_group
+
+    Returns:
+        Response: JSON响应，例如：{'k': 10, 'total': 120, 'rows': [{'key': '摩拉', 'count': 300}, ...]}
+    """
+    return _stats_response('get_top_items')
+
+
+@api_bp.route('/api/stats/daily', methods=['GET'])
+def stats_daily_totals():
+    """
+    每天的拾取总数、物品种类数和持续时间，按日期降序分页返回
+
+    查询参数：start、end（YYYYMMDD），page，page_size
+
+    Returns:
+        Response: JSON响应，例如：{'page': 1, 'page_size': 50, 'total': 30,
+                                   'rows': [{'date': '20250101', 'item_count': 500, 'distinct_items': 20, 'duration': 3600}, ...]}
+    """
+    return _stats_response('get_daily_totals')
+
+
+@api_bp.route('/api/stats/periods', methods=['GET'])
+def stats_period_totals():
+    """
+    每周或每月的拾取总数和持续时间，来自入库时维护的汇总表
+
+    查询参数：period（week/month），start、end（YYYYMMDD），page，page_size
+
+    Returns:
+        Response: JSON响应，例如：{'period': 'month', 'page': 1, 'page_size': 50, 'total': 6,
+                                   'rows': [{'period': '202501', 'start_date': '20250101', 'end_date': '20250131',
+                                             'item_count': 5000, 'duration': 36000, 'day_count': 20}, ...]}
+    """
+    return _stats_response('get_period_totals')
+
+
+@api_bp.route('/api/LogCacheStats', methods=['GET'])
+def log_cache_stats():
+    """
+    日志接口请求合并的统计信息
+
+    Returns:
+        Response: JSON响应，例如：{'hits': 10, 'coalesced': 3, 'misses': 2, 'in_flight': 0, 'freshness_window': 2.0}
+    """
+    if not log_controller:
+        return jsonify({'error': '控制器未初始化'}), 500
+
+    return jsonify(log_controller.get_cache_stats())
+
+
 @api_bp.route('/webhook', methods=['POST'])
 def webhook():
     """
     Webhook接口，接收POST请求并保存数据
+    可以通过 Idempotency-Key 请求头指定幂等键，重复投递的数据不会重复保存
     
     Returns:
         Response: 包含操作结果的JSON响应，例如：{
@@ -141,12 +327,14 @@ def webhook():
         if not data:
             return jsonify({'success': False, 'message': '请求数据为空'}), 400
         
-        # 调用控制器保存数据
-        result = webhook_controller.save_data(data)
+        # 调用控制器保存数据，重复投递的数据通过幂等键识别
+        result = webhook_controller.save_data(data, request.headers.get('Idempotency-Key'))
         
-        # 根据结果返回相应的HTTP状态码
+        # 根据结果返回相应的HTTP状态码，写入队列已满时返回503提示稍后重试
         if result['success']:
             return jsonify(result), 200
+        elif result.get('busy'):
+            return jsonify(result), 503, {'Retry-After': '1'}
         else:
             return jsonify(result), 400
             
@@ -252,10 +440,167 @@ def stop_stream():
         }), 500
 
 
+@api_bp.route('/webhook/batch', methods=['POST'])
+def webhook_batch():
+    """
+    批量Webhook接口，一次请求提交多条数据
+    请求体为JSON数组，或每行一条JSON的NDJSON；所有合法数据在一个事务中写入
+    
+    Returns:
+        Response: 包含每条数据结果的JSON响应，例如：{
+            'success': False,
+            'saved': 1,
+            'failed': 1,
+            'results': [{'index': 0, 'success': True, 'id': 12},
+                        {'index': 1, 'success': False, 'message': '缺少必需的event字段'}]
+        }
+    """
+    if not webhook_controller:
+        return jsonify({'success': False, 'message': 'Webhook控制器未初始化'}), 500
+    
+    try:
+        payloads = parse_batch_body(request.get_data(as_text=True))
+    except WebhookBatchError as e:
+        return jsonify({'success': False, 'message': str(e)}), 400
+    
+    try:
+        result = webhook_controller.save_batch(payloads)
+        # 部分数据不合法时仍返回200，由调用方根据每条数据的结果处理
+        return jsonify(result), 200 if result['saved'] or result['duplicates'] or not result['failed'] else 400
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'message': f'处理请求时发生错误: {str(e)}'
+        }), 500
+
+
+@api_bp.route('/api/webhook-stream', methods=['GET'])
+def webhook_stream():
+    """
+    webhook事件推送接口（Server-Sent Events）
+    新的webhook数据写入数据库后立即推送给所有连接的客户端，
+    断线重连时浏览器会带上 Last-Event-ID，从数据库补发错过的数据
+    
+    Returns:
+        Response: text/event-stream 响应
+    """
+    if not webhook_controller:
+        return jsonify({'success': False, 'message': 'Webhook控制器未初始化'}), 500
+    
+    # 也支持通过查询参数指定起点，便于不支持自定义请求头的客户端
+    last_event_id = request.headers.get('Last-Event-ID') or request.args.get('last_id')
+    return Response(
+        stream_with_context(webhook_controller.stream_events(last_event_id)),
+        mimetype='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'},
+    )
+
+
+def _send_screenshot(found):
+    """
+    返回截图文件，附带长期缓存的响应头
+    
+    Args:
+        found: (文件路径, MIME类型)，为None时返回404
+    """
+    if not found:
+        return jsonify({'error': '截图不存在'}), 404
+    path, mimetype = found
+    response = send_file(path, mimetype=mimetype, max_age=SCREENSHOT_CACHE_SECONDS)
+    response.cache_control.public = True
+    response.cache_control.immutable = True
+    return response
+
+
+@api_bp.route('/api/screenshots/<content_hash>', methods=['GET'])
+def get_screenshot(content_hash):
+    """
+    获取webhook截图原图
+    
+    Args:
+        content_hash: 截图内容的SHA-256哈希
+    
+    Returns:
+        Response: 图片文件响应，不存在时返回404
+    """
+    if not webhook_controller:
+        return jsonify({'error': '控制器未初始化'}), 500
+    return _send_screenshot(webhook_controller.get_screenshot(content_hash))
+
+
+@api_bp.route('/api/screenshots/<content_hash>/thumbnail', methods=['GET'])
+def get_screenshot_thumbnail(content_hash):
+    """
+    获取webhook截图缩略图
+    
+    Args:
+        content_hash: 截图内容的SHA-256哈希
+    
+    Returns:
+        Response: JPEG缩略图响应，不存在时返回404
+    """
+    if not webhook_controller:
+        return jsonify({'error': '控制器未初始化'}), 500
+    return _send_screenshot(webhook_controller.get_screenshot(content_hash, thumbnail=True))
+
+
+@api_bp.route('/image/<int:webhook_id>', methods=['GET'])
+def get_event_image(webhook_id):
+    """
+    获取指定webhook记录的截图缩略图（面板中事件列表使用）
+    
+    Args:
+        webhook_id: webhook记录id
+    
+    Returns:
+        Response: JPEG缩略图响应，不存在时返回404
+    """
+    if not webhook_controller:
+        return jsonify({'error': '控制器未初始化'}), 500
+    return _send_screenshot(webhook_controller.get_event_screenshot(webhook_id))
+
+
+@api_bp.route('/api/webhook-stats', methods=['GET'])
+def webhook_stats():
+    """
+    webhook事件统计的API接口，按小时或按天统计每种 (事件, 结果) 的数量
+    支持 since/until（UTC）、bucket（hour/day）、event、result 查询参数
+    
+    Returns:
+        Response: JSON响应，例如：{'success': True, 'bucket': 'hour', 'total': 3,
+                  'rows': [{'bucket': '2025-01-01 10:00:00', 'event': 'task', 'result': 'error', 'count': 3}]}，
+                  参数错误返回400
+    """
+    if not webhook_controller:
+        return jsonify({'success': False, 'message': 'Webhook控制器未初始化'}), 500
+    
+    try:
+        return jsonify(webhook_controller.get_webhook_stats(request.args))
+    except WebhookQueryError as e:
+        return jsonify({'success': False, 'message': str(e)}), 400
+    except Exception as e:
+        return jsonify({'success': False, 'message': f'获取统计数据时发生错误: {str(e)}'}), 500
+
+
+@api_bp.route('/api/webhook-writer-stats', methods=['GET'])
+def webhook_writer_stats():
+    """
+    获取webhook批量写入统计的API接口
+    
+    Returns:
+        Response: 包含已写入条数、重复条数、批次数、失败条数、被拒绝条数和队列长度的JSON响应
+    """
+    if not webhook_controller:
+        return jsonify({'error': '控制器未初始化'}), 500
+    return jsonify(webhook_controller.get_writer_stats())
+
+
 @api_bp.route('/api/webhook-data', methods=['GET'])
 def get_webhook_data():
     """
     获取webhook数据列表的API接口
+    支持按id游标分页（before_id/after_id）、按 event/result/since/until 过滤，
+    以及只返回数量的 count_only 模式
     
     Returns:
         Response: 包含webhook数据列表的JSON响应
@@ -264,13 +609,12 @@ def get_webhook_data():
         return jsonify({'success': False, 'message': 'Webhook控制器未初始化'}), 500
     
     try:
-        # 获取查询参数
-        limit = request.args.get('limit', 100, type=int)
-        
-        # 调用控制器获取数据
-        result = webhook_controller.get_webhook_data(limit)
+        # 调用控制器按查询参数获取数据
+        result = webhook_controller.query_webhook_data(request.args)
         return jsonify(result)
         
+    except WebhookQueryError as e:
+        return jsonify({'success': False, 'message': str(e), 'data': [], 'count': 0}), 400
     except Exception as e:
         return jsonify({
             'success': False,
@@ -326,14 +670,21 @@ def get_program_list():
 def get_system_detail():
     """
     获取系统详细信息的API接口
+    返回后台采样器最近一次的采样结果，不再阻塞等待CPU采样
+    
+    查询参数:
+        history: 同时返回最近N个采样点（列式，按时间从旧到新），默认不返回
     
     Returns:
         Response: 包含系统详细信息的JSON响应
     """
     try:
-        # 创建临时的StreamController实例来获取系统信息
-        temp_controller = SystemInfoController()
-        system_info = temp_controller.get_system_info()
+        # 控制器未初始化时退回到临时实例（非阻塞读取）
+        controller = system_info_controller or SystemInfoController()
+        system_info = controller.get_system_info()
+        history = request.args.get('history', 0, type=int)
+        if history > 0:
+            system_info['history'] = controller.get_history(history)
         
         return jsonify({
             'success': True,
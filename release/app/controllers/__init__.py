@@ -1,10 +1,16 @@
 """Controller facade exports."""
 from .logs import LogController
+from .stats import StatsController, StatsQueryError
 from .system_info import SystemInfoController
-from .webhooks import WebhookController
+from .webhooks import WebhookBatchError, WebhookController, WebhookQueryError, parse_batch_body
 
 __all__ = [
     "LogController",
+    "StatsController",
+    "StatsQueryError",
     "SystemInfoController",
+    "WebhookBatchError",
     "WebhookController",
+    "WebhookQueryError",
+    "parse_batch_body",
 ]
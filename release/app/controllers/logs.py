@@ -6,12 +6,20 @@ while keeping helper utilities local to improve cohesion and testability.
 from __future__ import annotations
 
 import logging
-from typing import Any, Dict, Iterable, List, Optional, Protocol
+import threading
+import time
+from typing import Any, Callable, Dict, Iterable, List, Optional, Protocol, Tuple, TypeVar
 
 from app.infrastructure.manager import LogDataManager
+from app.infrastructure.utils import parse_timestamp_to_seconds
 
 logger = logging.getLogger(__name__)
 
+T = TypeVar("T")
+
+# Default number of seconds a computed response may be reused for.
+DEFAULT_FRESHNESS_WINDOW = 2.0
+
 
 class SupportsLogData(Protocol):
     """Protocol describing the minimal ``LogDataManager`` API we rely on."""
@@ -27,6 +35,9 @@ class SupportsLogData(Protocol):
     def get_item_data(self) -> Dict[str, Iterable[Any]]:
         ...
 
+    def get_snapshot(self) -> Any:
+        ...
+
 
 def _reverse(items: Iterable[str]) -> List[str]:
     """Return a new reversed list without mutating the original iterable."""
@@ -34,6 +45,156 @@ def _reverse(items: Iterable[str]) -> List[str]:
     return list(reversed(list(items)))
 
 
+def _timestamp_to_ms(timestamp: str) -> int:
+    """Convert ``HH:MM:SS.fff`` to milliseconds since midnight (0 if malformed)."""
+
+    try:
+        return int(round(parse_timestamp_to_seconds(timestamp) * 1000))
+    except (ValueError, IndexError):
+        return 0
+
+
+def encode_columnar_items(item_data: Dict[str, Iterable[Any]]) -> Dict[str, Any]:
+    """Dictionary-encode the parallel item columns in a single pass.
+
+    Item names and config groups become a string table plus integer codes,
+    times become millisecond offsets from the previous row (the first row is
+    relative to midnight; a running sum restores the time of day) and dates
+    become ``[date, run_length]`` pairs, since rows of the same day are
+    contiguous.
+    """
+
+    names: Dict[str, int] = {}
+    groups: Dict[str, int] = {}
+    name_codes: List[int] = []
+    group_codes: List[int] = []
+    time_offsets: List[int] = []
+    date_runs: List[List[Any]] = []
+    previous_ms = 0
+
+    for name, timestamp, date_str, group in zip(
+        item_data["物品名称"], item_data["时间"], item_data["日期"], item_data["归属配置组"]
+    ):
+        code = names.get(name)
+        if code is None:
+            code = names[name] = len(names)
+        name_codes.append(code)
+
+        code = groups.get(group)
+        if code is None:
+            code = groups[group] = len(groups)
+        group_codes.append(code)
+
+        current_ms = _timestamp_to_ms(timestamp)
+        time_offsets.append(current_ms - previous_ms)
+        previous_ms = current_ms
+
+        if date_runs and date_runs[-1][0] == date_str:
+            date_runs[-1][1] += 1
+        else:
+            date_runs.append([date_str, 1])
+
+    return {
+        "format": "columnar",
+        "count": len(name_codes),
+        "物品名称": {"values": list(names), "codes": name_codes},
+        "时间": time_offsets,
+        "日期": date_runs,
+        "归属配置组": {"values": list(groups), "codes": group_codes},
+    }
+
+
+class _Flight:
+    """A single in-flight computation that followers can wait on."""
+
+    __slots__ = ("done", "result", "error")
+
+    def __init__(self) -> None:
+        self.done = threading.Event()
+        self.result: Any = None
+        self.error: Optional[BaseException] = None
+
+
+class SingleFlight:
+    """Coalesce concurrent identical calls into one computation.
+
+    The first caller for a key runs the computation; callers arriving while it
+    is running wait for it and share its result. A successful result is reused
+    for ``freshness_window`` seconds. Counters record cache hits, coalesced
+    waits and misses (actual computations).
+    """
+
+    def __init__(
+        self,
+        freshness_window: float = DEFAULT_FRESHNESS_WINDOW,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self.freshness_window = max(0.0, float(freshness_window))
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._flights: Dict[str, _Flight] = {}
+        self._results: Dict[str, Tuple[float, Any]] = {}
+        self.hits = 0
+        self.coalesced = 0
+        self.misses = 0
+
+    def do(self, key: str, compute: Callable[[], T]) -> T:
+        """Return ``compute()`` for ``key``, sharing concurrent and recent calls."""
+
+        with self._lock:
+            cached = self._results.get(key)
+            if cached is not None and self._clock() - cached[0] < self.freshness_window:
+                self.hits += 1
+                return cached[1]
+            flight = self._flights.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._flights[key] = _Flight()
+                self.misses += 1
+            else:
+                self.coalesced += 1
+
+        if not leader:
+            flight.done.wait()
+            if flight.error is not None:
+                raise flight.error
+            return flight.result
+
+        try:
+            flight.result = compute()
+        except BaseException as exc:
+            flight.error = exc
+            raise
+        finally:
+            with self._lock:
+                self._flights.pop(key, None)
+                if flight.error is None:
+                    self._results[key] = (self._clock(), flight.result)
+            flight.done.set()
+        return flight.result
+
+    def invalidate(self, key: Optional[str] = None) -> None:
+        """Drop the cached result for ``key`` (or for every key)."""
+
+        with self._lock:
+            if key is None:
+                self._results.clear()
+            else:
+                self._results.pop(key, None)
+
+    def stats(self) -> Dict[str, Any]:
+        """Return a snapshot of the counters."""
+
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "coalesced": self.coalesced,
+                "misses": self.misses,
+                "in_flight": len(self._flights),
+                "freshness_window": self.freshness_window,
+            }
+
+
 class LogController:
     """Coordinates log related queries for the API layer."""
 
@@ -42,26 +203,32 @@ class LogController:
         log_dir: str,
         manager: Optional[SupportsLogData] = None,
         manager_factory: type[LogDataManager] = LogDataManager,
+        manager_options: Optional[Dict[str, Any]] = None,
+        freshness_window: float = DEFAULT_FRESHNESS_WINDOW,
     ) -> None:
-        self.log_manager: SupportsLogData = manager or manager_factory(log_dir)
+        self.log_manager: SupportsLogData = manager or manager_factory(log_dir, **(manager_options or {}))
+        self.single_flight = SingleFlight(freshness_window)
 
     def get_log_list(self) -> Dict[str, List[str]]:
         """Return a DTO containing the available log identifiers."""
 
         try:
-            log_list = self.log_manager.log_list or self.log_manager.get_log_list()
-            return {"list": _reverse(log_list)}
+            return self.single_flight.do("LogList", self._load_log_list)
         except Exception as exc:  # pragma: no cover - defensive logging
             logger.error("获取日志列表时发生错误: %s", exc)
             return {"list": []}
 
-    def get_log_data(self) -> Dict[str, Any]:
-        """Return aggregated duration and item information for the UI."""
+    def get_log_data(self, columnar: bool = False) -> Dict[str, Any]:
+        """Return aggregated duration and item information for the UI.
+
+        With ``columnar=True`` the item data is dictionary-encoded by
+        :func:`encode_columnar_items`.
+        """
 
         try:
-            duration_data = dict(self.log_manager.get_duration_data())
-            item_data = dict(self.log_manager.get_item_data())
-            return {"duration": duration_data, "item": item_data}
+            if columnar:
+                return self.single_flight.do("LogData:columnar", self._load_columnar_log_data)
+            return self.single_flight.do("LogData", self._load_log_data)
         except Exception as exc:  # pragma: no cover - defensive logging
             logger.error("获取日志数据时发生错误: %s", exc)
             return {
@@ -73,3 +240,21 @@ class LogController:
                     "归属配置组": [],
                 },
             }
+
+    def get_cache_stats(self) -> Dict[str, Any]:
+        """Return the single-flight counters for the log endpoints."""
+
+        return self.single_flight.stats()
+
+    def _load_log_list(self) -> Dict[str, List[str]]:
+        log_list = self.log_manager.log_list or self.log_manager.get_log_list()
+        return {"list": _reverse(log_list)}
+
+    def _load_log_data(self) -> Dict[str, Any]:
+        # Both views come from the same refresh, so the data is loaded once
+        snapshot = self.log_manager.get_snapshot()
+        return {"duration": dict(snapshot.duration_data), "item": dict(snapshot.item_data)}
+
+    def _load_columnar_log_data(self) -> Dict[str, Any]:
+        snapshot = self.log_manager.get_snapshot()
+        return {"duration": dict(snapshot.duration_data), "item": encode_columnar_items(snapshot.item_data)}
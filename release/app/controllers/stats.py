@@ -0,0 +1,163 @@
+"""Statistics controller module.
+
+Aggregations are computed by SQLite ``GROUP BY`` queries over the rollup
+tables maintained at ingest time, so the size of a response depends on the
+requested page rather than on the whole history.
+"""
+from __future__ import annotations
+
+import logging
+import os
+import re
+from typing import Any, Dict, Mapping, Optional, Protocol
+
+from app.infrastructure.database import DatabaseManager
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 500
+DEFAULT_TOP_K = 10
+
+_DATE_PATTERN = re.compile(r"^\d{8}$")
+
+
+class SupportsItemAggregation(Protocol):
+    """Protocol describing the storage dependency used by ``StatsController``."""
+
+    def aggregate_items(self, group_by: str, **filters: Any) -> Optional[Dict[str, Any]]:
+        ...
+
+    def get_daily_totals(self, **filters: Any) -> Optional[Dict[str, Any]]:
+        ...
+
+    def get_period_totals(self, period_type: str, **filters: Any) -> Optional[Dict[str, Any]]:
+        ...
+
+
+class StatsQueryError(ValueError):
+    """Raised when query parameters are invalid."""
+
+
+def _parse_date(args: Mapping[str, str], name: str) -> Optional[str]:
+    value = (args.get(name) or "").strip()
+    if not value:
+        return None
+    if not _DATE_PATTERN.match(value):
+        raise StatsQueryError(f"{name} 参数格式错误，应为YYYYMMDD")
+    return value
+
+
+def _parse_int(args: Mapping[str, str], name: str, default: int, minimum: int, maximum: int) -> int:
+    value = args.get(name)
+    if value in (None, ""):
+        return default
+    try:
+        number = int(value)
+    except (TypeError, ValueError):
+        raise StatsQueryError(f"{name} 参数必须是整数") from None
+    if number < minimum:
+        raise StatsQueryError(f"{name} 参数不能小于{minimum}")
+    return min(number, maximum)
+
+
+def _parse_page(args: Mapping[str, str]) -> tuple[int, int]:
+    page = _parse_int(args, "page", 1, 1, 1_000_000)
+    page_size = _parse_int(args, "page_size", DEFAULT_PAGE_SIZE, 1, MAX_PAGE_SIZE)
+    return page, page_size
+
+
+def _page_result(result: Optional[Dict[str, Any]], page: int, page_size: int) -> Dict[str, Any]:
+    if result is None:
+        raise RuntimeError("数据库查询失败")
+    return {
+        "page": page,
+        "page_size": page_size,
+        "total": result["total"],
+        "rows": result["rows"],
+    }
+
+
+class StatsController:
+    """Serve paginated aggregate views over the stored pickup history."""
+
+    def __init__(
+        self,
+        log_dir: str,
+        db_manager: Optional[SupportsItemAggregation] = None,
+        db_manager_factory: type[DatabaseManager] = DatabaseManager,
+    ) -> None:
+        db_path = os.path.join(log_dir, "CanLiangData.db")
+        self.db_manager: SupportsItemAggregation = db_manager or db_manager_factory(db_path)
+
+    def get_item_counts(self, args: Mapping[str, str]) -> Dict[str, Any]:
+        """Return item counts grouped by ``date``, ``item`` or ``config_group``.
+
+        Supported query parameters: ``group_by``, ``start``, ``end``, ``item``,
+        ``config_group``, ``order`` (``count``/``key``), ``page`` and ``page_size``.
+        """
+
+        group_by = args.get("group_by", "date")
+        if group_by not in DatabaseManager.ITEM_GROUP_COLUMNS:
+            raise StatsQueryError("group_by 参数只能是 date、item 或 config_group")
+        order_by = args.get("order", "key" if group_by == "date" else "count")
+        if order_by not in ("count", "key"):
+            raise StatsQueryError("order 参数只能是 count 或 key")
+        page, page_size = _parse_page(args)
+
+        result = self.db_manager.aggregate_items(
+            group_by,
+            start_date=_parse_date(args, "start"),
+            end_date=_parse_date(args, "end"),
+            item_name=args.get("item"),
+            config_group=args.get("config_group"),
+            order_by=order_by,
+            limit=page_size,
+            offset=(page - 1) * page_size,
+        )
+        return {"group_by": group_by, **_page_result(result, page, page_size)}
+
+    def get_top_items(self, args: Mapping[str, str]) -> Dict[str, Any]:
+        """Return the ``k`` most picked-up items in the optional date range / config group."""
+
+        k = _parse_int(args, "k", DEFAULT_TOP_K, 1, MAX_PAGE_SIZE)
+        result = self.db_manager.aggregate_items(
+            "item",
+            start_date=_parse_date(args, "start"),
+            end_date=_parse_date(args, "end"),
+            config_group=args.get("config_group"),
+            order_by="count",
+            limit=k,
+            offset=0,
+        )
+        if result is None:
+            raise RuntimeError("数据库查询失败")
+        return {"k": k, "total": result["total"], "rows": result["rows"]}
+
+    def get_daily_totals(self, args: Mapping[str, str]) -> Dict[str, Any]:
+        """Return per-day pickup totals and durations, newest first."""
+
+        page, page_size = _parse_page(args)
+        result = self.db_manager.get_daily_totals(
+            start_date=_parse_date(args, "start"),
+            end_date=_parse_date(args, "end"),
+            limit=page_size,
+            offset=(page - 1) * page_size,
+        )
+        return _page_result(result, page, page_size)
+
+    def get_period_totals(self, args: Mapping[str, str]) -> Dict[str, Any]:
+        """Return weekly or monthly totals (``period=week|month``), newest first."""
+
+        period = args.get("period", "month")
+        if period not in ("week", "month"):
+            raise StatsQueryError("period 参数只能是 week 或 month")
+        page, page_size = _parse_page(args)
+        result = self.db_manager.get_period_totals(
+            period,
+            start_date=_parse_date(args, "start"),
+            end_date=_parse_date(args, "end"),
+            limit=page_size,
+            offset=(page - 1) * page_size,
+        )
+        return {"period": period, **_page_result(result, page, page_size)}
@@ -2,7 +2,7 @@
 from __future__ import annotations
 
 import logging
-from typing import Dict, Protocol
+from typing import Any, Dict, List, Optional, Protocol
 
 import psutil
 
@@ -15,15 +15,30 @@ class SystemMetrics(Protocol):
     def virtual_memory(self):  # pragma: no cover - protocol definition
         ...
 
-    def cpu_percent(self, interval: float = 1.0) -> float:  # pragma: no cover - protocol definition
+    def cpu_percent(self, interval: Optional[float] = 1.0) -> float:  # pragma: no cover - protocol definition
+        ...
+
+
+class SupportsMetricsHistory(Protocol):
+    """Protocol describing the background sampler used by ``SystemInfoController``."""
+
+    def latest(self) -> Optional[Dict[str, float]]:  # pragma: no cover - protocol definition
+        ...
+
+    def history(self, limit: Optional[int] = None) -> Dict[str, List[float]]:  # pragma: no cover - protocol definition
         ...
 
 
 class SystemInfoController:
-    """Expose system metrics via dependency injection friendly methods."""
+    """Expose system metrics via dependency injection friendly methods.
+
+    When a sampler is provided the latest background sample is returned
+    without touching psutil; otherwise the CPU usage is read non-blocking.
+    """
 
-    def __init__(self, metrics: SystemMetrics = psutil) -> None:
+    def __init__(self, metrics: SystemMetrics = psutil, sampler: Optional[SupportsMetricsHistory] = None) -> None:
         self._metrics = metrics
+        self.sampler = sampler
 
     def get_memory_usage(self) -> float:
         try:
@@ -33,7 +48,7 @@ class SystemInfoController:
             logger.error("获取内存使用率时发生错误: %s", exc)
             return 0.0
 
-    def get_cpu_usage(self, interval: float = 1.0) -> float:
+    def get_cpu_usage(self, interval: Optional[float] = None) -> float:
         try:
             cpu_percent = self._metrics.cpu_percent(interval=interval)
             return round(float(cpu_percent), 1)
@@ -43,6 +58,14 @@ class SystemInfoController:
 
     def get_system_info(self) -> Dict[str, float]:
         try:
+            if self.sampler is not None:
+                latest = self.sampler.latest()
+                if latest is not None:
+                    return {
+                        "memory_usage": latest["memory_usage"],
+                        "cpu_usage": latest["cpu_usage"],
+                        "timestamp": latest["timestamp"],
+                    }
             return {
                 "memory_usage": self.get_memory_usage(),
                 "cpu_usage": self.get_cpu_usage(),
@@ -50,3 +73,10 @@ class SystemInfoController:
         except Exception as exc:  # pragma: no cover - defensive logging
             logger.error("获取系统信息时发生错误: %s", exc)
             return {"memory_usage": 0.0, "cpu_usage": 0.0}
+
+    def get_history(self, limit: int) -> Dict[str, List[Any]]:
+        """Return the most recent ``limit`` samples as parallel columns, oldest first."""
+
+        if self.sampler is None or limit <= 0:
+            return {"timestamp": [], "cpu_usage": [], "memory_usage": []}
+        return self.sampler.history(limit)
@@ -1,14 +1,35 @@
 """Webhook controller module."""
 from __future__ import annotations
 
+import json
 import logging
 import os
-from typing import Any, Dict, Optional, Protocol
+import re
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, Iterator, List, Mapping, Optional, Protocol
 
 from app.infrastructure.database import DatabaseManager
+from app.infrastructure.idempotency import (
+    DEFAULT_IDEMPOTENCY_CACHE_SIZE, IdempotencyCache, derive_idempotency_key, normalize_idempotency_key
+)
+from app.infrastructure.screenshot_store import DEFAULT_THUMBNAIL_WIDTH, ScreenshotStore, decode_base64_image
+from app.infrastructure.webhook_events import (
+    DEFAULT_SUBSCRIBER_QUEUE_SIZE, WebhookEventBroker, format_sse_event
+)
+from app.infrastructure.webhook_writer import WebhookWriter
 
 logger = logging.getLogger(__name__)
 
+DEFAULT_HISTORY_LIMIT = 100
+MAX_HISTORY_LIMIT = 1000
+DEFAULT_HEARTBEAT_INTERVAL = 15.0
+# Rows fetched per query when replaying missed events from the database
+STREAM_REPLAY_BATCH = 200
+MAX_BATCH_EVENTS = 5000
+DEFAULT_STATS_DAYS = 7
+
+_TIME_PATTERN = re.compile(r"^\d{4}-\d{2}-\d{2}([ T]\d{2}:\d{2}:\d{2})?$")
+
 
 class SupportsWebhookStorage(Protocol):
     """Protocol describing the storage dependency used by ``WebhookController``."""
@@ -16,9 +37,73 @@ class SupportsWebhookStorage(Protocol):
     def save_webhook_data(self, payload: Dict[str, Any]) -> bool:
         ...
 
+    def save_webhook_batch(self, payloads: list[Dict[str, Any]]) -> bool:
+        ...
+
+    def insert_webhook_batch(self, payloads: list[Dict[str, Any]]) -> Optional[list[Dict[str, Any]]]:
+        ...
+
     def get_webhook_data(self, limit: int) -> list[Dict[str, Any]]:
         ...
 
+    def query_webhook_data(self, **filters: Any) -> Optional[Dict[str, Any]]:
+        ...
+
+    def get_webhook_by_id(self, webhook_id: int) -> Optional[Dict[str, Any]]:
+        ...
+
+    def set_webhook_screenshot(self, webhook_id: int, content_hash: str, width: int, height: int) -> bool:
+        ...
+
+    def get_webhook_stats(self, start_time: str, end_time: str, **filters: Any) -> Optional[Dict[str, Any]]:
+        ...
+
+
+class WebhookQueryError(ValueError):
+    """Raised when webhook history query parameters are invalid."""
+
+
+class WebhookBatchError(ValueError):
+    """Raised when a batch request body cannot be used at all."""
+
+
+class _InvalidItem:
+    """Placeholder for a batch entry that could not be parsed."""
+
+    def __init__(self, message: str) -> None:
+        self.message = message
+
+
+def parse_batch_body(body: str) -> List[Any]:
+    """Parse a ``/webhook/batch`` body: a JSON array or NDJSON (one event per line).
+
+    Unparseable NDJSON lines become per-item errors instead of failing the
+    whole request; a malformed JSON array fails the request.
+    """
+
+    text = body.strip()
+    if not text:
+        raise WebhookBatchError("请求数据为空")
+    if text.startswith("["):
+        try:
+            items = json.loads(text)
+        except ValueError as exc:
+            raise WebhookBatchError(f"JSON数组格式错误: {exc}") from None
+    else:
+        items = []
+        for line in text.splitlines():
+            if not line.strip():
+                continue
+            try:
+                items.append(json.loads(line))
+            except ValueError as exc:
+                items.append(_InvalidItem(f"JSON格式错误: {exc}"))
+    if not items:
+        raise WebhookBatchError("请求数据为空")
+    if len(items) > MAX_BATCH_EVENTS:
+        raise WebhookBatchError(f"单次最多提交{MAX_BATCH_EVENTS}条数据")
+    return items
+
 
 def _validate_event_field(payload: Dict[str, Any]) -> Optional[str]:
     """Validate that the payload includes the ``event`` field."""
@@ -28,6 +113,28 @@ def _validate_event_field(payload: Dict[str, Any]) -> Optional[str]:
     return None
 
 
+def _parse_id(args: Mapping[str, str], name: str) -> Optional[int]:
+    value = args.get(name)
+    if value in (None, ""):
+        return None
+    try:
+        number = int(value)
+    except (TypeError, ValueError):
+        raise WebhookQueryError(f"{name} 参数必须是整数") from None
+    if number < 0:
+        raise WebhookQueryError(f"{name} 参数不能小于0")
+    return number
+
+
+def _parse_time(args: Mapping[str, str], name: str) -> Optional[str]:
+    value = (args.get(name) or "").strip()
+    if not value:
+        return None
+    if not _TIME_PATTERN.match(value):
+        raise WebhookQueryError(f"{name} 参数格式错误，应为YYYY-MM-DD或YYYY-MM-DD HH:MM:SS")
+    return value.replace("T", " ")
+
+
 class WebhookController:
     """Handle webhook persistence and retrieval."""
 
@@ -36,30 +143,214 @@ class WebhookController:
         log_dir: str,
         db_manager: Optional[SupportsWebhookStorage] = None,
         db_manager_factory: type[DatabaseManager] = DatabaseManager,
+        writer_options: Optional[Dict[str, Any]] = None,
+        stream_queue_size: int = DEFAULT_SUBSCRIBER_QUEUE_SIZE,
+        heartbeat_interval: float = DEFAULT_HEARTBEAT_INTERVAL,
+        thumbnail_width: int = DEFAULT_THUMBNAIL_WIDTH,
+        idempotency_cache_size: int = DEFAULT_IDEMPOTENCY_CACHE_SIZE,
     ) -> None:
         db_path = os.path.join(log_dir, "CanLiangData.db")
         self.db_manager: SupportsWebhookStorage = db_manager or db_manager_factory(db_path)
+        self.screenshots = ScreenshotStore(os.path.join(log_dir, "screenshots"), thumbnail_width)
+        self.events = WebhookEventBroker(stream_queue_size)
+        self.seen_keys = IdempotencyCache(idempotency_cache_size)
+        self.heartbeat_interval = heartbeat_interval
+        self.writer = WebhookWriter(
+            self.db_manager,
+            on_written=self._publish,
+            prepare=self._store_screenshot,
+            on_failed=self._forget_keys,
+            **(writer_options or {}),
+        )
+
+    def _store_screenshot(self, payload: Dict[str, Any]) -> Dict[str, Any]:
+        """Move a base64 screenshot into the blob store, keeping only its hash and size."""
+
+        data = decode_base64_image(payload.get("screenshot"))
+        if data is None:
+            return payload
+        try:
+            stored = self.screenshots.store(data)
+        except OSError as exc:
+            logger.error("保存webhook截图时发生错误: %s", exc)
+            return payload
+        if stored is None:
+            return payload
+        return {
+            **payload,
+            "screenshot": None,
+            "screenshot_hash": stored["hash"],
+            "screenshot_width": stored["width"],
+            "screenshot_height": stored["height"],
+        }
+
+    @staticmethod
+    def _present(row: Dict[str, Any]) -> Dict[str, Any]:
+        """Replace stored screenshots with their URLs.
+
+        Rows that still hold a legacy base64 screenshot point at ``/image/<id>``,
+        which converts them on first request, so no payload carries image data.
+        """
+
+        row = dict(row)
+        has_legacy_screenshot = row.pop("has_legacy_screenshot", False)
+        content_hash = row.get("screenshot_hash")
+        if content_hash:
+            screenshot_url = f"/api/screenshots/{content_hash}"
+            thumbnail_url = f"{screenshot_url}/thumbnail"
+        elif has_legacy_screenshot:
+            screenshot_url = thumbnail_url = f"/image/{row['id']}"
+        else:
+            return {**row, "screenshot": None}
+        return {
+            **row,
+            "screenshot": thumbnail_url,
+            "screenshot_url": screenshot_url,
+            "thumbnail_url": thumbnail_url,
+        }
+
+    def _publish(self, rows: list[Dict[str, Any]]) -> None:
+        self.events.publish([self._present(row) for row in rows])
+
+    def _claim_key(self, payload: Dict[str, Any], idempotency_key: Optional[str]) -> tuple[Dict[str, Any], bool]:
+        """Attach the idempotency key to ``payload`` and record it in the LRU.
+
+        The key comes from the ``Idempotency-Key`` header, the payload's own
+        ``idempotency_key`` field, or a hash of the event content. Returns the
+        payload to store and ``False`` when the key was seen recently.
+        """
 
-    def save_data(self, payload: Dict[str, Any]) -> Dict[str, Any]:
-        """Persist webhook payload with defensive error handling."""
+        key = (normalize_idempotency_key(idempotency_key)
+               or normalize_idempotency_key(payload.get("idempotency_key"))
+               or derive_idempotency_key(payload))
+        payload = {**payload, "idempotency_key": key}
+        return payload, key is None or self.seen_keys.add(key)
+
+    def _forget_keys(self, payloads: list[Dict[str, Any]]) -> None:
+        """Drop keys of payloads that failed to persist so a retry is accepted."""
+
+        for payload in payloads:
+            if payload.get("idempotency_key"):
+                self.seen_keys.discard(payload["idempotency_key"])
+
+    def start_writer(self) -> None:
+        """Start the background group-commit writer used by ``save_data``."""
+
+        self.writer.start()
+
+    def stop_writer(self) -> None:
+        """Stop the background writer after flushing queued payloads."""
+
+        self.writer.stop()
+
+    def save_data(self, payload: Dict[str, Any], idempotency_key: Optional[str] = None) -> Dict[str, Any]:
+        """Persist webhook payload with defensive error handling.
+
+        While the background writer is running the payload is only queued and
+        written with the next batch; a full queue is reported with ``busy``.
+        Without the writer the payload is written synchronously through the
+        writer's ``write_batch``. Repeated
+        deliveries of the same event are acknowledged with ``duplicate`` and
+        not stored again.
+        """
 
         error = _validate_event_field(payload)
         if error:
             return {"success": False, "message": error}
 
+        payload, is_new = self._claim_key(payload, idempotency_key)
+        if not is_new:
+            return {"success": True, "message": "重复数据已忽略", "duplicate": True}
+
+        if self.writer.is_running:
+            if self.writer.submit(payload):
+                return {"success": True, "message": "数据已接收", "queued": True}
+            self._forget_keys([payload])
+            return {"success": False, "message": "服务器繁忙，请稍后重试", "busy": True}
+
         try:
-            if self.db_manager.save_webhook_data(payload):
-                return {"success": True, "message": "数据保存成功"}
-            return {"success": False, "message": "数据保存失败"}
+            rows = self.writer.write_batch([payload])
+            if rows is None:
+                self._forget_keys([payload])
+                return {"success": False, "message": "数据保存失败"}
+            if not rows:
+                return {"success": True, "message": "重复数据已忽略", "duplicate": True}
+            return {"success": True, "message": "数据保存成功"}
         except Exception as exc:  # pragma: no cover - defensive logging
             logger.error("保存webhook数据时发生错误: %s", exc)
+            self._forget_keys([payload])
             return {"success": False, "message": f"服务器内部错误: {exc}"}
 
+    def save_batch(self, payloads: List[Any]) -> Dict[str, Any]:
+        """Validate and persist many payloads with one ``executemany`` transaction.
+
+        Every entry is validated like ``save_data``; valid entries are written
+        together and invalid ones are reported without affecting the rest. The
+        result lists one ``{"index", "success", "id"|"duplicate"|"message"}``
+        per entry; entries may carry their own ``idempotency_key`` field.
+        The write, including screenshot storage, runs on the writer thread
+        while it is running; this thread only waits for the stored ids.
+        """
+
+        results: List[Dict[str, Any]] = []
+        valid: List[Dict[str, Any]] = []
+        valid_indexes: List[int] = []
+        for index, payload in enumerate(payloads):
+            if isinstance(payload, _InvalidItem):
+                error = payload.message
+            elif not isinstance(payload, dict):
+                error = "数据必须是JSON对象"
+            else:
+                error = _validate_event_field(payload)
+            if error:
+                results.append({"index": index, "success": False, "message": error})
+                continue
+            payload, is_new = self._claim_key(payload, None)
+            if not is_new:
+                results.append({"index": index, "success": True, "duplicate": True})
+                continue
+            results.append({"index": index, "success": True})
+            valid.append(payload)
+            valid_indexes.append(index)
+
+        if valid:
+            try:
+                rows = self.writer.write_batch(valid)
+            except Exception as exc:  # pragma: no cover - defensive logging
+                logger.error("批量保存webhook数据时发生错误: %s", exc)
+                rows = None
+            if rows is None:
+                self._forget_keys(valid)
+                for index in valid_indexes:
+                    results[index] = {"index": index, "success": False, "message": "数据保存失败"}
+            else:
+                # Rows skipped by the unique index are missing from ``rows``
+                stored_ids = {row["idempotency_key"]: row["id"] for row in rows if row["idempotency_key"]}
+                unkeyed_ids = iter(row["id"] for row in rows if not row["idempotency_key"])
+                for index, payload in zip(valid_indexes, valid):
+                    key = payload["idempotency_key"]
+                    if key is None:
+                        results[index]["id"] = next(unkeyed_ids)
+                    elif key in stored_ids:
+                        results[index]["id"] = stored_ids[key]
+                    else:
+                        results[index]["duplicate"] = True
+
+        failed = sum(1 for result in results if not result["success"])
+        duplicates = sum(1 for result in results if result.get("duplicate"))
+        return {
+            "success": failed == 0,
+            "saved": len(results) - failed - duplicates,
+            "duplicates": duplicates,
+            "failed": failed,
+            "results": results,
+        }
+
     def get_webhook_data(self, limit: int = 100) -> Dict[str, Any]:
         """Return the latest webhook rows."""
 
         try:
-            data_list = self.db_manager.get_webhook_data(limit)
+            data_list = [self._present(row) for row in self.db_manager.get_webhook_data(limit)]
             return {"success": True, "data": data_list, "count": len(data_list)}
         except Exception as exc:  # pragma: no cover - defensive logging
             logger.error("获取webhook数据时发生错误: %s", exc)
@@ -69,3 +360,169 @@ class WebhookController:
                 "data": [],
                 "count": 0,
             }
+
+    def query_webhook_data(self, args: Mapping[str, str]) -> Dict[str, Any]:
+        """Return a keyset-paginated, filtered page of webhook history.
+
+        Supported query parameters: ``before_id`` (older page), ``after_id``
+        (rows newer than the last one seen), ``event``, ``result``, ``since``
+        and ``until`` (UTC ``create_time`` range, ``until`` exclusive), ``limit``
+        and ``count_only``. Rows are always returned newest first; pass
+        ``next_before_id`` to load older rows and ``last_id`` to poll for new ones.
+        """
+
+        before_id = _parse_id(args, "before_id")
+        after_id = _parse_id(args, "after_id")
+        limit = _parse_id(args, "limit")
+        limit = DEFAULT_HISTORY_LIMIT if limit is None else min(max(limit, 1), MAX_HISTORY_LIMIT)
+        count_only = args.get("count_only", "").lower() in ("1", "true", "yes")
+
+        result = self.db_manager.query_webhook_data(
+            before_id=before_id,
+            after_id=after_id,
+            event=args.get("event") or None,
+            result=args.get("result") or None,
+            start_time=_parse_time(args, "since"),
+            end_time=_parse_time(args, "until"),
+            limit=limit,
+            count_only=count_only,
+        )
+        if result is None:
+            raise RuntimeError("数据库查询失败")
+        if count_only:
+            return {"success": True, "count": result["count"]}
+
+        rows = [self._present(row) for row in result["rows"]]
+        return {
+            "success": True,
+            "data": rows,
+            "count": len(rows),
+            "has_more": result["has_more"],
+            "next_before_id": rows[-1]["id"] if rows else before_id,
+            "last_id": rows[0]["id"] if rows else after_id,
+        }
+
+    def _rows_after(self, last_id: int) -> Iterator[Dict[str, Any]]:
+        """Yield persisted rows with ``id > last_id`` in ascending order."""
+
+        while True:
+            result = self.db_manager.query_webhook_data(after_id=last_id, limit=STREAM_REPLAY_BATCH)
+            if not result or not result["rows"]:
+                return
+            rows = sorted((self._present(row) for row in result["rows"]), key=lambda row: row["id"])
+            yield from rows
+            last_id = rows[-1]["id"]
+            if not result["has_more"]:
+                return
+
+    def stream_events(self, last_event_id: Optional[str] = None) -> Iterator[str]:
+        """Yield Server-Sent Events for webhook rows as they are persisted.
+
+        With ``last_event_id`` (the ``Last-Event-ID`` header of a reconnecting
+        client) the rows missed since that id are replayed from the database
+        first; otherwise the stream starts with the next new row. A comment
+        line is sent every ``heartbeat_interval`` seconds to keep idle
+        connections open. When the client falls behind and its bounded queue
+        overflows, the queue is dropped and the gap is refilled from the
+        database, so slow clients cost no extra memory and miss nothing.
+        """
+
+        # Subscribe before reading the database so no row falls between the two
+        subscription = self.events.subscribe()
+        try:
+            try:
+                last_id = int(last_event_id) if last_event_id not in (None, "") else None
+            except ValueError:
+                last_id = None
+            if last_id is None:
+                latest = self.db_manager.query_webhook_data(limit=1)
+                last_id = latest["rows"][0]["id"] if latest and latest["rows"] else 0
+
+            yield "retry: 3000\n\n"
+            for row in self._rows_after(last_id):
+                last_id = row["id"]
+                yield format_sse_event(row)
+
+            while True:
+                if subscription.lagging:
+                    subscription.reset()
+                    for row in self._rows_after(last_id):
+                        last_id = row["id"]
+                        yield format_sse_event(row)
+                row = subscription.get(timeout=self.heartbeat_interval)
+                if row is None:
+                    yield ": heartbeat\n\n"
+                elif row["id"] > last_id:
+                    last_id = row["id"]
+                    yield format_sse_event(row)
+        finally:
+            self.events.unsubscribe(subscription)
+
+    def get_screenshot(self, content_hash: str, thumbnail: bool = False) -> Optional[tuple[str, str]]:
+        """Return ``(path, mimetype)`` of a stored screenshot or its thumbnail."""
+
+        if thumbnail:
+            path = self.screenshots.get_thumbnail(content_hash)
+            return (path, "image/jpeg") if path else None
+        return self.screenshots.get_original(content_hash)
+
+    def get_event_screenshot(self, webhook_id: int) -> Optional[tuple[str, str]]:
+        """Return the thumbnail of the screenshot attached to a webhook row.
+
+        Rows written before screenshots moved to the blob store still hold the
+        base64 text; the first request copies it into the store and rewrites
+        the row to reference the blob, so it is decoded only once and is no
+        longer treated as unreferenced by the maintenance prune.
+        """
+
+        row = self.db_manager.get_webhook_by_id(webhook_id)
+        if not row:
+            return None
+        content_hash = row.get("screenshot_hash")
+        if not content_hash:
+            data = decode_base64_image(row.get("screenshot"))
+            stored = self.screenshots.store(data) if data is not None else None
+            if stored is None:
+                return None
+            content_hash = stored["hash"]
+            self.db_manager.set_webhook_screenshot(webhook_id, content_hash, stored["width"], stored["height"])
+        return self.get_screenshot(content_hash, thumbnail=True)
+
+    def get_webhook_stats(self, args: Mapping[str, str]) -> Dict[str, Any]:
+        """Return event counts per hour or day from the hourly rollup table.
+
+        Supported query parameters: ``since`` and ``until`` (UTC, ``until``
+        exclusive; defaults to the last seven days), ``bucket`` (``hour`` or
+        ``day``), ``event`` and ``result``. The cost depends on the number of
+        hours in the range, not on the number of events, and counts remain
+        available after the raw rows have been removed by retention.
+        """
+
+        bucket = args.get("bucket", "hour")
+        if bucket not in DatabaseManager.WEBHOOK_STATS_BUCKETS:
+            raise WebhookQueryError("bucket 参数只能是 hour 或 day")
+        until = _parse_time(args, "until")
+        if until is None:
+            until = datetime.now(timezone.utc).strftime("%Y-%m-%d %H:%M:%S")
+        elif len(until) == 10:
+            until += " 00:00:00"
+        since = _parse_time(args, "since")
+        if since is None:
+            since = (datetime.strptime(until, "%Y-%m-%d %H:%M:%S")
+                     - timedelta(days=DEFAULT_STATS_DAYS)).strftime("%Y-%m-%d %H:%M:%S")
+        elif len(since) == 10:
+            since += " 00:00:00"
+        if since >= until:
+            raise WebhookQueryError("since 必须早于 until")
+
+        result = self.db_manager.get_webhook_stats(
+            since, until, bucket=bucket, event=args.get("event") or None, result=args.get("result"),
+        )
+        if result is None:
+            raise RuntimeError("数据库查询失败")
+        return {"success": True, "bucket": bucket, "since": since, "until": until, **result}
+
+    def get_writer_stats(self) -> Dict[str, Any]:
+        """Return counters of the background writer."""
+
+        return {"running": self.writer.is_running, **self.writer.stats()}
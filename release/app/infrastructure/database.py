@@ -5,12 +5,138 @@ SQLite数据库操作模块
 import sqlite3
 import logging
 import os
+import queue
+import threading
+from collections import Counter
 from typing import List, Dict, Optional, Tuple
-from datetime import datetime, date
+from datetime import datetime, date, timedelta
 from contextlib import contextmanager
 
 logger = logging.getLogger('BetterGI初始化')
 
+# 连接池默认大小；设置为0时每次操作都新建连接（旧行为）
+DEFAULT_POOL_SIZE = 4
+# 每个连接缓存的预编译语句数量
+STATEMENT_CACHE_SIZE = 128
+# 每个连接的调优参数
+CONNECTION_PRAGMAS = (
+    'PRAGMA synchronous=NORMAL',     # WAL模式下只在检查点时同步，崩溃也不会损坏数据库
+    'PRAGMA cache_size=-16000',      # 页缓存约16MB（负数表示KB）
+    'PRAGMA mmap_size=67108864',     # 使用64MB内存映射读取
+    'PRAGMA temp_store=MEMORY',      # 排序、分组的临时表放在内存中
+    'PRAGMA busy_timeout=5000',      # 多个连接同时写入时最多等待5秒
+)
+
+
+class SQLiteConnectionPool:
+    """
+    SQLite连接池
+    连接在多次操作之间复用，避免每次操作都重新打开数据库文件、重新设置参数、重新编译语句；
+    连接数有上限，借出的连接用完后归还，任意线程都可以借用空闲连接
+    """
+
+    def __init__(self, db_path: str, size: int = DEFAULT_POOL_SIZE, timeout: float = 30.0):
+        """
+        初始化连接池
+
+        Args:
+            db_path: 数据库文件路径
+            size: 最多保持的连接数量，0表示不复用连接
+            timeout: 所有连接都被占用时等待空闲连接的最长时间（秒）
+        """
+        self.db_path = db_path
+        self.size = max(0, size)
+        self.timeout = timeout
+        self._idle: 'queue.LifoQueue[sqlite3.Connection]' = queue.LifoQueue()
+        self._created = 0
+        self._lock = threading.Lock()
+        self._wal_enabled = False
+
+    def _connect(self) -> sqlite3.Connection:
+        """新建连接并设置调优参数"""
+        conn = sqlite3.connect(self.db_path, check_same_thread=False,
+                               cached_statements=STATEMENT_CACHE_SIZE)
+        conn.row_factory = sqlite3.Row  # 使查询结果可以通过列名访问
+        if not self._wal_enabled:
+            # auto_vacuum 必须在写入文件头（切换WAL或建表）之前设置，只对新数据库生效，
+            # 已有数据库需要显式执行 DatabaseManager.enable_incremental_vacuum
+            conn.execute('PRAGMA auto_vacuum=INCREMENTAL')
+            # WAL模式写入数据库文件，读写互不阻塞，只需要设置一次
+            conn.execute('PRAGMA journal_mode=WAL')
+            self._wal_enabled = True
+        for pragma in CONNECTION_PRAGMAS:
+            conn.execute(pragma)
+        return conn
+
+    def acquire(self) -> sqlite3.Connection:
+        """
+        借出一个连接
+
+        Returns:
+            sqlite3.Connection: 数据库连接
+
+        Raises:
+            TimeoutError: 等待空闲连接超时
+        """
+        if self.size == 0:
+            return self._connect()
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            pass
+        with self._lock:
+            if self._created < self.size:
+                self._created += 1
+                create = True
+            else:
+                create = False
+        if create:
+            try:
+                return self._connect()
+            except Exception:
+                with self._lock:
+                    self._created -= 1
+                raise
+        try:
+            return self._idle.get(timeout=self.timeout)
+        except queue.Empty:
+            raise TimeoutError(f"等待数据库连接超时（{self.timeout}秒）") from None
+
+    def release(self, conn: sqlite3.Connection, broken: bool = False) -> None:
+        """
+        归还连接，未提交的事务会被回滚
+
+        Args:
+            conn: 借出的连接
+            broken: 连接已经不可用，直接关闭
+        """
+        if self.size == 0:
+            conn.close()
+            return
+        if not broken:
+            try:
+                if conn.in_transaction:
+                    conn.rollback()
+            except sqlite3.Error:
+                broken = True
+        if broken:
+            conn.close()
+            with self._lock:
+                self._created -= 1
+            return
+        self._idle.put(conn)
+
+    def close(self) -> None:
+        """关闭所有空闲连接"""
+        while True:
+            try:
+                conn = self._idle.get_nowait()
+            except queue.Empty:
+                break
+            conn.close()
+            with self._lock:
+                self._created -= 1
+
 
 class DatabaseManager:
     """
@@ -18,15 +144,17 @@ class DatabaseManager:
     负责数据库的创建、连接和基本操作
     """
     
-    def __init__(self, db_path: str):
+    def __init__(self, db_path: str, pool_size: int = DEFAULT_POOL_SIZE):
         """
         初始化数据库管理器
         
         Args:
             db_path: 数据库文件路径
+            pool_size: 连接池大小，0表示每次操作都新建连接
         """
         self.db_path = db_path
         self._ensure_db_directory()
+        self.pool = SQLiteConnectionPool(db_path, pool_size)
         self._init_database()
     
     def _ensure_db_directory(self):
@@ -39,26 +167,32 @@ class DatabaseManager:
     def get_connection(self):
         """
         获取数据库连接的上下文管理器
+        从连接池借出连接，用完后归还（未提交的事务会被回滚）
         
         Yields:
             sqlite3.Connection: 数据库连接对象
         """
-        conn = None
+        conn = self.pool.acquire()
+        broken = False
         try:
-            conn = sqlite3.connect(self.db_path)
-            conn.row_factory = sqlite3.Row  # 使查询结果可以通过列名访问
             yield conn
         except Exception as e:
-            if conn:
+            try:
                 conn.rollback()
+            except sqlite3.Error:
+                broken = True
             logger.error(f"数据库操作错误: {e}")
             raise
         finally:
-            if conn:
-                conn.close()
+            self.pool.release(conn, broken)
+    
+    def close(self):
+        """关闭连接池中的空闲连接"""
+        self.pool.close()
     
     def _init_database(self):
         """初始化数据库表结构"""
+        duplicates_removed = False
         with self.get_connection() as conn:
             cursor = conn.cursor()
             
@@ -74,6 +208,11 @@ class DatabaseManager:
                 )
             ''')
             
+            # 旧版本数据库补充临时数据标记：今天的数据在跨天定稿之前标记为临时
+            cursor.execute('PRAGMA table_info(log_files)')
+            if 'provisional' not in {row['name'] for row in cursor.fetchall()}:
+                cursor.execute('ALTER TABLE log_files ADD COLUMN provisional INTEGER NOT NULL DEFAULT 0')
+            
             # 创建物品数据表
             cursor.execute('''
                 CREATE TABLE IF NOT EXISTS items (
@@ -91,6 +230,26 @@ class DatabaseManager:
             cursor.execute('CREATE INDEX IF NOT EXISTS idx_items_date ON items (date_str)')
             cursor.execute('CREATE INDEX IF NOT EXISTS idx_items_name ON items (name)')
             cursor.execute('CREATE INDEX IF NOT EXISTS idx_log_files_date ON log_files (date_str)')
+            # 聚合查询先按日期范围过滤，再按物品名称或配置组分组
+            cursor.execute('CREATE INDEX IF NOT EXISTS idx_items_date_name ON items (date_str, name)')
+            cursor.execute('CREATE INDEX IF NOT EXISTS idx_items_config_group ON items (config_group, date_str)')
+            
+            # 物品记录的唯一键，重复入库时跳过已经存在的记录；旧版本数据库先清理重复行
+            cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'index' AND name = 'idx_items_unique'")
+            if cursor.fetchone() is None:
+                cursor.execute('''
+                    DELETE FROM items WHERE id NOT IN (
+                        SELECT MIN(id) FROM items
+                        GROUP BY date_str, timestamp, name, COALESCE(config_group, '')
+                    )
+                ''')
+                duplicates_removed = cursor.rowcount > 0
+                if duplicates_removed:
+                    logger.info(f"清理了 {cursor.rowcount} 条重复的物品记录")
+                cursor.execute('''
+                    CREATE UNIQUE INDEX idx_items_unique
+                    ON items (date_str, timestamp, name, COALESCE(config_group, ''))
+                ''')
             
             # 创建webhook数据表
             cursor.execute('''
@@ -105,21 +264,152 @@ class DatabaseManager:
                 )
             ''')
             
+            # 截图改为按内容哈希保存为文件，数据表中只保留哈希和尺寸
+            cursor.execute('PRAGMA table_info(post_data)')
+            post_data_columns = {row['name'] for row in cursor.fetchall()}
+            for column, column_type in (('screenshot_hash', 'TEXT'), ('screenshot_width', 'INTEGER'),
+                                        ('screenshot_height', 'INTEGER'), ('idempotency_key', 'TEXT')):
+                if column not in post_data_columns:
+                    cursor.execute(f'ALTER TABLE post_data ADD COLUMN {column} {column_type}')
+            
             # 为webhook数据表创建索引
             cursor.execute('CREATE INDEX IF NOT EXISTS idx_post_data_event ON post_data (event)')
             cursor.execute('CREATE INDEX IF NOT EXISTS idx_post_data_create_time ON post_data (create_time)')
+            # 按事件、结果过滤后以id为游标翻页（单列索引的条目本身按 (event, id) 排序）
+            cursor.execute('CREATE INDEX IF NOT EXISTS idx_post_data_event_result_id ON post_data (event, result, id)')
+            cursor.execute('CREATE INDEX IF NOT EXISTS idx_post_data_result_id ON post_data (result, id)')
+            # 幂等键唯一，重复投递的数据在写入时跳过；旧数据没有幂等键，不参与唯一约束
+            cursor.execute('''
+                CREATE UNIQUE INDEX IF NOT EXISTS idx_post_data_idempotency
+                ON post_data (idempotency_key) WHERE idempotency_key IS NOT NULL
+            ''')
+            
+            # 创建日志增量解析检查点表
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS log_checkpoints (
+                    file_name TEXT PRIMARY KEY,
+                    byte_offset INTEGER NOT NULL DEFAULT 0,
+                    head_size INTEGER NOT NULL DEFAULT 0,
+                    head_hash TEXT NOT NULL DEFAULT '',
+                    state TEXT NOT NULL,
+                    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+                )
+            ''')
+            
+            # 创建日志文件目录表，记录已入库文件的大小、修改时间和内容指纹
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS log_catalog (
+                    file_name TEXT PRIMARY KEY,
+                    date_str TEXT NOT NULL,
+                    size INTEGER NOT NULL,
+                    mtime_ns INTEGER NOT NULL,
+                    fingerprint TEXT NOT NULL,
+                    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+                )
+            ''')
+
+            # 创建汇总表：每天每种物品的数量、每天每个配置组的数量、每周和每月的合计
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS item_daily_rollup (
+                    date_str TEXT NOT NULL,
+                    name TEXT NOT NULL,
+                    item_count INTEGER NOT NULL,
+                    PRIMARY KEY (date_str, name)
+                )
+            ''')
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS config_group_daily_rollup (
+                    date_str TEXT NOT NULL,
+                    config_group TEXT NOT NULL,
+                    item_count INTEGER NOT NULL,
+                    PRIMARY KEY (date_str, config_group)
+                )
+            ''')
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS period_rollup (
+                    period_type TEXT NOT NULL,
+                    period_key TEXT NOT NULL,
+                    start_date TEXT NOT NULL,
+                    end_date TEXT NOT NULL,
+                    item_count INTEGER NOT NULL,
+                    duration INTEGER NOT NULL,
+                    day_count INTEGER NOT NULL,
+                    PRIMARY KEY (period_type, period_key)
+                )
+            ''')
+            
+            # 创建webhook事件小时汇总表：每小时每种 (事件, 结果) 的数量（按create_time，UTC），
+            # 写入时累加，不随webhook明细数据一起清理
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS webhook_hourly_rollup (
+                    hour TEXT NOT NULL,
+                    event TEXT NOT NULL,
+                    result TEXT NOT NULL,
+                    event_count INTEGER NOT NULL,
+                    PRIMARY KEY (hour, event, result)
+                )
+            ''')
+            cursor.execute('CREATE INDEX IF NOT EXISTS idx_webhook_hourly_rollup_event ON webhook_hourly_rollup (event, hour)')
             
             conn.commit()
             logger.info("数据库表结构初始化完成")
+        
+        # 旧版本数据库升级后汇总表为空（或刚清理过重复记录），一次性从明细数据生成
+        if duplicates_removed or self._rollups_missing():
+            self.rebuild_rollups()
+        if self._webhook_rollups_missing():
+            self.rebuild_webhook_rollups()
+        
+        if not self.incremental_vacuum_enabled():
+            logger.info("数据库未开启增量清理模式，可以执行 python run.py --enable-incremental-vacuum 开启")
+    
+    def incremental_vacuum_enabled(self) -> bool:
+        """
+        检查数据库是否处于增量清理模式
+        
+        Returns:
+            bool: 已开启返回True，未开启或发生错误时返回False
+        """
+        try:
+            with self.get_connection() as conn:
+                return conn.execute('PRAGMA auto_vacuum').fetchone()[0] == 2
+        except Exception as e:
+            logger.error(f"检查数据库清理模式时发生错误: {e}")
+            return False
     
-    def insert_log_file_data(self, date_str: str, duration: int, items: List[Dict]) -> bool:
+    def enable_incremental_vacuum(self) -> bool:
+        """
+        把旧版本数据库切换为增量清理模式，删除数据后可以分步归还空闲页
+        需要执行一次完整的 VACUUM，耗时与数据库大小成正比，只应作为单独的维护步骤运行
+        
+        Returns:
+            bool: 操作是否成功
+        """
+        try:
+            with self.get_connection() as conn:
+                if conn.execute('PRAGMA auto_vacuum').fetchone()[0] == 2:
+                    return True
+                conn.execute('PRAGMA auto_vacuum=INCREMENTAL')
+                conn.execute('VACUUM')
+                logger.info("数据库已切换为增量清理模式")
+                return True
+        except Exception as e:
+            logger.error(f"开启数据库增量清理模式时发生错误: {e}")
+            return False
+    
+    def insert_log_file_data(self, date_str: str, duration: int, items: List[Dict], replace: bool = False,
+                             provisional: bool = False) -> bool:
         """
         插入或更新日志文件数据
+        物品记录以 (日期, 时间戳, 物品名称, 配置组) 为唯一键追加写入，已经存在的记录直接跳过，
+        重复入库同一天的数据只会写入新增的物品
         
         Args:
             date_str: 日期字符串
             duration: 持续时间（秒）
             items: 物品列表，每个物品包含 name, timestamp, config_group
+            replace: 是否先删除该日期的旧物品记录（日志文件被截断或替换时使用）
+            provisional: 是否为尚未结束的一天写入的临时数据
             
         Returns:
             bool: 操作是否成功
@@ -128,45 +418,63 @@ class DatabaseManager:
             with self.get_connection() as conn:
                 cursor = conn.cursor()
                 
-                # 插入或更新日志文件记录
-                cursor.execute('''
-                    INSERT OR REPLACE INTO log_files (date_str, duration, item_count, updated_at)
-                    VALUES (?, ?, ?, CURRENT_TIMESTAMP)
-                ''', (date_str, duration, len(items)))
+                if replace:
+                    cursor.execute('DELETE FROM items WHERE date_str = ?', (date_str,))
                 
-                # 删除该日期的旧物品记录
-                cursor.execute('DELETE FROM items WHERE date_str = ?', (date_str,))
-                
-                # 插入新的物品记录
-                if items:
-                    item_data = [
-                        (item['name'], item['timestamp'], date_str, item.get('config_group'))
-                        for item in items
-                    ]
-                    cursor.executemany('''
-                        INSERT INTO items (name, timestamp, date_str, config_group)
+                # 逐条追加物品记录，只统计真正新增的行
+                new_items = []
+                for item in items:
+                    row = (item['name'], item['timestamp'], date_str, item.get('config_group'))
+                    cursor.execute('''
+                        INSERT OR IGNORE INTO items (name, timestamp, date_str, config_group)
                         VALUES (?, ?, ?, ?)
-                    ''', item_data)
+                    ''', row)
+                    if cursor.rowcount == 1:
+                        new_items.append(row)
+                
+                # 插入或更新日志文件记录，追加写入时物品数量累加新增的行数
+                cursor.execute('''
+                    INSERT INTO log_files (date_str, duration, item_count, provisional, updated_at)
+                    VALUES (?, ?, ?, ?, CURRENT_TIMESTAMP)
+                    ON CONFLICT (date_str) DO UPDATE SET
+                        duration = excluded.duration,
+                        item_count = CASE WHEN ? THEN excluded.item_count
+                                          ELSE log_files.item_count + excluded.item_count END,
+                        provisional = excluded.provisional,
+                        updated_at = CURRENT_TIMESTAMP
+                ''', (date_str, duration, len(new_items), int(provisional), replace))
+                
+                # 在同一事务中更新汇总表
+                if replace:
+                    self._refresh_rollups(cursor, date_str)
+                else:
+                    self._add_to_rollups(cursor, date_str, new_items)
                 
                 conn.commit()
-                logger.info(f"成功存储日期 {date_str} 的数据，包含 {len(items)} 个物品")
+                logger.info(f"成功存储日期 {date_str} 的数据，新增 {len(new_items)} 个物品")
                 return True
                 
         except Exception as e:
             logger.error(f"插入日志数据时发生错误: {e}")
             return False
     
-    def get_stored_dates(self) -> List[str]:
+    def get_stored_dates(self, include_provisional: bool = True) -> List[str]:
         """
         获取数据库中已存储的所有日期
         
+        Args:
+            include_provisional: 是否包含尚未定稿的临时数据
+            
         Returns:
             List[str]: 日期字符串列表
         """
         try:
             with self.get_connection() as conn:
                 cursor = conn.cursor()
-                cursor.execute('SELECT date_str FROM log_files ORDER BY date_str DESC')
+                query = 'SELECT date_str FROM log_files'
+                if not include_provisional:
+                    query += ' WHERE provisional = 0'
+                cursor.execute(query + ' ORDER BY date_str DESC')
                 return [row[0] for row in cursor.fetchall()]
         except Exception as e:
             logger.error(f"获取存储日期时发生错误: {e}")
@@ -252,6 +560,30 @@ class DatabaseManager:
             logger.error(f"获取物品数据时发生错误: {e}")
             return {}
     
+    def get_log_items(self, date_str: str) -> Optional[List[Tuple[str, str, Optional[str]]]]:
+        """
+        按写入顺序获取指定日期的物品记录
+
+        Args:
+            date_str: 日期字符串
+
+        Returns:
+            Optional[List[Tuple[str, str, Optional[str]]]]: (物品名称, 时间戳, 配置组) 列表，出错时返回None
+        """
+        try:
+            with self.get_connection() as conn:
+                cursor = conn.cursor()
+                cursor.execute('''
+                    SELECT name, timestamp, config_group
+                    FROM items
+                    WHERE date_str = ?
+                    ORDER BY id
+                ''', (date_str,))
+                return [tuple(row) for row in cursor.fetchall()]
+        except Exception as e:
+            logger.error(f"获取物品记录时发生错误: {e}")
+            return None
+
     def get_log_file_info(self, date_str: str) -> Optional[Dict]:
         """
         获取指定日期的日志文件信息
@@ -260,13 +592,13 @@ class DatabaseManager:
             date_str: 日期字符串
             
         Returns:
-            Optional[Dict]: 日志文件信息，包含 duration 和 item_count
+            Optional[Dict]: 日志文件信息，包含 duration、item_count 和 provisional
         """
         try:
             with self.get_connection() as conn:
                 cursor = conn.cursor()
                 cursor.execute('''
-                    SELECT duration, item_count, updated_at 
+                    SELECT duration, item_count, updated_at, provisional
                     FROM log_files 
                     WHERE date_str = ?
                 ''', (date_str,))
@@ -276,7 +608,8 @@ class DatabaseManager:
                     return {
                         'duration': row[0],
                         'item_count': row[1],
-                        'updated_at': row[2]
+                        'updated_at': row[2],
+                        'provisional': bool(row[3])
                     }
                 return None
         except Exception as e:
@@ -303,6 +636,9 @@ class DatabaseManager:
                 # 删除日志文件记录
                 cursor.execute('DELETE FROM log_files WHERE date_str = ?', (date_str,))
                 
+                # 在同一事务中更新汇总表
+                self._refresh_rollups(cursor, date_str)
+                
                 conn.commit()
                 logger.info(f"成功删除日期 {date_str} 的所有数据")
                 return True
@@ -311,57 +647,456 @@ class DatabaseManager:
             logger.error(f"删除日志数据时发生错误: {e}")
             return False
     
-    def save_webhook_data(self, data_dict: Dict) -> bool:
+    @staticmethod
+    def _rollup_periods(date_str: str) -> List[Tuple[str, str, str, str]]:
         """
-        保存webhook数据到数据库
+        计算日期所属的周和月
+
+        Args:
+            date_str: 日期字符串，格式YYYYMMDD
+
+        Returns:
+            List[Tuple[str, str, str, str]]: [(周期类型, 周期键, 开始日期, 结束日期), ...]，日期格式错误时返回空列表
+        """
+        try:
+            day = datetime.strptime(date_str, '%Y%m%d').date()
+        except ValueError:
+            return []
+        iso_year, iso_week, iso_weekday = day.isocalendar()
+        monday = day - timedelta(days=iso_weekday - 1)
+        sunday = monday + timedelta(days=6)
+        return [
+            ('week', f'{iso_year}-W{iso_week:02d}', monday.strftime('%Y%m%d'), sunday.strftime('%Y%m%d')),
+            ('month', date_str[:6], f'{date_str[:6]}01', f'{date_str[:6]}31'),
+        ]
+
+    def _refresh_rollups(self, cursor: sqlite3.Cursor, date_str: str) -> None:
+        """
+        重新计算指定日期的汇总数据，在写入明细数据的同一事务中调用
+        只涉及该日期的明细行以及所属周、月的日志文件记录
+
+        Args:
+            cursor: 当前事务的游标
+            date_str: 日期字符串
+        """
+        cursor.execute('DELETE FROM item_daily_rollup WHERE date_str = ?', (date_str,))
+        cursor.execute('''
+            INSERT INTO item_daily_rollup (date_str, name, item_count)
+            SELECT date_str, name, COUNT(*) FROM items WHERE date_str = ? GROUP BY name
+        ''', (date_str,))
+        cursor.execute('DELETE FROM config_group_daily_rollup WHERE date_str = ?', (date_str,))
+        cursor.execute('''
+            INSERT INTO config_group_daily_rollup (date_str, config_group, item_count)
+            SELECT date_str, COALESCE(config_group, ''), COUNT(*) FROM items
+            WHERE date_str = ? GROUP BY COALESCE(config_group, '')
+        ''', (date_str,))
+
+        self._refresh_period_rollups(cursor, date_str)
+
+    def _refresh_period_rollups(self, cursor: sqlite3.Cursor, date_str: str) -> None:
+        """重新计算日期所属的周、月合计，只读取该周期内的日志文件记录"""
+        for period_type, period_key, start_date, end_date in self._rollup_periods(date_str):
+            cursor.execute('DELETE FROM period_rollup WHERE period_type = ? AND period_key = ?',
+                           (period_type, period_key))
+            cursor.execute('''
+                INSERT INTO period_rollup (period_type, period_key, start_date, end_date, item_count, duration, day_count)
+                SELECT ?, ?, ?, ?, SUM(item_count), SUM(duration), COUNT(*) FROM log_files
+                WHERE date_str BETWEEN ? AND ?
+                HAVING COUNT(*) > 0
+            ''', (period_type, period_key, start_date, end_date, start_date, end_date))
+
+    def _add_to_rollups(self, cursor: sqlite3.Cursor, date_str: str, new_items: List[Tuple]) -> None:
+        """
+        把新增的物品记录累加到汇总表，在写入明细数据的同一事务中调用
+
+        Args:
+            cursor: 当前事务的游标
+            date_str: 日期字符串
+            new_items: 新增的物品记录 [(name, timestamp, date_str, config_group), ...]
+        """
+        item_counts = Counter(row[0] for row in new_items)
+        group_counts = Counter(row[3] or '' for row in new_items)
+        cursor.executemany('''
+            INSERT INTO item_daily_rollup (date_str, name, item_count) VALUES (?, ?, ?)
+            ON CONFLICT (date_str, name) DO UPDATE SET item_count = item_count + excluded.item_count
+        ''', [(date_str, name, count) for name, count in item_counts.items()])
+        cursor.executemany('''
+            INSERT INTO config_group_daily_rollup (date_str, config_group, item_count) VALUES (?, ?, ?)
+            ON CONFLICT (date_str, config_group) DO UPDATE SET item_count = item_count + excluded.item_count
+        ''', [(date_str, group, count) for group, count in group_counts.items()])
+        self._refresh_period_rollups(cursor, date_str)
+
+    def _rollups_missing(self) -> bool:
+        """汇总表为空但已经有物品明细时返回True"""
+        try:
+            with self.get_connection() as conn:
+                cursor = conn.cursor()
+                cursor.execute('SELECT EXISTS(SELECT 1 FROM item_daily_rollup)')
+                if cursor.fetchone()[0]:
+                    return False
+                cursor.execute('SELECT EXISTS(SELECT 1 FROM items)')
+                return bool(cursor.fetchone()[0])
+        except Exception as e:
+            logger.error(f"检查汇总表时发生错误: {e}")
+            return False
+
+    def rebuild_rollups(self) -> bool:
+        """
+        根据明细数据重新生成全部汇总表，用于旧数据库升级或修复
+
+        Returns:
+            bool: 操作是否成功
+        """
+        try:
+            with self.get_connection() as conn:
+                cursor = conn.cursor()
+                cursor.execute('DELETE FROM item_daily_rollup')
+                cursor.execute('''
+                    INSERT INTO item_daily_rollup (date_str, name, item_count)
+                    SELECT date_str, name, COUNT(*) FROM items GROUP BY date_str, name
+                ''')
+                cursor.execute('DELETE FROM config_group_daily_rollup')
+                cursor.execute('''
+                    INSERT INTO config_group_daily_rollup (date_str, config_group, item_count)
+                    SELECT date_str, COALESCE(config_group, ''), COUNT(*) FROM items
+                    GROUP BY date_str, COALESCE(config_group, '')
+                ''')
+                cursor.execute('DELETE FROM period_rollup')
+                cursor.execute('SELECT date_str FROM log_files')
+                periods = {
+                    period
+                    for row in cursor.fetchall()
+                    for period in self._rollup_periods(row[0])
+                }
+                for period_type, period_key, start_date, end_date in periods:
+                    cursor.execute('''
+                        INSERT INTO period_rollup (period_type, period_key, start_date, end_date, item_count, duration, day_count)
+                        SELECT ?, ?, ?, ?, SUM(item_count), SUM(duration), COUNT(*) FROM log_files
+                        WHERE date_str BETWEEN ? AND ?
+                    ''', (period_type, period_key, start_date, end_date, start_date, end_date))
+                conn.commit()
+                logger.info(f"汇总表重建完成，共 {len(periods)} 个周/月")
+                return True
+        except Exception as e:
+            logger.error(f"重建汇总表时发生错误: {e}")
+            return False
+
+    def get_period_totals(self, period_type: str, start_date: Optional[str] = None,
+                          end_date: Optional[str] = None, limit: int = 50, offset: int = 0) -> Optional[Dict]:
+        """
+        获取每周或每月的合计
+
+        Args:
+            period_type: 'week' 或 'month'
+            start_date: 只返回结束日期不早于该日期的周期
+            end_date: 只返回开始日期不晚于该日期的周期
+            limit: 每页数量
+            offset: 偏移量
+
+        Returns:
+            Optional[Dict]: {'total': 周期数, 'rows': [{'period', 'start_date', 'end_date', 'item_count',
+                            'duration', 'day_count'}, ...]}，按周期降序，失败时返回None
+        """
+        conditions = ['period_type = ?']
+        params = [period_type]
+        if start_date:
+            conditions.append('end_date >= ?')
+            params.append(start_date)
+        if end_date:
+            conditions.append('start_date <= ?')
+            params.append(end_date)
+        where = ' WHERE ' + ' AND '.join(conditions)
+        try:
+            with self.get_connection() as conn:
+                cursor = conn.cursor()
+                cursor.execute(f'SELECT COUNT(*) FROM period_rollup{where}', params)
+                total = cursor.fetchone()[0]
+                cursor.execute(f'''
+                    SELECT period_key, start_date, end_date, item_count, duration, day_count
+                    FROM period_rollup{where}
+                    ORDER BY start_date DESC
+                    LIMIT ? OFFSET ?
+                ''', params + [limit, offset])
+                rows = [
+                    {
+                        'period': row['period_key'],
+                        'start_date': row['start_date'],
+                        'end_date': row['end_date'],
+                        'item_count': row['item_count'],
+                        'duration': row['duration'],
+                        'day_count': row['day_count'],
+                    }
+                    for row in cursor.fetchall()
+                ]
+                return {'total': total, 'rows': rows}
+        except Exception as e:
+            logger.error(f"获取周期汇总数据时发生错误: {e}")
+            return None
+
+    # 聚合查询允许的分组字段
+    ITEM_GROUP_COLUMNS = {
+        'date': 'date_str',
+        'item': 'name',
+        'config_group': "COALESCE(config_group, '')",
+    }
+
+    @staticmethod
+    def _item_filters(start_date: Optional[str] = None, end_date: Optional[str] = None,
+                      item_name: Optional[str] = None, config_group: Optional[str] = None,
+                      alias: str = '') -> Tuple[str, List]:
+        """
+        生成物品相关查询的过滤条件
+
+        Args:
+            start_date: 开始日期（含）
+            end_date: 结束日期（含）
+            item_name: 物品名称
+            config_group: 配置组（空字符串表示不属于任何配置组）
+            alias: 字段前缀（表别名加点号）
+
+        Returns:
+            Tuple[str, List]: (WHERE子句, 参数列表)，没有条件时WHERE子句为空字符串
+        """
+        conditions = []
+        params = []
+        if start_date:
+            conditions.append(f'{alias}date_str >= ?')
+            params.append(start_date)
+        if end_date:
+            conditions.append(f'{alias}date_str <= ?')
+            params.append(end_date)
+        if item_name is not None:
+            conditions.append(f'{alias}name = ?')
+            params.append(item_name)
+        if config_group is not None:
+            conditions.append(f"COALESCE({alias}config_group, '') = ?")
+            params.append(config_group)
+        where = f" WHERE {' AND '.join(conditions)}" if conditions else ''
+        return where, params
+
+    def aggregate_items(self, group_by: str, start_date: Optional[str] = None, end_date: Optional[str] = None,
+                        item_name: Optional[str] = None, config_group: Optional[str] = None,
+                        order_by: str = 'count', limit: int = 50, offset: int = 0) -> Optional[Dict]:
+        """
+        按日期、物品名称或配置组统计物品数量
+
+        Args:
+            group_by: 分组字段，可选 'date'、'item'、'config_group'
+            start_date: 开始日期（含），格式YYYYMMDD
+            end_date: 结束日期（含），格式YYYYMMDD
+            item_name: 只统计指定物品
+            config_group: 只统计指定配置组（空字符串表示不属于任何配置组）
+            order_by: 排序方式，'count' 按数量降序，'key' 按分组值排序（日期降序，其他升序）
+            limit: 每页数量
+            offset: 偏移量
+
+        Returns:
+            Optional[Dict]: {'total': 分组总数, 'rows': [{'key': 分组值, 'count': 数量}, ...]}，失败时返回None
+        """
+        column = self.ITEM_GROUP_COLUMNS.get(group_by)
+        if column is None:
+            logger.error(f"不支持的分组字段: {group_by}")
+            return None
+
+        # 优先使用每日汇总表，只有同时涉及物品和配置组两个维度时才需要扫描明细表
+        needs_item = group_by == 'item' or item_name is not None
+        needs_group = group_by == 'config_group' or config_group is not None
+        if needs_item and needs_group:
+            source, count_expr = 'items', 'COUNT(*)'
+        elif needs_group:
+            source, count_expr = 'config_group_daily_rollup', 'SUM(item_count)'
+        else:
+            source, count_expr = 'item_daily_rollup', 'SUM(item_count)'
+
+        where, params = self._item_filters(start_date, end_date, item_name, config_group)
+        if order_by == 'key':
+            order = 'group_key DESC' if group_by == 'date' else 'group_key ASC'
+        else:
+            order = 'item_count DESC, group_key ASC'
+
+        try:
+            with self.get_connection() as conn:
+                cursor = conn.cursor()
+                cursor.execute(f'SELECT COUNT(DISTINCT {column}) FROM {source}{where}', params)
+                total = cursor.fetchone()[0]
+                cursor.execute(f'''
+                    SELECT {column} AS group_key, {count_expr} AS item_count
+                    FROM {source}{where}
+                    GROUP BY group_key
+                    ORDER BY {order}
+                    LIMIT ? OFFSET ?
+                ''', params + [limit, offset])
+                rows = [{'key': row['group_key'], 'count': row['item_count']} for row in cursor.fetchall()]
+                return {'total': total, 'rows': rows}
+        except Exception as e:
+            logger.error(f"统计物品数据时发生错误: {e}")
+            return None
+
+    def get_daily_totals(self, start_date: Optional[str] = None, end_date: Optional[str] = None,
+                         limit: int = 50, offset: int = 0) -> Optional[Dict]:
+        """
+        获取每天的物品总数、物品种类数和持续时间
+
+        Args:
+            start_date: 开始日期（含），格式YYYYMMDD
+            end_date: 结束日期（含），格式YYYYMMDD
+            limit: 每页数量
+            offset: 偏移量
+
+        Returns:
+            Optional[Dict]: {'total': 天数, 'rows': [{'date', 'item_count', 'distinct_items', 'duration'}, ...]}，
+                            按日期降序，失败时返回None
+        """
+        where, params = self._item_filters(start_date, end_date, alias='lf.')
+        try:
+            with self.get_connection() as conn:
+                cursor = conn.cursor()
+                cursor.execute(f'SELECT COUNT(*) FROM log_files lf{where}', params)
+                total = cursor.fetchone()[0]
+                cursor.execute(f'''
+                    SELECT lf.date_str, lf.duration,
+                           COALESCE(SUM(r.item_count), 0) AS item_count,
+                           COUNT(r.name) AS distinct_items
+                    FROM log_files lf
+                    LEFT JOIN item_daily_rollup r ON r.date_str = lf.date_str{where}
+                    GROUP BY lf.date_str
+                    ORDER BY lf.date_str DESC
+                    LIMIT ? OFFSET ?
+                ''', params + [limit, offset])
+                rows = [
+                    {
+                        'date': row['date_str'],
+                        'item_count': row['item_count'],
+                        'distinct_items': row['distinct_items'],
+                        'duration': row['duration'],
+                    }
+                    for row in cursor.fetchall()
+                ]
+                return {'total': total, 'rows': rows}
+        except Exception as e:
+            logger.error(f"获取每日汇总数据时发生错误: {e}")
+            return None
+
+    def save_log_checkpoint(self, file_name: str, byte_offset: int, head_size: int,
+                            head_hash: str, state: str) -> bool:
+        """
+        保存日志文件的增量解析检查点
         
         Args:
-            data_dict: 包含webhook数据的字典，必须包含'event'字段
+            file_name: 日志文件名
+            byte_offset: 已解析的字节偏移
+            head_size: 文件头指纹覆盖的字节数
+            head_hash: 文件头指纹
+            state: JSON格式的解析状态
             
         Returns:
             bool: 操作是否成功
         """
         try:
-            # 可能存在的字段
-            possible_fields = ['result', 'timestamp', 'message', 'screenshot']
+            with self.get_connection() as conn:
+                cursor = conn.cursor()
+                cursor.execute('''
+                    INSERT OR REPLACE INTO log_checkpoints
+                        (file_name, byte_offset, head_size, head_hash, state, updated_at)
+                    VALUES (?, ?, ?, ?, ?, CURRENT_TIMESTAMP)
+                ''', (file_name, byte_offset, head_size, head_hash, state))
+                conn.commit()
+                return True
+        except Exception as e:
+            logger.error(f"保存日志检查点时发生错误: {e}")
+            return False
+    
+    def get_log_checkpoint(self, file_name: str) -> Optional[Dict]:
+        """
+        获取日志文件的增量解析检查点
+        
+        Args:
+            file_name: 日志文件名
             
+        Returns:
+            Optional[Dict]: 检查点信息，包含 byte_offset, head_size, head_hash, state
+        """
+        try:
             with self.get_connection() as conn:
                 cursor = conn.cursor()
+                cursor.execute('''
+                    SELECT byte_offset, head_size, head_hash, state
+                    FROM log_checkpoints
+                    WHERE file_name = ?
+                ''', (file_name,))
                 
-                # 构建插入语句
-                fields = ['event']
-                values = [data_dict['event']]
-                placeholders = ['?']
-                
-                # 添加可选字段
-                for field in possible_fields:
-                    if field in data_dict:
-                        fields.append(field)
-                        values.append(data_dict[field])
-                        placeholders.append('?')
-                
-                # 执行插入
-                query = f'''
-                    INSERT INTO post_data ({', '.join(fields)})
-                    VALUES ({', '.join(placeholders)})
-                '''
-                
-                cursor.execute(query, values)
+                row = cursor.fetchone()
+                if row:
+                    return {
+                        'byte_offset': row[0],
+                        'head_size': row[1],
+                        'head_hash': row[2],
+                        'state': row[3]
+                    }
+                return None
+        except Exception as e:
+            logger.error(f"获取日志检查点时发生错误: {e}")
+            return None
+    
+    def prune_log_checkpoints(self, keep_file_name: str) -> bool:
+        """
+        删除除指定文件以外的所有检查点
+        
+        Args:
+            keep_file_name: 需要保留的日志文件名
+            
+        Returns:
+            bool: 操作是否成功
+        """
+        try:
+            with self.get_connection() as conn:
+                cursor = conn.cursor()
+                cursor.execute('DELETE FROM log_checkpoints WHERE file_name != ?', (keep_file_name,))
                 conn.commit()
-                
-                logger.info(f"成功保存webhook数据，事件: {data_dict['event']}")
                 return True
-                
         except Exception as e:
-            logger.error(f"保存webhook数据时发生错误: {e}")
+            logger.error(f"清理日志检查点时发生错误: {e}")
             return False
     
-    def cleanup_old_webhook_data(self, days_to_keep: int = 3) -> bool:
+    def get_log_catalog(self) -> List[Dict]:
         """
-        清理指定天数之前的webhook数据
+        获取日志文件目录表的全部记录
+        
+        Returns:
+            List[Dict]: 记录列表，每条包含 file_name, date_str, size, mtime_ns, fingerprint
+        """
+        try:
+            with self.get_connection() as conn:
+                cursor = conn.cursor()
+                cursor.execute('''
+                    SELECT file_name, date_str, size, mtime_ns, fingerprint
+                    FROM log_catalog
+                ''')
+                return [
+                    {
+                        'file_name': row[0],
+                        'date_str': row[1],
+                        'size': row[2],
+                        'mtime_ns': row[3],
+                        'fingerprint': row[4]
+                    }
+                    for row in cursor.fetchall()
+                ]
+        except Exception as e:
+            logger.error(f"获取日志文件目录时发生错误: {e}")
+            return []
+    
+    def upsert_log_catalog_entry(self, file_name: str, date_str: str, size: int,
+                                 mtime_ns: int, fingerprint: str) -> bool:
+        """
+        插入或更新日志文件目录表中的一条记录
         
         Args:
-            days_to_keep: 保留的天数，默认为3天
+            file_name: 日志文件名
+            date_str: 日期字符串
+            size: 文件大小（字节）
+            mtime_ns: 文件修改时间（纳秒）
+            fingerprint: 文件内容指纹
             
         Returns:
             bool: 操作是否成功
@@ -369,34 +1104,277 @@ class DatabaseManager:
         try:
             with self.get_connection() as conn:
                 cursor = conn.cursor()
-                
-                # 计算截止日期（当前时间减去指定天数）
-                from datetime import timedelta
-                cutoff_datetime = datetime.now() - timedelta(days=days_to_keep)
-                cutoff_str = cutoff_datetime.strftime('%Y-%m-%d %H:%M:%S')
-                
-                # 删除指定日期之前的数据
                 cursor.execute('''
-                    DELETE FROM post_data 
-                    WHERE create_time < ?
-                ''', (cutoff_str,))
-                
-                deleted_count = cursor.rowcount
+                    INSERT OR REPLACE INTO log_catalog
+                        (file_name, date_str, size, mtime_ns, fingerprint, updated_at)
+                    VALUES (?, ?, ?, ?, ?, CURRENT_TIMESTAMP)
+                ''', (file_name, date_str, size, mtime_ns, fingerprint))
                 conn.commit()
-                
-                if deleted_count > 0:
-                    logger.info(f"成功清理了 {deleted_count} 条 {days_to_keep} 天前的webhook数据")
-                
                 return True
+        except Exception as e:
+            logger.error(f"更新日志文件目录时发生错误: {e}")
+            return False
+    
+    # 写入webhook数据表的字段，缺少的可选字段写入NULL
+    WEBHOOK_FIELDS = ('event', 'result', 'timestamp', 'message', 'screenshot',
+                      'screenshot_hash', 'screenshot_width', 'screenshot_height', 'idempotency_key')
+    # 查询webhook数据时读取的字段，顺序与 _webhook_row 对应；
+    # 旧数据中的base64截图只读取是否存在，列表、历史和推送中不再携带截图内容
+    WEBHOOK_COLUMNS = ('id, event, result, timestamp, screenshot IS NOT NULL, create_time, message, '
+                       'screenshot_hash, screenshot_width, screenshot_height, idempotency_key')
+    
+    def save_webhook_data(self, data_dict: Dict) -> bool:
+        """
+        保存webhook数据到数据库
+        
+        Args:
+            data_dict: 包含webhook数据的字典，必须包含'event'字段
+            
+        Returns:
+            bool: 操作是否成功
+        """
+        if not self.save_webhook_batch([data_dict]):
+            return False
+        logger.info(f"成功保存webhook数据，事件: {data_dict['event']}")
+        return True
+    
+    def save_webhook_batch(self, data_list: List[Dict]) -> bool:
+        """
+        在一个事务中批量保存webhook数据
+        
+        Args:
+            data_list: webhook数据字典列表，每条都必须包含'event'字段
+            
+        Returns:
+            bool: 操作是否成功，失败时整批都不会写入
+        """
+        return self.insert_webhook_batch(data_list) is not None
+    
+    def insert_webhook_batch(self, data_list: List[Dict]) -> Optional[List[Dict]]:
+        """
+        在一个事务中批量保存webhook数据，并返回写入后的完整记录（包含id和create_time）
+        幂等键（idempotency_key）已经存在的数据会被跳过
+        
+        Args:
+            data_list: webhook数据字典列表，每条都必须包含'event'字段
+            
+        Returns:
+            Optional[List[Dict]]: 按写入顺序排列的实际写入的记录，发生错误时返回None（整批都不会写入）
+        """
+        if not data_list:
+            return []
+        try:
+            rows = [tuple(data_dict['event'] if field == 'event' else data_dict.get(field)
+                          for field in self.WEBHOOK_FIELDS)
+                    for data_dict in data_list]
+            with self.get_connection() as conn:
+                cursor = conn.cursor()
+                # 先取得写锁再读取当前最大id，本批实际写入的记录就是id大于它的记录
+                cursor.execute('BEGIN IMMEDIATE')
+                last_id = cursor.execute('SELECT COALESCE(MAX(id), 0) FROM post_data').fetchone()[0]
+                cursor.executemany(f'''
+                    INSERT INTO post_data ({', '.join(self.WEBHOOK_FIELDS)})
+                    VALUES ({', '.join('?' for _ in self.WEBHOOK_FIELDS)})
+                    ON CONFLICT (idempotency_key) WHERE idempotency_key IS NOT NULL DO NOTHING
+                ''', rows)
+                cursor.execute(f'''
+                    SELECT {self.WEBHOOK_COLUMNS}
+                    FROM post_data WHERE id > ? ORDER BY id
+                ''', (last_id,))
+                stored = [self._webhook_row(row) for row in cursor.fetchall()]
+                self._add_to_webhook_rollups(cursor, stored)
+                conn.commit()
+                return stored
+        except Exception as e:
+            logger.error(f"保存webhook数据时发生错误: {e}")
+            return None
+    
+    @staticmethod
+    def _webhook_row(row) -> Dict:
+        """
+        把post_data查询结果转换为字典（查询字段为 WEBHOOK_COLUMNS）
+        """
+        return {
+            'id': row[0],
+            'event': row[1],
+            'result': row[2],
+            'timestamp': row[3],
+            'has_legacy_screenshot': bool(row[4]),
+            'create_time': row[5],
+            'message': row[6],
+            'screenshot_hash': row[7],
+            'screenshot_width': row[8],
+            'screenshot_height': row[9],
+            'idempotency_key': row[10]
+        }
+    
+    def _add_to_webhook_rollups(self, cursor: sqlite3.Cursor, rows: List[Dict]) -> None:
+        """
+        把新写入的webhook记录累加到小时汇总表，在写入明细数据的同一事务中调用
+        
+        Args:
+            cursor: 当前事务的游标
+            rows: 新写入的webhook记录
+        """
+        counts = Counter((row['create_time'][:13] + ':00:00', row['event'], row['result'] or '') for row in rows)
+        cursor.executemany('''
+            INSERT INTO webhook_hourly_rollup (hour, event, result, event_count) VALUES (?, ?, ?, ?)
+            ON CONFLICT (hour, event, result) DO UPDATE SET event_count = event_count + excluded.event_count
+        ''', [(hour, event, result, count) for (hour, event, result), count in counts.items()])
+    
+    def _webhook_rollups_missing(self) -> bool:
+        """webhook小时汇总表为空但已经有webhook数据时返回True"""
+        try:
+            with self.get_connection() as conn:
+                cursor = conn.cursor()
+                cursor.execute('SELECT EXISTS(SELECT 1 FROM webhook_hourly_rollup)')
+                if cursor.fetchone()[0]:
+                    return False
+                cursor.execute('SELECT EXISTS(SELECT 1 FROM post_data)')
+                return bool(cursor.fetchone()[0])
+        except Exception as e:
+            logger.error(f"检查webhook汇总表时发生错误: {e}")
+            return False
+    
+    def rebuild_webhook_rollups(self) -> bool:
+        """
+        根据现有的webhook数据重新生成小时汇总表
+        已经被清理的明细数据无法恢复，只在升级旧数据库时自动调用
+        
+        Returns:
+            bool: 操作是否成功
+        """
+        try:
+            with self.get_connection() as conn:
+                cursor = conn.cursor()
+                cursor.execute('DELETE FROM webhook_hourly_rollup')
+                cursor.execute('''
+                    INSERT INTO webhook_hourly_rollup (hour, event, result, event_count)
+                    SELECT strftime('%Y-%m-%d %H:00:00', create_time), event, COALESCE(result, ''), COUNT(*)
+                    FROM post_data
+                    GROUP BY 1, 2, 3
+                ''')
+                conn.commit()
+                logger.info("webhook小时汇总表生成完成")
+                return True
+        except Exception as e:
+            logger.error(f"生成webhook汇总表时发生错误: {e}")
+            return False
+    
+    # webhook统计允许的时间粒度：小时汇总表中 hour 字段取前缀
+    WEBHOOK_STATS_BUCKETS = {
+        'hour': 'hour',
+        'day': 'substr(hour, 1, 10)',
+    }
+    
+    def get_webhook_stats(self, start_time: str, end_time: str, bucket: str = 'hour',
+                          event: Optional[str] = None, result: Optional[str] = None) -> Optional[Dict]:
+        """
+        从小时汇总表统计webhook事件数量
+        
+        Args:
+            start_time: 开始时间（含，UTC），格式为 YYYY-MM-DD HH:MM:SS
+            end_time: 结束时间（不含，UTC）
+            bucket: 时间粒度，'hour' 或 'day'
+            event: 事件名称
+            result: 结果（空字符串表示没有结果）
+            
+        Returns:
+            Optional[Dict]: {'total': 总数, 'rows': [{'bucket', 'event', 'result', 'count'}, ...]}，
+            按时间升序，失败时返回None
+        """
+        # 把开始时间向下取整到小时，使包含开始时间的那个小时也被统计
+        conditions = ['hour >= ?', 'hour < ?']
+        params: List = [start_time[:13] + ':00:00', end_time]
+        if event is not None:
+            conditions.append('event = ?')
+            params.append(event)
+        if result is not None:
+            conditions.append('result = ?')
+            params.append(result)
+        bucket_column = self.WEBHOOK_STATS_BUCKETS[bucket]
+        try:
+            with self.get_connection() as conn:
+                cursor = conn.cursor()
+                cursor.execute(f'''
+                    SELECT {bucket_column} AS bucket, event, result, SUM(event_count) AS event_count
+                    FROM webhook_hourly_rollup
+                    WHERE {' AND '.join(conditions)}
+                    GROUP BY 1, 2, 3
+                    ORDER BY 1, 2, 3
+                ''', params)
+                rows = [
+                    {'bucket': row['bucket'], 'event': row['event'], 'result': row['result'],
+                     'count': row['event_count']}
+                    for row in cursor.fetchall()
+                ]
+                return {'total': sum(row['count'] for row in rows), 'rows': rows}
+        except Exception as e:
+            logger.error(f"获取webhook统计数据时发生错误: {e}")
+            return None
+    
+    def cleanup_old_webhook_data(self, days_to_keep: int = 3, batch_size: int = 500) -> int:
+        """
+        清理指定天数之前的webhook数据
+        每批最多删除 batch_size 条并单独提交，避免长时间占用写锁阻塞webhook写入
+        
+        Args:
+            days_to_keep: 保留的天数，默认为3天
+            batch_size: 每批删除的条数
+            
+        Returns:
+            int: 删除的条数，发生错误时返回-1
+        """
+        cutoff_str = (datetime.now() - timedelta(days=days_to_keep)).strftime('%Y-%m-%d %H:%M:%S')
+        deleted_count = 0
+        try:
+            while True:
+                with self.get_connection() as conn:
+                    cursor = conn.cursor()
+                    # create_time 有索引，每批只扫描最旧的一段数据
+                    cursor.execute('''
+                        DELETE FROM post_data WHERE id IN (
+                            SELECT id FROM post_data WHERE create_time < ? ORDER BY create_time LIMIT ?
+                        )
+                    ''', (cutoff_str, batch_size))
+                    batch_count = cursor.rowcount
+                    conn.commit()
+                deleted_count += batch_count
+                if batch_count < batch_size:
+                    break
+            
+            if deleted_count > 0:
+                logger.info(f"成功清理了 {deleted_count} 条 {days_to_keep} 天前的webhook数据")
+            return deleted_count
                 
         except Exception as e:
             logger.error(f"清理旧webhook数据时发生错误: {e}")
+            return -1
+    
+    def incremental_vacuum(self, max_pages: int = 0) -> bool:
+        """
+        归还数据库文件中的空闲页
+        
+        Args:
+            max_pages: 最多归还的页数，0表示全部归还
+            
+        Returns:
+            bool: 操作是否成功
+        """
+        try:
+            with self.get_connection() as conn:
+                # incremental_vacuum 每执行一步只归还一页，execute 只会执行第一步，
+                # 用 executescript 执行到结束
+                conn.executescript(f'PRAGMA incremental_vacuum({max(0, int(max_pages))});')
+                return True
+        except Exception as e:
+            logger.error(f"清理数据库空闲页时发生错误: {e}")
             return False
 
     def get_webhook_data(self, limit: int = 100) -> List[Dict]:
         """
         获取webhook数据列表
-        在获取数据前会自动清理三天及更早之前的旧数据
+        旧数据由后台维护任务定期清理，读取时不再写入数据库
         
         Args:
             limit: 返回记录数限制
@@ -404,33 +1382,160 @@ class DatabaseManager:
         Returns:
             List[Dict]: webhook数据列表
         """
-        # 在获取数据前先清理旧数据
-        self.cleanup_old_webhook_data()
+        result = self.query_webhook_data(limit=limit)
+        return result['rows'] if result else []
+    
+    def get_screenshot_hashes(self) -> Optional[set]:
+        """
+        获取webhook数据中仍在引用的截图哈希
+        
+        Returns:
+            Optional[set]: 截图哈希集合，发生错误时返回None
+        """
+        try:
+            with self.get_connection() as conn:
+                cursor = conn.cursor()
+                cursor.execute('SELECT DISTINCT screenshot_hash FROM post_data WHERE screenshot_hash IS NOT NULL')
+                return {row[0] for row in cursor.fetchall()}
+        except Exception as e:
+            logger.error(f"获取截图哈希时发生错误: {e}")
+            return None
+    
+    def get_webhook_by_id(self, webhook_id: int) -> Optional[Dict]:
+        """
+        按id获取一条webhook数据，同时返回旧数据中保存的截图内容（screenshot字段）
         
+        Args:
+            webhook_id: 记录id
+            
+        Returns:
+            Optional[Dict]: webhook数据，不存在或发生错误时返回None
+        """
+        try:
+            with self.get_connection() as conn:
+                cursor = conn.cursor()
+                cursor.execute(f'SELECT {self.WEBHOOK_COLUMNS}, screenshot FROM post_data WHERE id = ?',
+                               (webhook_id,))
+                row = cursor.fetchone()
+                return {**self._webhook_row(row), 'screenshot': row[11]} if row else None
+        except Exception as e:
+            logger.error(f"获取webhook数据时发生错误: {e}")
+            return None
+
+    def set_webhook_screenshot(self, webhook_id: int, content_hash: str, width: int, height: int) -> bool:
+        """
+        把旧数据中的base64截图替换为截图存储中的哈希和尺寸
+
+        Args:
+            webhook_id: 记录id
+            content_hash: 截图内容哈希
+            width: 截图宽度
+            height: 截图高度
+
+        Returns:
+            bool: 操作是否成功
+        """
         try:
             with self.get_connection() as conn:
                 cursor = conn.cursor()
                 cursor.execute('''
-                    SELECT id, event, result, timestamp, screenshot, create_time, message
-                    FROM post_data
-                    ORDER BY create_time DESC
-                    LIMIT ?
-                ''', (limit,))
+                    UPDATE post_data
+                    SET screenshot_hash = ?, screenshot_width = ?, screenshot_height = ?, screenshot = NULL
+                    WHERE id = ?
+                ''', (content_hash, width, height, webhook_id))
+                conn.commit()
+                return True
+        except Exception as e:
+            logger.error(f"更新webhook截图时发生错误: {e}")
+            return False
+
+    @staticmethod
+    def _webhook_filters(event: Optional[str] = None, result: Optional[str] = None,
+                         start_time: Optional[str] = None, end_time: Optional[str] = None) -> Tuple[List[str], List]:
+        """
+        生成webhook查询的过滤条件
+        
+        Args:
+            event: 事件名称
+            result: 结果
+            start_time: 开始时间（含），格式为 YYYY-MM-DD HH:MM:SS
+            end_time: 结束时间（不含）
+            
+        Returns:
+            Tuple[List[str], List]: (条件列表, 参数列表)
+        """
+        conditions = []
+        params = []
+        if event is not None:
+            conditions.append('event = ?')
+            params.append(event)
+        if result is not None:
+            conditions.append('result = ?')
+            params.append(result)
+        if start_time:
+            conditions.append('create_time >= ?')
+            params.append(start_time)
+        if end_time:
+            conditions.append('create_time < ?')
+            params.append(end_time)
+        return conditions, params
+    
+    def query_webhook_data(self, before_id: Optional[int] = None, after_id: Optional[int] = None,
+                           event: Optional[str] = None, result: Optional[str] = None,
+                           start_time: Optional[str] = None, end_time: Optional[str] = None,
+                           limit: int = 100, count_only: bool = False) -> Optional[Dict]:
+        """
+        按id游标分页查询webhook数据
+        before_id 向更早的数据翻页，after_id 只取比该id更新的数据（用于轮询新数据），
+        两种方式返回的数据都按id从新到旧排列
+        
+        Args:
+            before_id: 只返回id小于该值的数据
+            after_id: 只返回id大于该值的数据，从最接近该id的数据开始取
+            event: 事件名称
+            result: 结果
+            start_time: 开始时间（含）
+            end_time: 结束时间（不含）
+            limit: 返回记录数限制
+            count_only: 只统计符合条件的数量，不返回数据
+            
+        Returns:
+            Optional[Dict]: {'rows': 数据列表, 'has_more': 游标方向上是否还有数据}，
+            count_only 时为 {'count': 数量}，发生错误时返回None
+        """
+        conditions, params = self._webhook_filters(event, result, start_time, end_time)
+        if before_id is not None:
+            conditions.append('id < ?')
+            params.append(before_id)
+        if after_id is not None:
+            conditions.append('id > ?')
+            params.append(after_id)
+        where = f" WHERE {' AND '.join(conditions)}" if conditions else ''
+        
+        try:
+            with self.get_connection() as conn:
+                cursor = conn.cursor()
+                if count_only:
+                    cursor.execute(f'SELECT COUNT(*) FROM post_data{where}', params)
+                    return {'count': cursor.fetchone()[0]}
                 
+                # 多取一条用于判断是否还有下一页
+                order = 'ASC' if after_id is not None and before_id is None else 'DESC'
+                cursor.execute(f'''
+                    SELECT {self.WEBHOOK_COLUMNS}
+                    FROM post_data{where}
+                    ORDER BY id {order}
+                    LIMIT ?
+                ''', params + [limit + 1])
                 rows = cursor.fetchall()
-                return [
-                    {
-                        'id': row[0],
-                        'event': row[1],
-                        'result': row[2],
-                        'timestamp': row[3],
-                        'screenshot': row[4],
-                        'create_time': row[5],
-                        'message': row[6]
-                    }
-                    for row in rows
-                ]
+                has_more = len(rows) > limit
+                rows = rows[:limit]
+                if order == 'ASC':
+                    rows.reverse()
+                return {
+                    'rows': [self._webhook_row(row) for row in rows],
+                    'has_more': has_more,
+                }
         except Exception as e:
             logger.error(f"获取webhook数据时发生错误: {e}")
-            return []
-    
\ No newline at end of file
+            return None
@@ -0,0 +1,101 @@
+"""
+webhook幂等模块
+重试或转发工具可能把同一条webhook发送多次：请求可以通过请求头携带幂等键，
+没有携带时由事件内容计算；内存中的LRU缓存以O(1)拦截最近见过的键，
+数据库唯一索引兜底拦截缓存之外（例如重启之后）的重复数据
+"""
+import hashlib
+import json
+import threading
+from collections import OrderedDict
+from typing import Dict, Optional
+
+# 默认缓存的幂等键数量
+DEFAULT_IDEMPOTENCY_CACHE_SIZE = 10000
+# 幂等键的最大长度
+MAX_IDEMPOTENCY_KEY_LENGTH = 200
+
+
+def derive_idempotency_key(payload: Dict) -> Optional[str]:
+    """
+    由事件内容计算幂等键
+    没有时间戳的数据无法区分是重试还是新的事件，不计算幂等键
+
+    Args:
+        payload: webhook数据
+
+    Returns:
+        Optional[str]: 幂等键，无法计算时返回None
+    """
+    if payload.get('timestamp') in (None, ''):
+        return None
+    # 同一时刻可能有多次拾取，只有消息也相同才视为同一条数据
+    content = json.dumps([payload.get('event'), payload.get('timestamp'), payload.get('result'),
+                          payload.get('message')], ensure_ascii=False, default=str)
+    return 'auto:' + hashlib.sha256(content.encode('utf-8')).hexdigest()
+
+
+def normalize_idempotency_key(key) -> Optional[str]:
+    """
+    规范化调用方提供的幂等键
+
+    Args:
+        key: 请求头或数据中的幂等键
+
+    Returns:
+        Optional[str]: 去除首尾空白并截断后的幂等键，为空时返回None
+    """
+    if key is None:
+        return None
+    key = str(key).strip()
+    return key[:MAX_IDEMPOTENCY_KEY_LENGTH] or None
+
+
+class IdempotencyCache:
+    """
+    有界的LRU幂等键缓存，所有操作都是O(1)
+    """
+
+    def __init__(self, capacity: int = DEFAULT_IDEMPOTENCY_CACHE_SIZE):
+        """
+        初始化缓存
+
+        Args:
+            capacity: 最多缓存的键数量
+        """
+        self.capacity = max(1, int(capacity))
+        self._keys: 'OrderedDict[str, None]' = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._keys)
+
+    def add(self, key: str) -> bool:
+        """
+        记录一个幂等键
+
+        Args:
+            key: 幂等键
+
+        Returns:
+            bool: 新的键返回True，最近已经见过返回False
+        """
+        with self._lock:
+            if key in self._keys:
+                self._keys.move_to_end(key)
+                return False
+            self._keys[key] = None
+            if len(self._keys) > self.capacity:
+                self._keys.popitem(last=False)
+            return True
+
+    def discard(self, key: str) -> None:
+        """
+        移除一个幂等键（数据写入失败时调用，使重试可以再次写入）
+
+        Args:
+            key: 幂等键
+        """
+        with self._lock:
+            self._keys.pop(key, None)
@@ -0,0 +1,174 @@
+"""
+后台日志入库模块
+按固定间隔轮询BetterGI日志目录，把新增的日志内容提前解析入库，
+API请求只需要读取已经计算好的结果；每天零点后定稿前一天的日志
+"""
+import logging
+import threading
+from datetime import datetime, timedelta
+from typing import Callable, Optional
+
+from app.infrastructure.utils import lower_current_thread_priority
+
+logger = logging.getLogger('BetterGI初始化')
+
+# 默认轮询间隔（秒）
+DEFAULT_POLL_INTERVAL = 10.0
+# 零点之后等待的秒数，给BetterGI留出切换新日志文件的时间
+ROLLOVER_DELAY_SECONDS = 5
+
+
+class LogIngestionService:
+    """
+    后台日志入库服务
+    在低优先级的守护线程中循环刷新日志数据管理器：历史文件通过文件目录表增量入库，
+    今天的日志通过增量追踪器只解析新追加的内容
+    """
+
+    def __init__(self, manager, poll_interval: float = DEFAULT_POLL_INTERVAL):
+        """
+        初始化后台入库服务
+
+        Args:
+            manager: 日志数据管理器（LogDataManager）
+            poll_interval: 轮询间隔（秒）
+        """
+        self.manager = manager
+        self.poll_interval = max(0.1, float(poll_interval))
+        self._stop_event = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def is_running(self) -> bool:
+        """后台线程是否正在运行"""
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self) -> None:
+        """
+        启动后台线程，重复调用不会启动多个线程
+        """
+        if self.is_running:
+            return
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._run, name='log-ingestion', daemon=True)
+        self._thread.start()
+        logger.info(f"后台日志入库服务已启动，轮询间隔 {self.poll_interval} 秒")
+
+    def stop(self, timeout: Optional[float] = 5.0) -> None:
+        """
+        停止后台线程
+
+        Args:
+            timeout: 等待线程退出的最长时间（秒）
+        """
+        self._stop_event.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+        self.manager.background_refresh = False
+
+    def refresh_once(self) -> bool:
+        """
+        执行一次刷新
+
+        Returns:
+            bool: 刷新成功返回True
+        """
+        try:
+            self.manager.refresh()
+            return True
+        except Exception as e:
+            logger.error(f"后台刷新日志数据时发生错误: {e}")
+            return False
+
+    def _run(self) -> None:
+        lower_current_thread_priority()
+        # 首次刷新完成后，API请求改为直接读取预先计算好的结果
+        if self.refresh_once():
+            self.manager.background_refresh = True
+        while not self._stop_event.wait(self.poll_interval):
+            if self.refresh_once():
+                self.manager.background_refresh = True
+
+
+def seconds_until_next_rollover(now: Optional[datetime] = None, delay: float = ROLLOVER_DELAY_SECONDS) -> float:
+    """
+    计算距离下一次跨天处理的秒数
+
+    Args:
+        now: 当前时间，默认为本地当前时间
+        delay: 零点之后额外等待的秒数
+
+    Returns:
+        float: 秒数
+    """
+    now = now or datetime.now()
+    next_midnight = datetime.combine(now.date() + timedelta(days=1), datetime.min.time())
+    return (next_midnight - now).total_seconds() + delay
+
+
+class DayRolloverJob:
+    """
+    跨天定时任务
+    每天零点过后调用日志数据管理器的 rollover，定稿前一天的日志并切换到新一天的文件，
+    新一天的第一个请求不需要再整体解析前一天的文件
+    """
+
+    def __init__(self, manager, clock: Callable[[], datetime] = datetime.now):
+        """
+        初始化跨天定时任务
+
+        Args:
+            manager: 日志数据管理器（LogDataManager）
+            clock: 获取当前时间的函数
+        """
+        self.manager = manager
+        self._clock = clock
+        self._stop_event = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def is_running(self) -> bool:
+        """后台线程是否正在运行"""
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self) -> None:
+        """
+        启动定时线程，重复调用不会启动多个线程
+        """
+        if self.is_running:
+            return
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._run, name='log-rollover', daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: Optional[float] = 5.0) -> None:
+        """
+        停止定时线程
+
+        Args:
+            timeout: 等待线程退出的最长时间（秒）
+        """
+        self._stop_event.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+    def run_once(self) -> bool:
+        """
+        执行一次跨天处理
+
+        Returns:
+            bool: 处理成功返回True
+        """
+        try:
+            self.manager.rollover()
+            return True
+        except Exception as e:
+            logger.error(f"跨天处理日志数据时发生错误: {e}")
+            return False
+
+    def _run(self) -> None:
+        lower_current_thread_priority()
+        while not self._stop_event.wait(seconds_until_next_rollover(self._clock())):
+            self.run_once()
@@ -0,0 +1,177 @@
+"""
+日志文件目录模块
+记录每个历史日志文件入库时的大小、修改时间和内容指纹，
+每次请求只需列一次目录即可找出新增或被修改的文件
+"""
+import os
+import hashlib
+import logging
+import threading
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Set
+
+from app.infrastructure.database import DatabaseManager
+
+logger = logging.getLogger('BetterGI初始化')
+
+LOG_FILE_PREFIX = 'better-genshin-impact'
+LOG_FILE_SUFFIX = '.log'
+# 内容指纹读取文件开头和结尾的字节数
+FINGERPRINT_BYTES = 4096
+
+
+@dataclass
+class CatalogEntry:
+    """
+    日志文件目录记录
+
+    Attributes:
+        file_name: 日志文件名
+        date_str: 日期字符串
+        size: 文件大小（字节）
+        mtime_ns: 文件修改时间（纳秒）
+        fingerprint: 文件开头和结尾内容的哈希
+        shrunk: 文件比上次入库时变小（被截断或替换），需要替换而不是追加已入库的数据
+    """
+    file_name: str
+    date_str: str
+    size: int
+    mtime_ns: int
+    fingerprint: str = ''
+    shrunk: bool = False
+
+
+def file_fingerprint(file_path: str, size: int) -> str:
+    """
+    计算文件的廉价内容指纹：文件大小 + 开头和结尾各FINGERPRINT_BYTES字节的哈希
+
+    Args:
+        file_path: 文件路径
+        size: 文件大小
+
+    Returns:
+        str: 十六进制指纹
+    """
+    digest = hashlib.sha1(str(size).encode())
+    with open(file_path, 'rb') as file:
+        digest.update(file.read(FINGERPRINT_BYTES))
+        if size > FINGERPRINT_BYTES:
+            file.seek(max(FINGERPRINT_BYTES, size - FINGERPRINT_BYTES))
+            digest.update(file.read(FINGERPRINT_BYTES))
+    return digest.hexdigest()
+
+
+class LogCatalog:
+    """
+    历史日志文件目录
+    目录表在首次使用时整体加载到内存，之后的比较只依赖 os.scandir 的stat结果，
+    文件未变化时既不读取文件内容也不查询数据库
+    """
+
+    def __init__(self, db_manager: DatabaseManager):
+        """
+        初始化日志文件目录
+
+        Args:
+            db_manager: 数据库管理器
+        """
+        self.db_manager = db_manager
+        self._entries: Optional[Dict[str, CatalogEntry]] = None
+        self._legacy_dates: Set[str] = set()
+        self._lock = threading.Lock()
+
+    def _load(self) -> Dict[str, CatalogEntry]:
+        """
+        加载目录表；旧版本数据库中已入库、但目录表中没有记录的日期视为已入库。
+        尚未定稿的临时数据不算在内：程序没有跨天运行时，前一天的文件需要重新解析才能补上停止后追加的内容并定稿
+        """
+        if self._entries is None:
+            self._entries = {
+                row['file_name']: CatalogEntry(**row)
+                for row in self.db_manager.get_log_catalog()
+            }
+            cataloged_dates = {entry.date_str for entry in self._entries.values()}
+            self._legacy_dates = set(self.db_manager.get_stored_dates(include_provisional=False)) - cataloged_dates
+        return self._entries
+
+    def scan(self, log_dir: str, exclude_dates: Set[str]) -> List[CatalogEntry]:
+        """
+        列出目录中新增或内容发生变化的日志文件
+
+        Args:
+            log_dir: 日志目录路径
+            exclude_dates: 不需要处理的日期（例如今天）
+
+        Returns:
+            List[CatalogEntry]: 需要重新解析的文件，解析入库后应调用 mark_ingested
+        """
+        changed = []
+        with self._lock:
+            entries = self._load()
+            with os.scandir(log_dir) as iterator:
+                for dir_entry in iterator:
+                    name = dir_entry.name
+                    if not (name.startswith(LOG_FILE_PREFIX) and name.endswith(LOG_FILE_SUFFIX)):
+                        continue
+                    date_str = name[len(LOG_FILE_PREFIX):-len(LOG_FILE_SUFFIX)]
+                    if date_str in exclude_dates:
+                        continue
+
+                    stat = dir_entry.stat()
+                    known = entries.get(name)
+                    if known and known.size == stat.st_size and known.mtime_ns == stat.st_mtime_ns:
+                        continue
+
+                    candidate = CatalogEntry(name, date_str, stat.st_size, stat.st_mtime_ns,
+                                             shrunk=bool(known) and stat.st_size < known.size)
+                    try:
+                        candidate.fingerprint = file_fingerprint(dir_entry.path, stat.st_size)
+                    except OSError as e:
+                        logger.error(f"读取日志文件 {name} 的指纹时发生错误: {e}")
+                        continue
+
+                    # 只有修改时间变化、内容未变，或者旧版本已经入库的文件，直接记录
+                    if (known and known.size == candidate.size and known.fingerprint == candidate.fingerprint) \
+                            or (not known and date_str in self._legacy_dates):
+                        self._save(candidate)
+                        continue
+                    changed.append(candidate)
+        return changed
+
+    def _save(self, entry: CatalogEntry) -> None:
+        if self.db_manager.upsert_log_catalog_entry(
+            entry.file_name, entry.date_str, entry.size, entry.mtime_ns, entry.fingerprint
+        ):
+            self._entries[entry.file_name] = entry
+
+    def mark_ingested(self, entry: CatalogEntry) -> None:
+        """
+        记录文件已经按当前内容入库
+
+        Args:
+            entry: scan 返回的目录记录
+        """
+        with self._lock:
+            self._load()
+            self._save(entry)
+
+    def mark_file_ingested(self, file_path: str, date_str: str) -> bool:
+        """
+        按文件当前的大小和内容记录为已入库（例如跨天时已经通过增量追踪完整入库的文件）
+
+        Args:
+            file_path: 日志文件路径
+            date_str: 日期字符串
+
+        Returns:
+            bool: 记录成功返回True
+        """
+        try:
+            stat = os.stat(file_path)
+            entry = CatalogEntry(os.path.basename(file_path), date_str, stat.st_size, stat.st_mtime_ns,
+                                 file_fingerprint(file_path, stat.st_size))
+        except OSError as e:
+            logger.error(f"读取日志文件 {file_path} 的指纹时发生错误: {e}")
+            return False
+        self.mark_ingested(entry)
+        return True
@@ -0,0 +1,334 @@
+"""
+日志分块并行解析模块
+把单个大日志文件按记录边界切成多个字节区间，分别在子进程中解析，
+再按顺序合并各区间的部分解析状态，结果与串行解析完全一致
+"""
+import os
+import re
+import logging
+from concurrent.futures import Executor
+from dataclasses import dataclass, field
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from app.domain.entities import ItemInfo, LogAnalysisResult
+from app.infrastructure.log_parser import (
+    FIRST_LINE_PATTERN, FORBIDDEN_ITEMS, LOG_PATTERN, SEGMENT_GAP_SECONDS, TASK_BEGIN_PATTERN,
+    ItemDedupIndex, ItemRow, LogRecord, parse_log_file
+)
+from app.infrastructure.utils import parse_timestamp_to_seconds
+
+logger = logging.getLogger('BetterGI初始化')
+
+# 超过该大小的日志文件才会分块并行解析
+CHUNK_PARALLEL_MIN_BYTES = 64 * 1024 * 1024
+# 单个分块的目标大小
+CHUNK_TARGET_BYTES = 32 * 1024 * 1024
+# 在目标位置之后查找分块边界的最大字节数
+BOUNDARY_SEARCH_BYTES = 1024 * 1024
+
+# 分块边界：空行之后紧接着以 [ 开头的日志头，边界位于空行的换行符上
+_BOUNDARY_PATTERN = re.compile(rb'\n(\r?\n)\[')
+# 看起来像日志头的行，空行前一行是日志头时不能作为边界（空行会被当作该记录的内容）
+_HEADER_LINE_PATTERN = re.compile(rb'\[[^]\n]+\] \[[^]\n]+\] [^\n]')
+# 物品的配置组已经确定时使用的继承标记
+_INHERITED = -1
+
+
+@dataclass
+class LogChunkState:
+    """
+    日志分块的部分解析状态
+    分块开头的配置组未知，在遇到第一个 "加载完成" 之前以符号方式记录，合并时再确定；
+    任意相邻分块的状态可以按顺序合并（满足结合律），合并全部分块即得到整个文件的状态
+
+    Attributes:
+        first_time: 第一条有效日志的时间（当日秒数）
+        time_segments: 已经结束的活动时间段，第一段的开始时间可能是 first_time
+        current_start: 尚未结束的最后一段的开始时间
+        last_time: 最后一条有效日志的时间
+        item_count: 物品统计字典
+        items: [(物品名称, 时间戳, 配置组, 继承标记)]，继承标记为_INHERITED表示配置组已确定，
+               否则表示该物品继承分块开头的配置组，数值为此前出现的 "执行结束" 记录数量
+        task_known: 分块内是否出现过 "加载完成"，之后的配置组都可以确定
+        current_task: task_known 为True时当前的配置组
+        task_end_details: task_known 为False时出现的包含 "执行结束" 的日志内容
+        spilled: 最后一条记录是否越过了分块末尾（边界选择有误，需要回退到串行解析）
+    """
+    first_time: Optional[float] = None
+    time_segments: List[Tuple[float, float]] = field(default_factory=list)
+    current_start: Optional[float] = None
+    last_time: Optional[float] = None
+    item_count: Dict[str, int] = field(default_factory=dict)
+    items: List[Tuple[str, str, Optional[str], int]] = field(default_factory=list)
+    task_known: bool = False
+    current_task: Optional[str] = None
+    task_end_details: List[str] = field(default_factory=list)
+    spilled: bool = False
+
+    def consume(self, records: Iterable[LogRecord]) -> None:
+        """
+        按顺序处理分块内的日志记录，规则与 LogParseState.consume 相同
+
+        Args:
+            records: 日志记录
+        """
+        for record in records:
+            timestamp = record[0]
+            details = record[3].strip()
+
+            if any(keyword in details for keyword in FORBIDDEN_ITEMS):
+                continue
+
+            task_matches = TASK_BEGIN_PATTERN.match(details)
+            if task_matches:
+                self.task_known = True
+                self.current_task = task_matches.group(1)
+            if self.task_known:
+                if self.current_task and f'配置组 "{self.current_task}" 执行结束' in details:
+                    self.current_task = None
+            elif '执行结束' in details:
+                self.task_end_details.append(details)
+
+            try:
+                current_time = parse_timestamp_to_seconds(timestamp)
+            except Exception as e:
+                logger.error(f"解析时间戳{timestamp}时候发生错误:{e}")
+                logger.error(f'涉及的完整匹配字符串：{record}')
+                continue
+
+            if '交互或拾取' in details:
+                item_name = details.split('：')[1].strip('"')
+                self.item_count[item_name] = self.item_count.get(item_name, 0) + 1
+                if self.task_known:
+                    self.items.append((item_name, timestamp, self.current_task, _INHERITED))
+                else:
+                    self.items.append((item_name, timestamp, None, len(self.task_end_details)))
+
+            if self.last_time is None:
+                self.first_time = current_time
+                self.current_start = current_time
+            elif current_time - self.last_time > SEGMENT_GAP_SECONDS:
+                self.time_segments.append((self.current_start, self.last_time))
+                self.current_start = current_time
+
+            self.last_time = current_time
+
+    @staticmethod
+    def _task_end_index(task: Optional[str], task_end_details: List[str]) -> int:
+        """返回继承的配置组被清空的位置，未被清空时返回列表长度"""
+        if task:
+            marker = f'配置组 "{task}" 执行结束'
+            for index, details in enumerate(task_end_details):
+                if marker in details:
+                    return index
+        return len(task_end_details)
+
+    def _resolve_items(self, task: Optional[str]) -> None:
+        """用已知的开头配置组确定所有继承配置组的物品"""
+        end_index = self._task_end_index(task, self.task_end_details)
+        self.items = [
+            (name, timestamp, group, _INHERITED) if inherited == _INHERITED
+            else (name, timestamp, task if inherited <= end_index else None, _INHERITED)
+            for name, timestamp, group, inherited in self.items
+        ]
+
+    def merge(self, other: 'LogChunkState') -> 'LogChunkState':
+        """
+        把紧随其后的分块状态合并进来
+
+        Args:
+            other: 紧接在当前分块之后的分块状态
+
+        Returns:
+            LogChunkState: 合并后的状态（即self）
+        """
+        # 合并配置组：后一分块开头的配置组就是前一分块结束时的配置组
+        if self.task_known:
+            other_task = self.current_task
+            if other_task and self._task_end_index(other_task, other.task_end_details) < len(other.task_end_details):
+                other_task = None
+            other._resolve_items(self.current_task)
+            if not other.task_known:
+                self.current_task = other_task
+            else:
+                self.current_task = other.current_task
+        else:
+            offset = len(self.task_end_details)
+            other.items = [
+                item if item[3] == _INHERITED else (item[0], item[1], item[2], item[3] + offset)
+                for item in other.items
+            ]
+            self.task_end_details.extend(other.task_end_details)
+            self.task_known = other.task_known
+            self.current_task = other.current_task
+
+        for name, count in other.item_count.items():
+            self.item_count[name] = self.item_count.get(name, 0) + count
+        self.items.extend(other.items)
+        self.spilled = self.spilled or other.spilled
+
+        # 合并时间段：两段之间的间隔决定后一分块的第一段是否延续前一分块的最后一段
+        if other.last_time is None:
+            return self
+        if self.last_time is None:
+            self.first_time = other.first_time
+            self.time_segments = other.time_segments
+            self.current_start = other.current_start
+        elif other.first_time - self.last_time > SEGMENT_GAP_SECONDS:
+            self.time_segments.append((self.current_start, self.last_time))
+            self.time_segments.extend(other.time_segments)
+            self.current_start = other.current_start
+        elif other.time_segments:
+            self.time_segments.append((self.current_start, other.time_segments[0][1]))
+            self.time_segments.extend(other.time_segments[1:])
+            self.current_start = other.current_start
+        self.last_time = other.last_time
+        return self
+
+    def to_result(self, date_str: str) -> LogAnalysisResult:
+        """
+        生成整个文件的分析结果（文件开头没有配置组）
+
+        Args:
+            date_str: 日期字符串
+
+        Returns:
+            LogAnalysisResult: 与串行解析一致的分析结果
+        """
+        dedup_index = ItemDedupIndex(max_dates=1)
+        items = []
+        for name, timestamp, group, inherited in self.items:
+            task = group if inherited == _INHERITED else None
+            if dedup_index.add(name, timestamp, date_str, task):
+                items.append(ItemInfo(
+                    name=name,
+                    timestamp=timestamp,
+                    date=date_str,
+                    config_group=str(task) if task else None
+                ))
+
+        duration = sum(int(end - start) for start, end in self.time_segments)
+        if self.current_start is not None and self.last_time is not None:
+            duration += int(self.last_time - self.current_start)
+
+        return LogAnalysisResult(item_count=dict(self.item_count), duration=duration, items=items)
+
+
+def _normalize_newlines(data: bytes) -> str:
+    return data.decode('utf-8').replace('\r\n', '\n').replace('\r', '\n')
+
+
+def find_chunk_boundaries(file_path: str, chunk_count: int) -> List[int]:
+    """
+    把文件切成大约chunk_count个区间，边界对齐到日志记录开头
+
+    Args:
+        file_path: 日志文件路径
+        chunk_count: 期望的分块数量
+
+    Returns:
+        List[int]: 递增的字节偏移列表，首项为0，末项为文件大小
+    """
+    file_size = os.path.getsize(file_path)
+    boundaries = [0]
+    with open(file_path, 'rb') as file:
+        for i in range(1, chunk_count):
+            target = max(file_size * i // chunk_count, boundaries[-1] + 1)
+            file.seek(target)
+            window = file.read(BOUNDARY_SEARCH_BYTES)
+            for match in _BOUNDARY_PATTERN.finditer(window):
+                # 空行前一行必须完整落在窗口内，且不能是日志头
+                line_start = window.rfind(b'\n', 0, match.start()) + 1
+                if line_start == 0 or _HEADER_LINE_PATTERN.match(window, line_start, match.start()):
+                    continue
+                boundaries.append(target + match.start(1))
+                break
+    boundaries.append(file_size)
+    return boundaries
+
+
+def parse_log_chunk(file_path: str, start: int, end: int) -> LogChunkState:
+    """
+    解析文件中[start, end)区间内开始的日志记录，可在子进程中执行
+
+    Args:
+        file_path: 日志文件路径
+        start: 区间开始的字节偏移（0或者分块边界）
+        end: 区间结束的字节偏移
+
+    Returns:
+        LogChunkState: 分块的部分解析状态
+    """
+    with open(file_path, 'rb') as file:
+        file.seek(start)
+        data = file.read(end - start)
+        # 记录是否匹配取决于其后两行，需要多读两行
+        lookahead = b''
+        while lookahead.count(b'\n') < 2:
+            more = file.read(4096)
+            if not more:
+                break
+            lookahead += more
+        if lookahead.count(b'\n') >= 2:
+            lookahead = lookahead[:lookahead.index(b'\n', lookahead.index(b'\n') + 1) + 1]
+
+    text = _normalize_newlines(data)
+    content = text + _normalize_newlines(lookahead)
+    limit = len(text)
+
+    def records():
+        if start == 0:
+            first_line_match = FIRST_LINE_PATTERN.match(content)
+            if first_line_match:
+                yield first_line_match.groups()
+        pos = 0
+        while True:
+            match = LOG_PATTERN.search(content, pos)
+            if match is None or match.start() >= limit:
+                break
+            yield match.groups()
+            pos = match.end()
+        state.spilled = pos > limit
+
+    state = LogChunkState()
+    state.consume(records())
+    return state
+
+
+def parse_log_file_chunked(file_path: str, date_str: str, executor: Executor,
+                           chunk_count: int) -> Optional[Tuple[int, List[ItemRow]]]:
+    """
+    分块并行解析单个日志文件，返回值与 parse_log_file 相同
+
+    Args:
+        file_path: 日志文件路径
+        date_str: 日期字符串
+        executor: 执行分块解析的进程池
+        chunk_count: 最少的分块数量（文件较大时会按CHUNK_TARGET_BYTES进一步细分）
+
+    Returns:
+        Optional[Tuple[int, List[ItemRow]]]: (持续时间, 物品记录列表)，读取失败时返回None
+    """
+    try:
+        file_size = os.path.getsize(file_path)
+        chunk_count = max(chunk_count, -(-file_size // CHUNK_TARGET_BYTES))
+        boundaries = find_chunk_boundaries(file_path, chunk_count)
+        futures = [
+            executor.submit(parse_log_chunk, file_path, start, end)
+            for start, end in zip(boundaries, boundaries[1:])
+        ]
+        state = LogChunkState()
+        for future in futures:
+            state.merge(future.result())
+    except Exception as e:
+        logger.error(f"分块解析文件 {file_path} 时发生错误: {e}")
+        return None
+
+    if state.spilled:
+        logger.warning(f"文件 {file_path} 的分块边界不在记录开头，改为串行解析")
+        return parse_log_file(file_path, date_str)
+
+    result = state.to_result(date_str)
+    if not any(name not in FORBIDDEN_ITEMS for name in result.item_count):
+        return result.duration, []
+    return result.duration, [(item.name, item.timestamp, item.config_group) for item in result.items]
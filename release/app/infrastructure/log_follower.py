@@ -0,0 +1,216 @@
+"""
+日志增量追踪模块
+记录已读取的字节偏移和解析状态，每次只解析新追加的完整日志记录
+"""
+import os
+import json
+import hashlib
+import logging
+import threading
+from typing import Callable, Optional
+
+from app.infrastructure.log_parser import LogParseState, LogRecordSplitter
+from app.infrastructure.database import DatabaseManager
+
+logger = logging.getLogger('BetterGI初始化')
+
+# 用于识别文件轮转/替换的文件头字节数
+HEAD_FINGERPRINT_BYTES = 4096
+# 每次读取的字节数
+READ_CHUNK_BYTES = 1024 * 1024
+
+
+def _normalize_newlines(text: str) -> str:
+    """与文本模式读取保持一致，统一换行符为\\n"""
+    return text.replace('\r\n', '\n').replace('\r', '\n')
+
+
+class LogFileFollower:
+    """
+    单个日志文件的增量追踪器
+    检查点（字节偏移、文件头指纹、未确定的剩余文本和标量解析状态）持久化到数据库，
+    程序重启后从上次的位置继续，物品列表从数据库的items表恢复；文件被截断或替换时从头重新解析
+    """
+
+    def __init__(self, file_path: str, date_str: str, db_manager: DatabaseManager,
+                 is_new_item: Callable[[str, str, str, Optional[str]], bool],
+                 on_reset: Optional[Callable[[str], None]] = None):
+        """
+        初始化增量追踪器
+
+        Args:
+            file_path: 日志文件路径
+            date_str: 日志日期字符串
+            db_manager: 用于保存检查点的数据库管理器
+            is_new_item: 物品去重回调，参见 LogParseState.consume
+            on_reset: 重新从头解析前的回调，参数为日期字符串
+        """
+        self.file_path = file_path
+        self.file_name = os.path.basename(file_path)
+        self.date_str = date_str
+        self.db_manager = db_manager
+        self._is_new_item = is_new_item
+        self._on_reset = on_reset
+        self._lock = threading.Lock()
+
+        self.offset = 0
+        self.head_size = 0
+        self.head_hash = ''
+        self.splitter = LogRecordSplitter()
+        self.state = LogParseState(date_str)
+        # 上次保存检查点之后是否读取过新内容
+        self._dirty = False
+        # 解析状态每变化一次加一，调用方据此判断是否需要重新生成结果
+        self.version = 0
+        self._restore_checkpoint()
+
+    def _restore_checkpoint(self):
+        """从数据库恢复检查点"""
+        checkpoint = self.db_manager.get_log_checkpoint(self.file_name)
+        if not checkpoint:
+            return
+        try:
+            saved = json.loads(checkpoint['state'])
+            items = self.db_manager.get_log_items(self.date_str)
+            if items is None:
+                raise RuntimeError('读取已入库的物品记录失败')
+            self.state = LogParseState.from_dict(saved['parse_state'], items)
+            self.splitter = LogRecordSplitter(saved['pending'], saved['first_line_done'])
+            self.offset = checkpoint['byte_offset']
+            self.head_size = checkpoint['head_size']
+            self.head_hash = checkpoint['head_hash']
+        except Exception as e:
+            logger.error(f"恢复日志检查点 {self.file_name} 时发生错误: {e}")
+            self._reset()
+            return
+
+        # 让去重记录与恢复的物品保持一致
+        for item in self.state.items:
+            self._is_new_item(item.name, item.timestamp, item.date, item.config_group)
+        logger.info(f"已从检查点恢复 {self.file_name}，偏移 {self.offset} 字节")
+
+    def save_checkpoint(self) -> bool:
+        """
+        保存检查点到数据库，上次保存之后没有读取新内容时直接返回
+        检查点不包含物品列表，调用方需要先把新增的物品写入数据库
+
+        Returns:
+            bool: 保存成功（或不需要保存）返回True
+        """
+        with self._lock:
+            if not self._dirty:
+                return True
+            state = json.dumps({
+                'parse_state': self.state.to_dict(),
+                'pending': self.splitter.pending,
+                'first_line_done': self.splitter.first_line_done,
+            }, ensure_ascii=False)
+            if not self.db_manager.save_log_checkpoint(
+                self.file_name, self.offset, self.head_size, self.head_hash, state
+            ):
+                return False
+            self._dirty = False
+            return True
+
+    def _reset(self):
+        """丢弃当前进度，下次从文件开头解析"""
+        self.offset = 0
+        self.head_size = 0
+        self.head_hash = ''
+        self.splitter = LogRecordSplitter()
+        self.state = LogParseState(self.date_str)
+        self._dirty = True
+        self.version += 1
+        if self._on_reset:
+            self._on_reset(self.date_str)
+
+    def _check_head(self, file, file_size: int) -> None:
+        """
+        校验文件头指纹，发现文件被截断或替换时重置进度，并按需扩展指纹长度
+        """
+        if file_size < self.offset:
+            logger.info(f"检测到 {self.file_name} 被截断，重新解析")
+            self._reset()
+        elif self.head_size:
+            file.seek(0)
+            if hashlib.sha1(file.read(self.head_size)).hexdigest() != self.head_hash:
+                logger.info(f"检测到 {self.file_name} 被替换，重新解析")
+                self._reset()
+
+        if self.head_size < HEAD_FINGERPRINT_BYTES and file_size > self.head_size:
+            file.seek(0)
+            head = file.read(HEAD_FINGERPRINT_BYTES)
+            self.head_size = len(head)
+            self.head_hash = hashlib.sha1(head).hexdigest()
+            self._dirty = True
+
+    def poll(self, checkpoint: bool = True) -> LogParseState:
+        """
+        读取文件新追加的完整行并更新解析状态
+
+        Args:
+            checkpoint: 读取后是否立即保存检查点；调用方需要先把新增物品写入数据库时传False，
+                写入后再调用 save_checkpoint
+
+        Returns:
+            LogParseState: 当前的解析状态（不要在外部修改）
+        """
+        with self._lock:
+            try:
+                file_size = os.path.getsize(self.file_path)
+            except OSError:
+                return self.state
+
+            if file_size == self.offset and self.head_size >= min(file_size, HEAD_FINGERPRINT_BYTES):
+                return self.state
+
+            try:
+                with open(self.file_path, 'rb') as file:
+                    self._check_head(file, file_size)
+                    file.seek(self.offset)
+                    remaining = b''
+                    while True:
+                        chunk = file.read(READ_CHUNK_BYTES)
+                        if not chunk:
+                            break
+                        data = remaining + chunk
+                        # 只处理完整的行，不完整的行留到下次读取
+                        cut = data.rfind(b'\n') + 1
+                        remaining = data[cut:]
+                        if cut:
+                            text = _normalize_newlines(data[:cut].decode('utf-8'))
+                            self.state.consume(self.splitter.feed(text), self._is_new_item)
+                            self.offset += cut
+                            self._dirty = True
+                            self.version += 1
+            except Exception as e:
+                # 解析中途出错时状态可能不完整，丢弃进度以免重复统计
+                logger.error(f"增量读取文件 {self.file_path} 时发生错误: {e}")
+                self._reset()
+                return self.state
+
+        if checkpoint:
+            self.save_checkpoint()
+        return self.state
+
+    def finish(self) -> LogParseState:
+        """
+        文件不会再追加内容时调用（例如跨天后），读取剩余内容并按文件末尾语义处理
+
+        Returns:
+            LogParseState: 最终的解析状态
+        """
+        self.poll(checkpoint=False)
+        with self._lock:
+            try:
+                with open(self.file_path, 'rb') as file:
+                    file.seek(self.offset)
+                    tail = file.read()
+                if tail:
+                    self.state.consume(self.splitter.feed(_normalize_newlines(tail.decode('utf-8'))), self._is_new_item)
+                    self.offset += len(tail)
+                self.state.consume(self.splitter.finish(), self._is_new_item)
+                self.version += 1
+            except Exception as e:
+                logger.error(f"结束追踪文件 {self.file_path} 时发生错误: {e}")
+            return self.state
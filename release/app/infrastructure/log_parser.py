@@ -0,0 +1,384 @@
+"""
+日志解析模块
+日志记录切分与解析状态机，供全量解析和增量追踪共用
+"""
+import re
+import sys
+import logging
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Set, Tuple
+
+from app.domain.entities import ItemInfo, LogAnalysisResult
+from app.infrastructure.utils import parse_timestamp_to_seconds
+
+logger = logging.getLogger('BetterGI初始化')
+
+# 需要过滤的物品列表
+FORBIDDEN_ITEMS = ['调查', '直接拾取']
+
+# 预编译正则表达式（方括号内容不跨行，保证每条记录只依赖于其后两行文本）
+FIRST_LINE_PATTERN = re.compile(r'^\[([^]\n]+)\] \[([^]\n]+)\] ([^\n]+)\n?([^\n[]*)\n')  # 匹配日志第一行
+LOG_PATTERN = re.compile(r'\n\[([^]\n]+)\] \[([^]\n]+)\] ([^\n]+)\n?([^\n[]*)\n')  # 匹配日志行
+TASK_BEGIN_PATTERN = re.compile(r'^配置组 "([^"]*)" 加载完成，共(\d+)个脚本，开始执行$')  # 匹配配置组开始
+
+# 相邻两条日志间隔超过该秒数时，视为新的活动时间段
+SEGMENT_GAP_SECONDS = 300
+
+# 流式读取日志文件时每次读取的字符数
+READ_CHUNK_CHARS = 1024 * 1024
+
+# 日志记录：(时间戳, 日志级别, 类名, 日志内容文本)
+LogRecord = Tuple[str, str, str, str]
+# 物品记录：(物品名称, 时间戳, 配置组)
+ItemRow = Tuple[str, str, Optional[str]]
+
+
+# 物品去重索引默认保留的日期数量
+DEDUP_MAX_DATES = 7
+
+
+class ItemDedupIndex:
+    """
+    物品去重索引
+    按日期分组保存 (物品名称, 时间戳, 配置组) 键，查询和插入均为O(1)；
+    只保留最近使用的若干个日期，避免长时间运行后无限增长
+    """
+
+    def __init__(self, max_dates: int = DEDUP_MAX_DATES):
+        """
+        初始化去重索引
+
+        Args:
+            max_dates: 最多保留的日期数量，超出时淘汰最久未使用的日期
+        """
+        self.max_dates = max_dates
+        self._dates: 'OrderedDict[str, Set[Tuple[str, str, Optional[str]]]]' = OrderedDict()
+
+    def add(self, item_name: str, timestamp: str, date_str: str, config_group: Optional[str]) -> bool:
+        """
+        记录一条物品拾取
+
+        Args:
+            item_name: 物品名称
+            timestamp: 拾取时间
+            date_str: 日期字符串
+            config_group: 归属配置组
+
+        Returns:
+            bool: 首次出现返回True，重复记录返回False
+        """
+        keys = self._dates.get(date_str)
+        if keys is None:
+            keys = self._dates[date_str] = set()
+            while len(self._dates) > self.max_dates:
+                self._dates.popitem(last=False)
+        else:
+            self._dates.move_to_end(date_str)
+
+        # 物品名和配置组重复度很高，驻留后所有键共享同一个字符串对象
+        key = (sys.intern(item_name), timestamp, sys.intern(config_group) if config_group else None)
+        if key in keys:
+            return False
+        keys.add(key)
+        return True
+
+    def reset(self, date_str: str) -> None:
+        """
+        清空指定日期的去重记录
+
+        Args:
+            date_str: 日期字符串
+        """
+        self._dates.pop(date_str, None)
+
+    def __len__(self) -> int:
+        return sum(len(keys) for keys in self._dates.values())
+
+
+class LogRecordSplitter:
+    """
+    增量日志记录切分器
+    接收任意切分的文本片段，只输出已经完整确定的日志记录，
+    结果与对整段文本执行 FIRST_LINE_PATTERN + LOG_PATTERN.findall 一致
+    """
+
+    def __init__(self, pending: str = '', first_line_done: bool = False):
+        """
+        初始化切分器
+
+        Args:
+            pending: 上次尚未确定的剩余文本
+            first_line_done: 文件首行是否已经处理
+        """
+        self.pending = pending
+        self.first_line_done = first_line_done
+
+    def feed(self, text: str) -> List[LogRecord]:
+        """
+        追加文本并返回已经确定的日志记录
+
+        Args:
+            text: 新追加的文本（换行符已统一为\\n）
+
+        Returns:
+            List[LogRecord]: 已确定的日志记录列表
+        """
+        self.pending += text
+        return self._drain(final=False)
+
+    def finish(self) -> List[LogRecord]:
+        """
+        文件结束时调用，按文件末尾语义处理剩余文本
+
+        Returns:
+            List[LogRecord]: 剩余的日志记录列表
+        """
+        return self._drain(final=True)
+
+    def _drain(self, final: bool) -> List[LogRecord]:
+        buffer = self.pending
+        records = []
+
+        # 首行记录只取决于文本开头的两行
+        if not self.first_line_done:
+            if not final and buffer.count('\n') < 2:
+                return records
+            first_line_match = FIRST_LINE_PATTERN.match(buffer)
+            if first_line_match:
+                records.append(first_line_match.groups())
+            self.first_line_done = True
+
+        # 一条记录是否匹配只取决于其起始换行符之后的两行，
+        # 因此起始位置在倒数第二个换行符之前的候选都已经可以确定
+        if final:
+            boundary = len(buffer)
+        else:
+            last_newline = buffer.rfind('\n')
+            boundary = buffer.rfind('\n', 0, last_newline) if last_newline > 0 else -1
+            if boundary < 0:
+                return records
+
+        pos = 0
+        while True:
+            match = LOG_PATTERN.search(buffer, pos)
+            if match is None or match.start() >= boundary:
+                break
+            records.append(match.groups())
+            pos = match.end()
+
+        self.pending = '' if final else buffer[max(pos, boundary):]
+        return records
+
+
+def split_log_records(log_content: str) -> List[LogRecord]:
+    """
+    将完整的日志文本切分为日志记录
+
+    Args:
+        log_content: 日志文件内容
+
+    Returns:
+        List[LogRecord]: 日志记录列表
+    """
+    splitter = LogRecordSplitter()
+    return splitter.feed(log_content) + splitter.finish()
+
+
+def iter_log_records(file_path: str, chunk_size: int = READ_CHUNK_CHARS) -> Iterator[LogRecord]:
+    """
+    按固定大小分块读取日志文件，逐条产出日志记录
+    内存占用只与块大小有关，与日志文件大小无关
+
+    Args:
+        file_path: 日志文件路径
+        chunk_size: 每次读取的字符数
+
+    Yields:
+        LogRecord: 日志记录
+    """
+    splitter = LogRecordSplitter()
+    with open(file_path, 'r', encoding='utf-8') as file:
+        while True:
+            chunk = file.read(chunk_size)
+            if not chunk:
+                break
+            yield from splitter.feed(chunk)
+    yield from splitter.finish()
+
+
+@dataclass
+class LogParseState:
+    """
+    单个日志文件的解析状态
+    可以分多次输入日志记录，随时得到截至当前的统计结果
+
+    Attributes:
+        date_str: 日志日期
+        current_task: 当前运行的配置组
+        current_start: 当前活动时间段的开始时间（当日秒数）
+        last_time: 最后一条日志的时间（当日秒数）
+        time_segments: 已经结束的活动时间段 [(start, end), ...]
+        item_count: 物品统计字典
+        items: 物品信息列表
+    """
+    date_str: str
+    current_task: Optional[str] = None
+    current_start: Optional[float] = None
+    last_time: Optional[float] = None
+    time_segments: List[Tuple[float, float]] = field(default_factory=list)
+    item_count: Dict[str, int] = field(default_factory=dict)
+    items: List[ItemInfo] = field(default_factory=list)
+
+    def consume(self, records: Iterable[LogRecord],
+                is_new_item: Callable[[str, str, str, Optional[str]], bool]) -> None:
+        """
+        按顺序处理日志记录，更新解析状态
+
+        Args:
+            records: 日志记录
+            is_new_item: 判断物品记录是否首次出现的回调，参数为(物品名称, 时间戳, 日期, 配置组)
+        """
+        for record in records:
+            timestamp = record[0]  # 时间戳
+            details = record[3].strip()  # 日志内容文本
+
+            # 过滤禁用的关键词
+            if any(keyword in details for keyword in FORBIDDEN_ITEMS):
+                continue
+
+            # 匹配配置组开始
+            task_matches = TASK_BEGIN_PATTERN.match(details)
+            if task_matches:
+                self.current_task = task_matches.group(1)
+            # 匹配配置组结束
+            if self.current_task and f'配置组 "{self.current_task}" 执行结束' in details:
+                self.current_task = None
+
+            # 转换时间戳
+            try:
+                current_time = parse_timestamp_to_seconds(timestamp)
+            except Exception as e:
+                logger.error(f"解析时间戳{timestamp}时候发生错误:{e}")
+                logger.error(f'涉及的完整匹配字符串：{record}')
+                continue
+
+            # 提取拾取内容
+            if '交互或拾取' in details:
+                item_name = details.split('：')[1].strip('"')
+                self.item_count[item_name] = self.item_count.get(item_name, 0) + 1
+
+                # 检查是否存在匹配的行
+                if is_new_item(item_name, timestamp, self.date_str, self.current_task):
+                    self.items.append(ItemInfo(
+                        name=item_name,
+                        timestamp=timestamp,
+                        date=self.date_str,
+                        config_group=str(self.current_task) if self.current_task else None
+                    ))
+
+            # 处理时间段
+            if self.last_time is None:
+                # 第一个事件
+                self.current_start = current_time
+            elif current_time - self.last_time > SEGMENT_GAP_SECONDS:
+                # 间隔过大（超过5分钟），结束当前段
+                if self.current_start is not None:
+                    self.time_segments.append((self.current_start, self.last_time))
+                self.current_start = current_time
+
+            self.last_time = current_time
+
+    @property
+    def duration(self) -> int:
+        """
+        截至当前的总持续时间（秒），包含尚未结束的最后一段
+        """
+        duration = sum(int(end - start) for start, end in self.time_segments)
+        if self.current_start is not None and self.last_time is not None:
+            duration += int(self.last_time - self.current_start)
+        return duration
+
+    def to_result(self) -> LogAnalysisResult:
+        """
+        生成当前状态对应的分析结果
+
+        Returns:
+            LogAnalysisResult: 分析结果对象
+        """
+        return LogAnalysisResult(
+            item_count=dict(self.item_count),
+            duration=self.duration,
+            items=list(self.items)
+        )
+
+    def to_dict(self) -> Dict[str, Any]:
+        """
+        序列化为可以JSON存储的字典
+        只包含标量状态和按物品名称统计的数量，大小不随物品记录数增长；
+        物品列表已经写入数据库的items表，恢复时从那里读取
+
+        Returns:
+            Dict[str, Any]: 状态字典
+        """
+        return {
+            'date_str': self.date_str,
+            'current_task': self.current_task,
+            'current_start': self.current_start,
+            'last_time': self.last_time,
+            'time_segments': [list(segment) for segment in self.time_segments],
+            'item_count': self.item_count,
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any], items: Iterable[ItemRow] = ()) -> 'LogParseState':
+        """
+        从状态字典恢复解析状态
+
+        Args:
+            data: to_dict生成的状态字典
+            items: 已经写入数据库的物品记录 [(物品名称, 时间戳, 配置组), ...]
+
+        Returns:
+            LogParseState: 解析状态
+        """
+        date_str = data['date_str']
+        return cls(
+            date_str=date_str,
+            current_task=data.get('current_task'),
+            current_start=data.get('current_start'),
+            last_time=data.get('last_time'),
+            time_segments=[(start, end) for start, end in data.get('time_segments', [])],
+            item_count=dict(data.get('item_count', {})),
+            items=[
+                ItemInfo(name=name, timestamp=timestamp, date=date_str, config_group=config_group)
+                for name, timestamp, config_group in items
+            ],
+        )
+
+
+def parse_log_file(file_path: str, date_str: str) -> Optional[Tuple[int, List[ItemRow]]]:
+    """
+    解析单个日志文件并返回紧凑的结果，可在子进程中执行
+
+    Args:
+        file_path: 日志文件路径
+        date_str: 日期字符串
+
+    Returns:
+        Optional[Tuple[int, List[ItemRow]]]: (持续时间, 物品记录列表)，读取失败时返回None
+    """
+    try:
+        state = LogParseState(date_str)
+        state.consume(iter_log_records(file_path), ItemDedupIndex(max_dates=1).add)
+    except FileNotFoundError:
+        logger.error(f"文件未找到: {file_path}")
+        return None
+    except Exception as e:
+        logger.error(f"读取文件 {file_path} 时发生未知错误: {e}")
+        return None
+
+    # 过滤掉不需要的物品，只返回有物品的日志
+    if not any(name not in FORBIDDEN_ITEMS for name in state.item_count):
+        return state.duration, []
+    return state.duration, [(item.name, item.timestamp, item.config_group) for item in state.items]
@@ -0,0 +1,104 @@
+"""
+数据库维护模块
+在后台按固定间隔清理过期的webhook数据，并归还删除后产生的空闲页，
+读取接口不再承担清理工作
+"""
+import logging
+import threading
+from typing import Optional
+
+from app.infrastructure.utils import lower_current_thread_priority
+
+logger = logging.getLogger('BetterGI初始化')
+
+# 默认维护间隔（秒）
+DEFAULT_MAINTENANCE_INTERVAL = 3600.0
+# 默认webhook数据保留天数
+DEFAULT_RETENTION_DAYS = 3
+# 默认每批删除的条数
+DEFAULT_DELETE_BATCH_SIZE = 500
+
+
+class MaintenanceScheduler:
+    """
+    数据库维护定时任务
+    启动后立即执行一次，之后每隔 interval 秒执行一次：分批删除过期webhook数据，
+    有数据被删除时再执行增量清理，并删除不再被引用的截图文件
+    """
+
+    def __init__(self, db_manager, interval: float = DEFAULT_MAINTENANCE_INTERVAL,
+                 retention_days: int = DEFAULT_RETENTION_DAYS,
+                 batch_size: int = DEFAULT_DELETE_BATCH_SIZE, screenshot_store=None):
+        """
+        初始化维护任务
+
+        Args:
+            db_manager: 数据库管理器（DatabaseManager）
+            interval: 维护间隔（秒）
+            retention_days: webhook数据保留天数，0表示永久保留
+            batch_size: 每批删除的条数
+            screenshot_store: 截图存储（ScreenshotStore），提供时同时清理截图文件
+        """
+        self.db_manager = db_manager
+        self.interval = max(1.0, float(interval))
+        self.retention_days = max(0, int(retention_days))
+        self.batch_size = max(1, int(batch_size))
+        self.screenshot_store = screenshot_store
+        self._stop_event = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def is_running(self) -> bool:
+        """后台线程是否正在运行"""
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self) -> None:
+        """
+        启动维护线程，重复调用不会启动多个线程
+        """
+        if self.is_running:
+            return
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._run, name='db-maintenance', daemon=True)
+        self._thread.start()
+        logger.info(f"数据库维护任务已启动，间隔 {self.interval} 秒，webhook数据保留 {self.retention_days} 天")
+
+    def stop(self, timeout: Optional[float] = 5.0) -> None:
+        """
+        停止维护线程
+
+        Args:
+            timeout: 等待线程退出的最长时间（秒）
+        """
+        self._stop_event.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+    def run_once(self) -> int:
+        """
+        执行一次维护
+
+        Returns:
+            int: 删除的webhook数据条数，发生错误时返回-1
+        """
+        if self.retention_days == 0:
+            return 0
+        try:
+            deleted_count = self.db_manager.cleanup_old_webhook_data(self.retention_days, self.batch_size)
+            if deleted_count > 0:
+                self.db_manager.incremental_vacuum()
+                if self.screenshot_store is not None:
+                    referenced = self.db_manager.get_screenshot_hashes()
+                    if referenced is not None:
+                        self.screenshot_store.prune(referenced)
+            return deleted_count
+        except Exception as e:
+            logger.error(f"数据库维护时发生错误: {e}")
+            return -1
+
+    def _run(self) -> None:
+        lower_current_thread_priority()
+        self.run_once()
+        while not self._stop_event.wait(self.interval):
+            self.run_once()
@@ -3,23 +3,115 @@
 数据读取、解析逻辑（对应"db数据解释/读取"）
 """
 import os
-import re
 import logging
-from typing import List, Dict, Optional, Tuple
+import threading
+from dataclasses import dataclass
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from types import MappingProxyType
+from typing import Iterator, List, Dict, Mapping, Optional, Tuple
 from datetime import date
 from app.domain.entities import LogEntry, ItemInfo, DurationInfo, LogAnalysisResult, ConfigGroup
-from app.infrastructure.utils import parse_timestamp_to_seconds
 from app.infrastructure.database import DatabaseManager
+from app.infrastructure.log_catalog import LogCatalog
+from app.infrastructure.log_chunks import CHUNK_PARALLEL_MIN_BYTES, parse_log_file_chunked
+from app.infrastructure.log_follower import LogFileFollower
+from app.infrastructure.log_parser import (
+    FORBIDDEN_ITEMS, FIRST_LINE_PATTERN, LOG_PATTERN, TASK_BEGIN_PATTERN,
+    ItemDedupIndex, ItemRow, LogParseState, iter_log_records, parse_log_file, split_log_records
+)
 
 logger = logging.getLogger('BetterGI初始化')
 
-# 需要过滤的物品列表
-FORBIDDEN_ITEMS = ['调查', '直接拾取']
 
-# 预编译正则表达式
-FIRST_LINE_PATTERN = re.compile(r'^\[([^]]+)\] \[([^]]+)\] ([^\n]+)\n?([^\n[]*)\n')  # 匹配日志第一行
-LOG_PATTERN = re.compile(r'\n\[([^]]+)\] \[([^]]+)\] ([^\n]+)\n?([^\n[]*)\n')  # 匹配日志行
-TASK_BEGIN_PATTERN = re.compile(r'^配置组 "([^"]*)" 加载完成，共(\d+)个脚本，开始执行$')  # 匹配配置组开始
+def resolve_backfill_workers(requested: int = 0) -> int:
+    """
+    计算历史日志回填使用的进程数
+    最多使用一半的CPU核心，把剩下的核心留给游戏
+
+    Args:
+        requested: 配置的进程数，小于等于0表示自动
+
+    Returns:
+        int: 实际使用的进程数
+    """
+    cap = max(1, (os.cpu_count() or 1) // 2)
+    if requested <= 0:
+        return cap
+    return min(requested, cap)
+
+
+@dataclass(frozen=True)
+class LogDataSnapshot:
+    """
+    一次刷新得到的日志数据快照，接口层的各个视图都从同一份快照读取
+    快照生成后不可修改（字典为只读视图、列为元组），刷新时整体替换引用，
+    因此多个请求线程可以不加锁同时读取
+    
+    Attributes:
+        log_list: 有数据的日期列表（降序）
+        durations: {日期: 持续时间} 字典
+        duration_data: 标准格式的持续时间数据 {'日期': (...), '持续时间': (...)}
+        item_data: 标准格式的物品数据 {'物品名称': (...), '时间': (...), '日期': (...), '归属配置组': (...)}
+    """
+    log_list: Tuple[str, ...]
+    durations: Mapping[str, float]
+    duration_data: Mapping[str, Tuple]
+    item_data: Mapping[str, Tuple]
+
+
+def build_log_snapshot(historical_durations: Dict[str, float],
+                       historical_items: Dict[str, Dict[str, List]],
+                       today_str: str, today_duration: float,
+                       today_items: List[ItemInfo]) -> LogDataSnapshot:
+    """
+    合并历史数据和今天的数据，生成数据快照
+    所有列都按列整体拼接，总耗时与物品数量成线性关系
+    
+    Args:
+        historical_durations: 数据库中的 {日期: 持续时间}
+        historical_items: 数据库中按日期分组的物品数据
+        today_str: 今天的日期字符串
+        today_duration: 今天的持续时间
+        today_items: 今天的物品列表
+        
+    Returns:
+        LogDataSnapshot: 数据快照
+    """
+    durations = dict(historical_durations)
+    names, times, dates, groups = [], [], [], []
+    
+    # 今天的物品排在最前面，并且和以前逐条插到开头的结果一样是倒序的
+    if today_duration > 0 and today_items:
+        durations[today_str] = today_duration
+        for item in reversed(today_items):
+            names.append(item.name)
+            times.append(item.timestamp)
+            dates.append(item.date)
+            groups.append(item.config_group or '')
+    
+    # 历史物品按数据库返回的顺序整列拼接
+    for date_str, items in historical_items.items():
+        names.extend(items['物品名称'])
+        times.extend(items['时间'])
+        dates.extend([date_str] * len(items['物品名称']))
+        groups.extend(items['归属配置组'])
+    
+    # 按日期降序排列（最新的日期在前面）
+    sorted_dates = tuple(sorted(durations, reverse=True))
+    return LogDataSnapshot(
+        log_list=sorted_dates,
+        durations=MappingProxyType(durations),
+        duration_data=MappingProxyType({
+            '日期': sorted_dates,
+            '持续时间': tuple(durations[date_str] for date_str in sorted_dates)
+        }),
+        item_data=MappingProxyType({
+            '物品名称': tuple(names),
+            '时间': tuple(times),
+            '日期': tuple(dates),
+            '归属配置组': tuple(groups)
+        })
+    )
 
 
 class LogDataManager:
@@ -28,29 +120,85 @@ class LogDataManager:
     负责日志文件的读取、解析和数据管理，集成SQLite数据库存储
     """
     
-    def __init__(self, log_dir: str):
+    def __init__(self, log_dir: str, backfill_workers: int = 0):
         """
         初始化日志数据管理器
         
         Args:
             log_dir: 日志目录路径
+            backfill_workers: 并行解析历史日志的进程数，小于等于0表示自动
         """
         self.log_dir = log_dir
-        self.item_cached_list = []  # 用于替代原有的筛选功能，避免物品的重复记录
-        self.item_datadict = {
-            '物品名称': [], '时间': [], '日期': [], '归属配置组': []
-        }
-        self.duration_datadict = {
-            '日期': [], '持续时间': []
-        }
-        self.log_list = None
+        self.backfill_workers = resolve_backfill_workers(backfill_workers)
+        self.item_dedup_index = ItemDedupIndex()  # 用于替代原有的筛选功能，避免物品的重复记录
+        # 当前的数据快照，刷新时整体替换，读取时不需要加锁
+        self.snapshot: Optional[LogDataSnapshot] = None
         
         # 初始化数据库管理器
         db_path = os.path.join(log_dir, 'CanLiangData.db')
         self.db_manager = DatabaseManager(db_path)
+        self.log_catalog = LogCatalog(self.db_manager)
+        
+        # 今天日志的增量追踪器，首次使用时创建；跨天后定稿并换成新一天的文件
+        self._today_follower: Optional[LogFileFollower] = None
+        # 今天已经写入数据库的物品数量和持续时间，以及下次写入是否需要替换旧数据
+        self._today_persisted = 0
+        self._today_persisted_duration = 0
+        self._today_replace = False
+        
+        # 历史数据缓存 (今天的日期, 持续时间, 物品数据)，只有历史文件入库或跨天后才重新从数据库读取
+        self._historical: Optional[Tuple[str, Dict[str, float], Dict[str, Dict[str, List]]]] = None
+        # 今天的结果缓存 (追踪器, 追踪器版本, 持续时间, 物品列表)，日志没有新内容时直接复用
+        self._today_result: Optional[Tuple[LogFileFollower, int, float, List[ItemInfo]]] = None
+        # 历史数据和今天数据各自的变化次数，两者都没变时不重新生成快照
+        self._historical_generation = 0
+        self._today_generation = 0
+        self._snapshot_key: Optional[Tuple[str, int, int]] = None
+        
+        # 同一时间只允许一次刷新；等待期间已有新一轮刷新完成的请求直接复用其结果
+        self._refresh_lock = threading.Lock()
+        self._refresh_started = 0
+        # 后台入库服务运行时，读取接口直接使用已经计算好的结果
+        self.background_refresh = False
+
+    @property
+    def today_str(self) -> str:
+        """今天的日期字符串，每次访问时按当前日期计算，服务跨过零点后自动切换"""
+        return date.today().strftime('%Y%m%d')
+
+    @property
+    def log_list(self) -> Optional[List[str]]:
+        """当前快照中有数据的日期列表，尚未刷新时为None"""
+        snapshot = self.snapshot
+        return list(snapshot.log_list) if snapshot else None
+
+    @property
+    def duration_datadict(self) -> Dict[str, float]:
+        """当前快照中的 {日期: 持续时间} 字典"""
+        snapshot = self.snapshot
+        return dict(snapshot.durations) if snapshot else {}
+
+    @property
+    def item_datadict(self) -> Dict[str, List]:
+        """当前快照中的物品数据"""
+        snapshot = self.snapshot
+        if snapshot is None:
+            return {'物品名称': [], '时间': [], '日期': [], '归属配置组': []}
+        return {key: list(values) for key, values in snapshot.item_data.items()}
+    
+    def _is_new_item(self, item_name: str, timestamp: str, date_str: str,
+                     current_task: Optional[str]) -> bool:
+        """
+        判断物品记录是否首次出现，首次出现时记录到去重索引中
         
-        # 今天的日期字符串，用于排除今天的数据存储
-        self.today_str = date.today().strftime('%Y%m%d')
+        Returns:
+            bool: 首次出现返回True
+        """
+        return self.item_dedup_index.add(item_name, timestamp, date_str, current_task)
+    
+    def _clear_item_cache(self, date_str: str):
+        """指定日期的日志需要从头重新解析时，清空该日期的物品去重记录"""
+        self.item_dedup_index.reset(date_str)
     
     def parse_log(self, log_content: str, date_str: str) -> LogAnalysisResult:
         """
@@ -64,91 +212,14 @@ class LogDataManager:
         Returns:
             LogAnalysisResult: 包含解析结果的分析结果对象
         """
-        matches = LOG_PATTERN.findall(log_content)
-        first_line_match = FIRST_LINE_PATTERN.match(log_content)
-        if first_line_match:
-            matches = [first_line_match.groups()] + matches
-
-        item_count = {}
-        items = []
-
-        # 使用时间段列表管理所有活动时间段
-        time_segments = []  # 存储所有时间段 [(start, end), ...]
-        current_start = None
-        last_time = None
-        current_task = None  # 当前运行的配置组
-        
-        for match in matches:
-            timestamp = match[0]  # 时间戳
-            # level = match[1]  # 日志级别
-            # log_type = match[2]  # 类名
-            details = match[3].strip()  # 日志内容文本
-
-            # 过滤禁用的关键词
-            if any(keyword in details for keyword in FORBIDDEN_ITEMS):
-                continue
-
-            # 匹配配置组开始
-            task_matches = TASK_BEGIN_PATTERN.match(details)
-            if task_matches:
-                current_task = task_matches.group(1)
-            # 匹配配置组结束
-            if current_task and f'配置组 "{current_task}" 执行结束' in details:
-                current_task = None
-
-            # 转换时间戳
-            try:
-                current_time = parse_timestamp_to_seconds(timestamp)
-            except Exception as e:
-                logger.error(f"解析时间戳{timestamp}时候发生错误:{e}")
-                logger.error(f'涉及的完整匹配字符串：{match}')
-                continue
-                
-            # 提取拾取内容
-            if '交互或拾取' in details:
-                item_name = details.split('：')[1].strip('"')
-                item_count[item_name] = item_count.get(item_name, 0) + 1
-
-                # 检查是否存在匹配的行
-                cache_key = f'{item_name}{timestamp}{date_str}{current_task}'
-                if cache_key not in self.item_cached_list:
-                    item_info = ItemInfo(
-                        name=item_name,
-                        timestamp=timestamp,
-                        date=date_str,
-                        config_group=str(current_task) if current_task else None
-                    )
-                    items.append(item_info)
-                    self.item_cached_list.append(cache_key)
-
-            # 处理时间段
-            if last_time is None:
-                # 第一个事件
-                current_start = current_time
-            elif current_time - last_time > 300:
-                # 间隔过大（超过5分钟），结束当前段
-                if current_start is not None:
-                    time_segments.append((current_start, last_time))
-                current_start = current_time
-            
-            last_time = current_time
-
-        # 处理最后一段
-        if current_start is not None and last_time is not None:
-            time_segments.append((current_start, last_time))
-
-        # 计算总持续时间
-        duration = sum(int(end - start) for start, end in time_segments)
-
-        return LogAnalysisResult(
-            item_count=item_count,
-            duration=duration,
-            items=items
-        )
+        state = LogParseState(date_str)
+        state.consume(split_log_records(log_content), self._is_new_item)
+        return state.to_result()
 
     def read_log_file(self, file_path: str, date_str: str) -> Optional[LogAnalysisResult]:
         """
         读取指定路径的日志文件并解析内容。
+        按块流式读取，不会把整个文件读入内存。
 
         Args:
             file_path: 日志文件路径
@@ -158,9 +229,9 @@ class LogDataManager:
             Optional[LogAnalysisResult]: 解析后的日志信息对象，若发生错误则返回None
         """
         try:
-            with open(file_path, 'r', encoding='utf-8') as file:
-                log_content = file.read()
-            return self.parse_log(log_content, date_str)
+            state = LogParseState(date_str)
+            state.consume(iter_log_records(file_path), self._is_new_item)
+            return state.to_result()
         except FileNotFoundError:
             logger.error(f"文件未找到: {file_path}")
             return None
@@ -168,149 +239,288 @@ class LogDataManager:
             logger.error(f"读取文件 {file_path} 时发生未知错误: {e}")
             return None
 
-    def _get_historical_data(self) -> tuple[Dict[str, float], Dict[str, Dict[str, List]]]:
+    def _parse_historical_files(self, file_dates: List[str]) -> Iterator[Tuple[str, Tuple[int, List[ItemRow]]]]:
+        """
+        解析历史日志文件，文件较多时分发到进程池并行解析
+        
+        Args:
+            file_dates: 需要解析的日志日期列表
+            
+        Yields:
+            tuple: (日期, (持续时间, 物品记录列表))，解析失败的文件会被跳过
+        """
+        file_paths = {
+            file_date: os.path.join(self.log_dir, f"better-genshin-impact{file_date}.log")
+            for file_date in file_dates
+        }
+        
+        # 超大的单个文件按记录边界分块并行解析
+        large_dates = [
+            file_date for file_date, file_path in file_paths.items()
+            if os.path.exists(file_path) and os.path.getsize(file_path) >= CHUNK_PARALLEL_MIN_BYTES
+        ]
+        
+        if self.backfill_workers <= 1 or (len(file_dates) <= 1 and not large_dates):
+            for file_date, file_path in file_paths.items():
+                result = parse_log_file(file_path, file_date)
+                if result:
+                    yield file_date, result
+            return
+        
+        workers = self.backfill_workers if large_dates else min(self.backfill_workers, len(file_dates))
+        logger.info(f"使用 {workers} 个进程解析 {len(file_dates)} 个历史日志文件")
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            for file_date in large_dates:
+                result = parse_log_file_chunked(file_paths.pop(file_date), file_date, executor, workers)
+                if result:
+                    yield file_date, result
+            
+            futures = {
+                executor.submit(parse_log_file, file_path, file_date): file_date
+                for file_date, file_path in file_paths.items()
+            }
+            for future in as_completed(futures):
+                file_date = futures[future]
+                try:
+                    result = future.result()
+                except Exception as e:
+                    logger.error(f"解析历史日志 {file_date} 时发生错误: {e}")
+                    continue
+                if result:
+                    yield file_date, result
+
+    def _get_historical_data(self, today_str: Optional[str] = None) -> tuple[Dict[str, float], Dict[str, Dict[str, List]]]:
         """
         获取历史数据（不包括今天的数据）
+        目录中没有新增或变化的文件时直接返回缓存，不再重新读取整张物品表
+        
+        Args:
+            today_str: 今天的日期字符串，默认使用当前日期
         
         Returns:
             tuple: (duration_data, item_data) 历史持续时间数据和物品数据
         """
-        # 获取所有以'better-genshin-impact'开头的日志文件，并提取日期部分
-        log_files = [f.replace('better-genshin-impact', '').replace('.log', '')
-                     for f in os.listdir(self.log_dir)
-                     if f.startswith('better-genshin-impact')]
-
-        # 获取数据库中已存储的日期
-        stored_dates = set(self.db_manager.get_stored_dates())
-        
-        # 找出需要处理的历史文件（数据库中没有的且不是今天的文件）
-        files_to_process = []
-        for file_date in log_files:
-            if file_date not in stored_dates and file_date != self.today_str:
-                files_to_process.append(file_date)
-
-        # 处理需要解析的历史文件
-        for file_date in files_to_process:
-            file_path = os.path.join(self.log_dir, f"better-genshin-impact{file_date}.log")
-            result = self.read_log_file(file_path, file_date)
-            if not result:
-                continue
-
-            # 过滤掉不需要的物品
-            items = result.item_count.copy()
-            for forbidden_item in FORBIDDEN_ITEMS:
-                if forbidden_item in items:
-                    del items[forbidden_item]
+        today_str = today_str or self.today_str
+        # 对比文件目录表，找出新增或内容变化的历史文件（不包括今天的文件）
+        changed_entries = {
+            entry.date_str: entry
+            for entry in self.log_catalog.scan(self.log_dir, exclude_dates={today_str})
+        }
+        written = False
 
+        # 处理需要解析的历史文件，解析可以并行，写入数据库统一在当前线程完成
+        for file_date, (duration, item_rows) in self._parse_historical_files(list(changed_entries)):
             # 只处理有物品的日志
-            if items:
+            if item_rows:
                 # 存储到数据库
                 item_list = [
                     {
-                        'name': item.name,
-                        'timestamp': item.timestamp,
-                        'config_group': item.config_group
+                        'name': name,
+                        'timestamp': timestamp,
+                        'config_group': config_group
                     }
-                    for item in result.items
+                    for name, timestamp, config_group in item_rows
                 ]
-                self.db_manager.insert_log_file_data(file_date, result.duration, item_list)
-
-        # 从数据库加载所有历史数据（排除今天）
-        duration_data = self.db_manager.get_duration_data(exclude_today=True)
-        item_data = self.db_manager.get_item_data(exclude_today=True)
+                # 追加写入，已经入库的物品会被跳过；文件变小时替换该日期的旧数据
+                if not self.db_manager.insert_log_file_data(file_date, duration, item_list,
+                                                            replace=changed_entries[file_date].shrunk):
+                    continue
+                written = True
+            elif changed_entries[file_date].shrunk:
+                # 文件被替换后不再包含物品，删除旧数据
+                if not self.db_manager.delete_log_data(file_date):
+                    continue
+                written = True
+            self.log_catalog.mark_ingested(changed_entries[file_date])
+
+        # 只有写入了新数据、尚未加载过或者跨天后，才从数据库重新加载所有历史数据（排除今天）
+        cached = self._historical
+        if written or cached is None or cached[0] != today_str:
+            cached = (today_str,
+                      self.db_manager.get_duration_data(exclude_today=True),
+                      self.db_manager.get_item_data(exclude_today=True))
+            self._historical = cached
+            self._historical_generation += 1
         
-        return duration_data, item_data
+        return cached[1], cached[2]
+
+    def _on_today_reset(self, date_str: str) -> None:
+        """今天的日志被截断或替换，从头解析并在下次写入时替换数据库中的旧数据"""
+        self._clear_item_cache(date_str)
+        self._today_persisted = 0
+        self._today_replace = True
+
+    @staticmethod
+    def _valid_today_result(result: LogAnalysisResult) -> Tuple[float, List[ItemInfo]]:
+        """只有包含有效物品（不在过滤列表中）时才返回数据，否则返回(0, [])"""
+        if any(name not in FORBIDDEN_ITEMS for name in result.item_count):
+            return result.duration, result.items
+        return 0, []
+
+    def _persist_today(self, date_str: str, duration: float, items: List[ItemInfo], provisional: bool) -> bool:
+        """
+        把今天新增的物品写入数据库，只写入上次之后新增的部分
+
+        Args:
+            date_str: 日期字符串
+            duration: 截至当前的持续时间
+            items: 截至当前的全部物品
+            provisional: 是否为临时数据（当天尚未结束）
+
+        Returns:
+            bool: 写入成功（或没有需要写入的内容）返回True
+        """
+        new_items = items[self._today_persisted:]
+        if not new_items and not self._today_replace and provisional \
+                and duration == self._today_persisted_duration:
+            return True
+        rows = [
+            {'name': item.name, 'timestamp': item.timestamp, 'config_group': item.config_group}
+            for item in new_items
+        ]
+        if not self.db_manager.insert_log_file_data(date_str, int(duration), rows,
+                                                    replace=self._today_replace, provisional=provisional):
+            return False
+        self._today_persisted = len(items)
+        self._today_persisted_duration = duration
+        self._today_replace = False
+        return True
+
+    def _finalize_follower(self, follower: LogFileFollower) -> None:
+        """
+        跨天后定稿前一天的日志：读完剩余内容，写入最终数据并记录到文件目录表，
+        之后的目录扫描不会再重新解析这个文件
+        """
+        duration, items = self._valid_today_result(follower.finish().to_result())
+        if items and not self._persist_today(follower.date_str, duration, items, provisional=False):
+            return
+        if self.log_catalog.mark_file_ingested(follower.file_path, follower.date_str):
+            logger.info(f"已定稿 {follower.date_str} 的日志数据")
+
+    def _rollover_if_needed(self, today_str: str) -> None:
+        """日期已经变化时定稿前一天的增量追踪器"""
+        follower = self._today_follower
+        if follower is not None and follower.date_str != today_str:
+            self._finalize_follower(follower)
+            self._today_follower = None
+
+    def rollover(self) -> LogDataSnapshot:
+        """
+        跨天处理：定稿前一天的数据，然后刷新数据快照，由定时任务在零点后调用
+
+        Returns:
+            LogDataSnapshot: 刷新后的数据快照
+        """
+        with self._refresh_lock:
+            self._rollover_if_needed(self.today_str)
+        return self.refresh()
 
-    def _get_today_data(self) -> tuple[float, List]:
+    def _get_today_data(self, today_str: Optional[str] = None) -> tuple[float, List]:
         """
-        获取今天的数据
+        获取今天的数据，新增的物品会以临时数据的形式写入数据库
+        
+        Args:
+            today_str: 今天的日期字符串，默认使用当前日期
         
         Returns:
             tuple: (duration, items) 今天的持续时间和物品列表，如果没有数据则返回(0, [])
         """
-        # 清空缓存，因为需要重新读取今天的数据
-        self.item_cached_list = []
-        
-        today_file_path = os.path.join(self.log_dir, f"better-genshin-impact{self.today_str}.log")
+        today_str = today_str or self.today_str
+        self._rollover_if_needed(today_str)
+        today_file_path = os.path.join(self.log_dir, f"better-genshin-impact{today_str}.log")
         
         if not os.path.exists(today_file_path):
+            if self._today_result is not None:
+                self._today_result = None
+                self._today_generation += 1
             return 0, []
-            
-        today_result = self.read_log_file(today_file_path, self.today_str)
-        if not today_result:
-            return 0, []
-
-        # 过滤掉不需要的物品
-        today_items = today_result.item_count.copy()
-        for forbidden_item in FORBIDDEN_ITEMS:
-            if forbidden_item in today_items:
-                del today_items[forbidden_item]
         
-        # 如果今天有有效物品，返回数据
-        if today_items:
-            return today_result.duration, today_result.items
-        else:
-            return 0, []
+        # 只解析上次读取之后新追加的内容
+        if self._today_follower is None or self._today_follower.file_path != today_file_path:
+            self.db_manager.prune_log_checkpoints(os.path.basename(today_file_path))
+            self._today_persisted = 0
+            self._today_persisted_duration = 0
+            self._today_replace = False
+            self._today_follower = LogFileFollower(
+                today_file_path, today_str, self.db_manager,
+                is_new_item=self._is_new_item, on_reset=self._on_today_reset
+            )
+            # 从检查点恢复的物品本来就是从数据库读出来的，不需要再写一次
+            self._today_persisted = len(self._today_follower.state.items)
+        follower = self._today_follower
+        state = follower.poll(checkpoint=False)
+        cached = self._today_result
+        if cached is not None and cached[0] is follower and cached[1] == follower.version:
+            return cached[2], cached[3]
+        
+        # 检查点不包含物品列表，先把新增的物品写入数据库再保存检查点；写入失败时下次重试
+        duration, items = self._valid_today_result(state.to_result())
+        self._today_generation += 1
+        if not items or self._persist_today(today_str, duration, items, provisional=True):
+            follower.save_checkpoint()
+            self._today_result = (follower, follower.version, duration, items)
+        return duration, items
 
     def get_log_list(self) -> List[str]:
         """
         获取日志文件列表，并过滤掉不包含交互物品的日志文件。
         使用智能加载策略：优先从数据库读取，然后补充缺失的文件数据
-        更新duration_datadict, item_datadict两个实例变量
+        每次调用都会重新生成一份数据快照
 
         Returns:
             List[str]: 过滤后的日志文件名列表
         """
-        # 获取历史数据
-        duration_data, item_data = self._get_historical_data()
-        
-        # 数据库返回的已经是字典格式，直接使用
-        date_duration_dict = duration_data.copy()
-        
-        # 构建物品数据的统一格式
-        unified_item_data = {
-            '物品名称': [],
-            '时间': [],
-            '日期': [],
-            '归属配置组': []
-        }
-        
-        # 将按日期分组的物品数据合并为统一格式
-        for date_str, items in item_data.items():
-            for i in range(len(items['物品名称'])):
-                unified_item_data['物品名称'].append(items['物品名称'][i])
-                unified_item_data['时间'].append(items['时间'][i])
-                unified_item_data['日期'].append(date_str)
-                unified_item_data['归属配置组'].append(items['归属配置组'][i])
-        
-        # 获取今天的数据
-        today_duration, today_items = self._get_today_data()
+        return list(self.refresh().log_list)
+
+    def refresh(self) -> LogDataSnapshot:
+        """
+        刷新数据快照，并发调用会被合并
+        如果等待锁的期间已经有一轮在本次调用之后开始的刷新完成，直接返回它的结果
         
-        # 如果今天有数据，添加到结果中
-        if today_duration > 0 and today_items:
-            # 将今天的数据添加到字典中
-            date_duration_dict[self.today_str] = today_duration
-            
-            # 添加今天的物品数据（插入到最前面）
-            for item in today_items:
-                unified_item_data['物品名称'].insert(0, item.name)
-                unified_item_data['时间'].insert(0, item.timestamp)
-                unified_item_data['日期'].insert(0, item.date)
-                unified_item_data['归属配置组'].insert(0, item.config_group or '')
-
-        # 按日期降序排列（最新的日期在前面）
-        sorted_dates = sorted(date_duration_dict.keys(), reverse=True)
+        Returns:
+            LogDataSnapshot: 最新的数据快照
+        """
+        observed = self._refresh_started
+        with self._refresh_lock:
+            if self._refresh_started != observed and self.snapshot is not None:
+                return self.snapshot
+            self._refresh_started += 1
+            return self._refresh_snapshot()
+
+    def _refresh_snapshot(self) -> LogDataSnapshot:
+        """
+        执行一次刷新：加载历史数据、追踪今天的日志，并生成新的数据快照
+        历史数据和今天的数据都没有变化时直接返回当前快照
         
-        # 直接存储字典格式，避免列表顺序问题
-        # duration_datadict 存储为 {日期: 持续时间} 的字典格式
-        self.duration_datadict = date_duration_dict
-        self.item_datadict = unified_item_data
+        Returns:
+            LogDataSnapshot: 新的数据快照
+        """
+        # 先定稿跨天前的文件，避免目录扫描把它当作新的历史文件整体重新解析
+        today_str = self.today_str
+        self._rollover_if_needed(today_str)
+        duration_data, item_data = self._get_historical_data(today_str)
+        today_duration, today_items = self._get_today_data(today_str)
+        key = (today_str, self._historical_generation, self._today_generation)
+        if key == self._snapshot_key and self.snapshot is not None:
+            return self.snapshot
+        snapshot = build_log_snapshot(duration_data, item_data, today_str, today_duration, today_items)
         
-        # 获取有数据的日期列表
-        filtered_logs = sorted(date_duration_dict.keys(), reverse=True)
-        self.log_list = filtered_logs
+        # 整体替换引用，读取方要么拿到旧快照，要么拿到新快照
+        self.snapshot = snapshot
+        self._snapshot_key = key
+        return snapshot
+
+    def get_snapshot(self) -> LogDataSnapshot:
+        """
+        获取当前的数据快照，持续时间和物品数据来自同一次刷新
         
-        return filtered_logs
+        Returns:
+            LogDataSnapshot: 数据快照
+        """
+        snapshot = self.snapshot
+        if not self.background_refresh or snapshot is None:
+            snapshot = self.refresh()
+        return snapshot
 
     def get_duration_data(self) -> Dict:
         """
@@ -319,20 +529,7 @@ class LogDataManager:
         Returns:
             Dict: 持续时间数据字典，格式为 {'日期': [...], '持续时间': [...]}
         """
-        # if not self.log_list: 无视之前数据，强制刷新今天数据
-        self.get_log_list() 
-        
-        # 将内部存储的字典格式转换为标准返回格式
-        # 按日期降序排列（最新的日期在前面）
-        sorted_dates = sorted(self.duration_datadict.keys(), reverse=True)
-        
-        # 重新构建duration_data，确保日期和持续时间的对应关系
-        sorted_duration_data = {
-            '日期': sorted_dates,
-            '持续时间': [self.duration_datadict[date_str] for date_str in sorted_dates]
-        }
-        
-        return sorted_duration_data
+        return {key: list(values) for key, values in self.get_snapshot().duration_data.items()}
 
     def get_item_data(self) -> Dict:
         """
@@ -341,8 +538,4 @@ class LogDataManager:
         Returns:
             Dict: 物品数据字典
         """
-        # if not self.log_list:
-        # 无视之前数据，强制刷新今天数据
-        self.get_log_list()
-        return self.item_datadict
-
+        return {key: list(values) for key, values in self.get_snapshot().item_data.items()}
@@ -0,0 +1,312 @@
+"""
+截图存储模块
+webhook中的base64截图解码后按内容哈希保存为文件，相同的截图只保存一份；
+缩略图在后台线程中用cv2生成，不占用请求线程
+"""
+import base64
+import binascii
+import hashlib
+import logging
+import os
+import re
+import struct
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Dict, Iterable, Optional, Tuple
+
+import cv2
+import numpy as np
+
+logger = logging.getLogger('BetterGI初始化')
+
+# 默认缩略图宽度（像素）
+DEFAULT_THUMBNAIL_WIDTH = 320
+# 清理时跳过最近写入的文件（秒），避免删除已保存但还没写入数据库的截图
+PRUNE_GRACE_SECONDS = 3600
+# 缩略图JPEG质量
+THUMBNAIL_JPEG_QUALITY = 80
+
+_HASH_PATTERN = re.compile(r'^[0-9a-f]{64}$')
+_DATA_URI_PREFIX = re.compile(r'^data:image/[\w.+-]+;base64,', re.IGNORECASE)
+
+# 文件头与MIME类型
+_IMAGE_SIGNATURES = (
+    (b'\x89PNG\r\n\x1a\n', 'image/png'),
+    (b'\xff\xd8\xff', 'image/jpeg'),
+    (b'BM', 'image/bmp'),
+    (b'GIF8', 'image/gif'),
+)
+
+
+def sniff_mimetype(data: bytes) -> Optional[str]:
+    """
+    根据文件头判断图片类型
+
+    Args:
+        data: 文件开头的若干字节
+
+    Returns:
+        Optional[str]: MIME类型，不是支持的图片时返回None
+    """
+    for signature, mimetype in _IMAGE_SIGNATURES:
+        if data.startswith(signature):
+            return mimetype
+    if data[:4] == b'RIFF' and data[8:12] == b'WEBP':
+        return 'image/webp'
+    return None
+
+
+def _jpeg_size(data: bytes) -> Optional[Tuple[int, int]]:
+    """从JPEG的SOF段读取尺寸"""
+    index = 2
+    while index + 9 < len(data):
+        if data[index] != 0xFF:
+            index += 1
+            continue
+        marker = data[index + 1]
+        if marker in (0xD8, 0x01) or 0xD0 <= marker <= 0xD7 or marker == 0xFF:
+            index += 2 if marker != 0xFF else 1
+            continue
+        length = struct.unpack('>H', data[index + 2:index + 4])[0]
+        if 0xC0 <= marker <= 0xCF and marker not in (0xC4, 0xC8, 0xCC):
+            height, width = struct.unpack('>HH', data[index + 5:index + 9])
+            return width, height
+        index += 2 + length
+    return None
+
+
+def image_size(data: bytes) -> Optional[Tuple[int, int]]:
+    """
+    读取图片尺寸，PNG和JPEG只解析文件头，其他格式完整解码
+
+    Args:
+        data: 图片文件内容
+
+    Returns:
+        Optional[Tuple[int, int]]: (宽, 高)，无法识别时返回None
+    """
+    mimetype = sniff_mimetype(data[:16])
+    if mimetype is None:
+        return None
+    if mimetype == 'image/png' and len(data) >= 24:
+        return struct.unpack('>II', data[16:24])
+    if mimetype == 'image/jpeg':
+        size = _jpeg_size(data)
+        if size:
+            return size
+    image = cv2.imdecode(np.frombuffer(data, np.uint8), cv2.IMREAD_UNCHANGED)
+    if image is None:
+        return None
+    return image.shape[1], image.shape[0]
+
+
+def decode_base64_image(value: str) -> Optional[bytes]:
+    """
+    解码base64截图（可以带 data:image/...;base64, 前缀）
+
+    Args:
+        value: webhook中的screenshot字段
+
+    Returns:
+        Optional[bytes]: 图片内容，不是base64图片时返回None
+    """
+    if not isinstance(value, str) or len(value) < 16:
+        return None
+    payload = _DATA_URI_PREFIX.sub('', value.strip(), count=1)
+    try:
+        data = base64.b64decode(''.join(payload.split()), validate=True)
+    except (binascii.Error, ValueError):
+        return None
+    return data if sniff_mimetype(data[:16]) else None
+
+
+class ScreenshotStore:
+    """
+    按内容哈希保存截图的文件存储
+    原图保存在 <root>/<哈希前两位>/<哈希>，缩略图保存在 <root>/thumbs/<哈希>.jpg
+    """
+
+    def __init__(self, root_dir: str, thumbnail_width: int = DEFAULT_THUMBNAIL_WIDTH):
+        """
+        初始化截图存储
+
+        Args:
+            root_dir: 存储目录
+            thumbnail_width: 缩略图宽度（像素），原图更窄时不放大
+        """
+        self.root_dir = root_dir
+        self.thumbnail_width = max(16, int(thumbnail_width))
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='screenshot-thumbnail')
+        self._pending: Dict[str, Future] = {}
+        # 任务已经完成时 add_done_callback 会在提交线程中立即回调，需要可重入锁
+        self._lock = threading.RLock()
+
+    @staticmethod
+    def is_valid_hash(content_hash: str) -> bool:
+        """哈希是否为合法的SHA-256十六进制字符串"""
+        return bool(_HASH_PATTERN.match(content_hash or ''))
+
+    def original_path(self, content_hash: str) -> str:
+        """原图文件路径"""
+        return os.path.join(self.root_dir, content_hash[:2], content_hash)
+
+    def thumbnail_file(self, content_hash: str) -> str:
+        """缩略图文件路径"""
+        return os.path.join(self.root_dir, 'thumbs', f'{content_hash}.jpg')
+
+    @staticmethod
+    def _write_atomic(path: str, data: bytes) -> None:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        temp_path = f'{path}.{threading.get_ident()}.tmp'
+        with open(temp_path, 'wb') as f:
+            f.write(data)
+        os.replace(temp_path, path)
+
+    def store(self, data: bytes) -> Optional[Dict]:
+        """
+        保存截图，已经存在的截图不会重复写入，并在后台生成缩略图
+
+        Args:
+            data: 图片文件内容
+
+        Returns:
+            Optional[Dict]: {'hash': 哈希, 'width': 宽, 'height': 高}，不是图片时返回None
+        """
+        size = image_size(data)
+        if size is None:
+            return None
+        content_hash = hashlib.sha256(data).hexdigest()
+        path = self.original_path(content_hash)
+        if os.path.exists(path):
+            # 重复提交的截图刷新修改时间，避免在新记录写入数据库之前被 prune 当作无人引用而删除
+            try:
+                os.utime(path)
+            except FileNotFoundError:
+                self._write_atomic(path, data)
+        else:
+            self._write_atomic(path, data)
+        self._schedule_thumbnail(content_hash)
+        return {'hash': content_hash, 'width': size[0], 'height': size[1]}
+
+    def _schedule_thumbnail(self, content_hash: str) -> Optional[Future]:
+        if os.path.exists(self.thumbnail_file(content_hash)):
+            return None
+        with self._lock:
+            future = self._pending.get(content_hash)
+            if future is None:
+                future = self._executor.submit(self._make_thumbnail, content_hash)
+                self._pending[content_hash] = future
+                future.add_done_callback(lambda _: self._forget(content_hash))
+            return future
+
+    def _forget(self, content_hash: str) -> None:
+        with self._lock:
+            self._pending.pop(content_hash, None)
+
+    def _make_thumbnail(self, content_hash: str) -> bool:
+        try:
+            image = cv2.imread(self.original_path(content_hash), cv2.IMREAD_COLOR)
+            if image is None:
+                return False
+            height, width = image.shape[:2]
+            if width > self.thumbnail_width:
+                new_height = max(1, round(height * self.thumbnail_width / width))
+                image = cv2.resize(image, (self.thumbnail_width, new_height), interpolation=cv2.INTER_AREA)
+            success, encoded = cv2.imencode('.jpg', image, [cv2.IMWRITE_JPEG_QUALITY, THUMBNAIL_JPEG_QUALITY])
+            if not success:
+                return False
+            self._write_atomic(self.thumbnail_file(content_hash), encoded.tobytes())
+            return True
+        except Exception as e:
+            logger.error(f"生成截图缩略图时发生错误: {e}")
+            return False
+
+    def get_original(self, content_hash: str) -> Optional[Tuple[str, str]]:
+        """
+        获取原图
+
+        Args:
+            content_hash: 截图哈希
+
+        Returns:
+            Optional[Tuple[str, str]]: (文件路径, MIME类型)，不存在时返回None
+        """
+        if not self.is_valid_hash(content_hash):
+            return None
+        path = self.original_path(content_hash)
+        if not os.path.exists(path):
+            return None
+        with open(path, 'rb') as f:
+            mimetype = sniff_mimetype(f.read(16)) or 'application/octet-stream'
+        return path, mimetype
+
+    def get_thumbnail(self, content_hash: str, timeout: float = 5.0) -> Optional[str]:
+        """
+        获取缩略图路径，尚未生成时等待后台线程生成
+
+        Args:
+            content_hash: 截图哈希
+            timeout: 最长等待时间（秒）
+
+        Returns:
+            Optional[str]: 缩略图文件路径，原图不存在或生成失败时返回None
+        """
+        if not self.is_valid_hash(content_hash):
+            return None
+        path = self.thumbnail_file(content_hash)
+        if os.path.exists(path):
+            return path
+        if not os.path.exists(self.original_path(content_hash)):
+            return None
+        future = self._schedule_thumbnail(content_hash)
+        if future is not None:
+            try:
+                future.result(timeout)
+            except Exception:
+                return None
+        return path if os.path.exists(path) else None
+
+    def wait(self) -> None:
+        """
+        等待已经提交的缩略图全部生成完毕
+        """
+        with self._lock:
+            pending = list(self._pending.values())
+        for future in pending:
+            future.result()
+
+    def prune(self, referenced_hashes: Iterable[str], grace_seconds: float = PRUNE_GRACE_SECONDS) -> int:
+        """
+        删除不再被任何webhook记录引用的截图及其缩略图
+
+        Args:
+            referenced_hashes: 数据库中仍在引用的截图哈希
+            grace_seconds: 跳过最近这么多秒内写入的文件
+
+        Returns:
+            int: 删除的截图数量
+        """
+        referenced = set(referenced_hashes)
+        cutoff = time.time() - grace_seconds
+        removed = 0
+        if not os.path.isdir(self.root_dir):
+            return 0
+        for prefix in os.listdir(self.root_dir):
+            directory = os.path.join(self.root_dir, prefix)
+            if len(prefix) != 2 or not os.path.isdir(directory):
+                continue
+            for content_hash in os.listdir(directory):
+                path = os.path.join(directory, content_hash)
+                if (not self.is_valid_hash(content_hash) or content_hash in referenced
+                        or os.path.getmtime(path) > cutoff):
+                    continue
+                for stale_path in (path, self.thumbnail_file(content_hash)):
+                    try:
+                        os.remove(stale_path)
+                    except FileNotFoundError:
+                        pass
+                removed += 1
+        if removed:
+            logger.info(f"清理了 {removed} 张不再使用的webhook截图")
+        return removed
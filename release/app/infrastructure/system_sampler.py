@@ -0,0 +1,169 @@
+"""
+系统指标采样模块
+在后台按固定间隔采样CPU和内存使用率，写入固定大小的环形缓冲区，
+接口直接读取最近一次的采样结果，不再在请求中阻塞等待CPU采样
+"""
+import logging
+import threading
+import time
+from typing import Callable, Dict, List, Optional
+
+import numpy as np
+import psutil
+
+from app.infrastructure.utils import lower_current_thread_priority
+
+logger = logging.getLogger('BetterGI初始化')
+
+# 默认采样间隔（秒）
+DEFAULT_SAMPLE_INTERVAL = 1.0
+# 默认保留的采样点数量（按1秒间隔约为10分钟）
+DEFAULT_HISTORY_SIZE = 600
+
+
+class SystemMetricsSampler:
+    """
+    系统指标采样器
+    时间戳、CPU使用率和内存使用率分别保存在预先分配的numpy数组中，
+    写满后从头覆盖最旧的采样点，内存占用不随运行时间增长
+    """
+
+    def __init__(self, metrics=psutil, interval: float = DEFAULT_SAMPLE_INTERVAL,
+                 capacity: int = DEFAULT_HISTORY_SIZE, clock: Callable[[], float] = time.time):
+        """
+        初始化采样器
+
+        Args:
+            metrics: 提供 cpu_percent 和 virtual_memory 的对象，默认为psutil
+            interval: 采样间隔（秒）
+            capacity: 环形缓冲区保留的采样点数量
+            clock: 获取当前时间戳的函数
+        """
+        self._metrics = metrics
+        self._clock = clock
+        self.interval = max(0.1, float(interval))
+        self.capacity = max(1, int(capacity))
+        self._timestamps = np.zeros(self.capacity, dtype=np.float64)
+        self._cpu = np.zeros(self.capacity, dtype=np.float32)
+        self._memory = np.zeros(self.capacity, dtype=np.float32)
+        # 已写入的采样点总数，下一次写入位置为 _count % capacity
+        self._count = 0
+        self._primed = False
+        self._lock = threading.Lock()
+        self._stop_event = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def is_running(self) -> bool:
+        """后台线程是否正在运行"""
+        return self._thread is not None and self._thread.is_alive()
+
+    @property
+    def sample_count(self) -> int:
+        """缓冲区中现有的采样点数量"""
+        with self._lock:
+            return min(self._count, self.capacity)
+
+    def start(self) -> None:
+        """
+        启动采样线程，重复调用不会启动多个线程
+        """
+        if self.is_running:
+            return
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._run, name='system-sampler', daemon=True)
+        self._thread.start()
+        logger.info(f"系统指标采样已启动，间隔 {self.interval} 秒，保留 {self.capacity} 个采样点")
+
+    def stop(self, timeout: Optional[float] = 5.0) -> None:
+        """
+        停止采样线程
+
+        Args:
+            timeout: 等待线程退出的最长时间（秒）
+        """
+        self._stop_event.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+    def prime(self) -> None:
+        """
+        初始化CPU计数基准，psutil在 interval=None 时返回的是距离上一次调用的平均值，
+        第一次调用的结果没有意义
+        """
+        try:
+            self._metrics.cpu_percent(interval=None)
+            self._primed = True
+        except Exception as e:
+            logger.error(f"初始化CPU采样时发生错误: {e}")
+
+    def sample_once(self) -> bool:
+        """
+        采样一次并写入环形缓冲区，不会阻塞等待
+
+        Returns:
+            bool: 采样成功返回True
+        """
+        if not self._primed:
+            self.prime()
+        try:
+            cpu = float(self._metrics.cpu_percent(interval=None))
+            memory = float(self._metrics.virtual_memory().percent)
+        except Exception as e:
+            logger.error(f"采样系统指标时发生错误: {e}")
+            return False
+        with self._lock:
+            index = self._count % self.capacity
+            self._timestamps[index] = self._clock()
+            self._cpu[index] = cpu
+            self._memory[index] = memory
+            self._count += 1
+        return True
+
+    def latest(self) -> Optional[Dict[str, float]]:
+        """
+        获取最近一次的采样结果
+
+        Returns:
+            Optional[Dict[str, float]]: 包含 timestamp、cpu_usage、memory_usage，尚未采样时返回None
+        """
+        with self._lock:
+            if self._count == 0:
+                return None
+            index = (self._count - 1) % self.capacity
+            return {
+                'timestamp': round(float(self._timestamps[index]), 3),
+                'cpu_usage': round(float(self._cpu[index]), 1),
+                'memory_usage': round(float(self._memory[index]), 1),
+            }
+
+    def history(self, limit: Optional[int] = None) -> Dict[str, List[float]]:
+        """
+        获取最近的采样历史，按时间从旧到新排列
+
+        Args:
+            limit: 返回的采样点数量，为空时返回缓冲区中的全部采样点
+
+        Returns:
+            Dict[str, List[float]]: 列式结果，timestamp、cpu_usage、memory_usage 三个等长列表
+        """
+        with self._lock:
+            available = min(self._count, self.capacity)
+            size = available if limit is None else max(0, min(int(limit), available))
+            # 最近 size 个采样点在环形缓冲区中的位置
+            positions = np.arange(self._count - size, self._count) % self.capacity
+            timestamps = self._timestamps[positions]
+            cpu = self._cpu[positions]
+            memory = self._memory[positions]
+        return {
+            'timestamp': np.round(timestamps, 3).tolist(),
+            'cpu_usage': np.round(cpu.astype(np.float64), 1).tolist(),
+            'memory_usage': np.round(memory.astype(np.float64), 1).tolist(),
+        }
+
+    def _run(self) -> None:
+        lower_current_thread_priority()
+        self.prime()
+        while not self._stop_event.wait(self.interval):
+            self.sample_once()
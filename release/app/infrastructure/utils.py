@@ -1,8 +1,9 @@
 """
 工具类模块
-静态数据处理工具，包括find_bettergi_install_path和open_browser_after_start
+静态数据处理工具，包括find_bettergi_install_path、open_browser_after_start和lower_current_thread_priority
 """
 import os
+import sys
 import subprocess
 import threading
 import time
@@ -85,6 +86,29 @@ def open_browser_after_start(port: int = 3000):
     threading.Thread(target=target).start()
 
 
+def lower_current_thread_priority() -> bool:
+    """
+    尽量降低当前线程的调度优先级，让后台任务不和游戏争抢CPU
+    Windows使用SetThreadPriority，Linux按线程号调整nice值，其他平台不做处理
+
+    Returns:
+        bool: 成功降低优先级返回True
+    """
+    try:
+        if os.name == 'nt':
+            import ctypes
+            THREAD_PRIORITY_LOWEST = -2
+            kernel32 = ctypes.windll.kernel32
+            return bool(kernel32.SetThreadPriority(kernel32.GetCurrentThread(), THREAD_PRIORITY_LOWEST))
+        if sys.platform.startswith('linux'):
+            # Linux上nice值是按线程生效的，PRIO_PROCESS传入线程号即可只影响当前线程
+            os.setpriority(os.PRIO_PROCESS, threading.get_native_id(), 19)
+            return True
+    except Exception as e:
+        logger.warning(f"降低后台线程优先级失败: {e}")
+    return False
+
+
 def parse_timestamp_to_seconds(timestamp: str) -> float:
     """
     将时间戳字符串直接转换为当日的总秒数
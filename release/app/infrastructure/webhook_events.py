@@ -0,0 +1,144 @@
+"""
+webhook事件推送模块
+进程内的发布订阅：webhook数据写入数据库后发布给所有订阅者，
+每个订阅者的队列都有上限，消费过慢的客户端不会让内存无限增长
+"""
+import json
+import logging
+import queue
+import threading
+from typing import Dict, Iterable, Optional, Set
+
+logger = logging.getLogger('BetterGI初始化')
+
+# 默认每个订阅者最多缓存的事件数量
+DEFAULT_SUBSCRIBER_QUEUE_SIZE = 100
+
+
+class WebhookSubscription:
+    """
+    单个订阅者
+    队列已满时新事件不再放入队列，而是把 lagging 置为True，
+    由订阅者清空队列后从数据库补齐错过的记录
+    """
+
+    def __init__(self, queue_size: int = DEFAULT_SUBSCRIBER_QUEUE_SIZE):
+        """
+        初始化订阅者
+
+        Args:
+            queue_size: 队列容量
+        """
+        self._queue: queue.Queue = queue.Queue(maxsize=max(1, int(queue_size)))
+        self.lagging = False
+
+    def offer(self, row: Dict) -> None:
+        """
+        放入一条事件，队列已满时标记为落后
+
+        Args:
+            row: webhook记录
+        """
+        try:
+            self._queue.put_nowait(row)
+        except queue.Full:
+            self.lagging = True
+
+    def get(self, timeout: Optional[float] = None) -> Optional[Dict]:
+        """
+        取出一条事件
+
+        Args:
+            timeout: 最长等待时间（秒）
+
+        Returns:
+            Optional[Dict]: webhook记录，超时返回None
+        """
+        try:
+            return self._queue.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+    def reset(self) -> None:
+        """
+        清除落后标记并清空队列，之后需要从数据库补齐数据
+        """
+        self.lagging = False
+        while True:
+            try:
+                self._queue.get_nowait()
+            except queue.Empty:
+                break
+
+
+class WebhookEventBroker:
+    """
+    webhook事件发布订阅中心
+    """
+
+    def __init__(self, queue_size: int = DEFAULT_SUBSCRIBER_QUEUE_SIZE):
+        """
+        初始化发布订阅中心
+
+        Args:
+            queue_size: 每个订阅者的队列容量
+        """
+        self.queue_size = queue_size
+        self._subscribers: Set[WebhookSubscription] = set()
+        self._lock = threading.Lock()
+
+    @property
+    def subscriber_count(self) -> int:
+        """当前订阅者数量"""
+        with self._lock:
+            return len(self._subscribers)
+
+    def subscribe(self) -> WebhookSubscription:
+        """
+        新增订阅者
+
+        Returns:
+            WebhookSubscription: 订阅者
+        """
+        subscription = WebhookSubscription(self.queue_size)
+        with self._lock:
+            self._subscribers.add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: WebhookSubscription) -> None:
+        """
+        移除订阅者
+
+        Args:
+            subscription: 订阅者
+        """
+        with self._lock:
+            self._subscribers.discard(subscription)
+
+    def publish(self, rows: Iterable[Dict]) -> None:
+        """
+        把已经写入数据库的记录发布给所有订阅者
+
+        Args:
+            rows: 按id递增排列的webhook记录
+        """
+        with self._lock:
+            subscribers = list(self._subscribers)
+        if not subscribers:
+            return
+        for row in rows:
+            for subscription in subscribers:
+                subscription.offer(row)
+
+
+def format_sse_event(row: Dict) -> str:
+    """
+    把webhook记录格式化为Server-Sent Events消息，id字段用于断线后通过 Last-Event-ID 续传
+
+    Args:
+        row: webhook记录
+
+    Returns:
+        str: SSE消息文本
+    """
+    return f"id: {row['id']}\nevent: webhook\ndata: {json.dumps(row, ensure_ascii=False)}\n\n"
@@ -0,0 +1,226 @@
+"""
+webhook后台写入模块
+请求线程只负责校验并把数据放入有界队列，由单独的写入线程按批取出，
+在一个事务中用 executemany 写入，多条数据共用一次提交
+"""
+import logging
+import queue
+import threading
+import time
+from typing import Callable, Dict, List, Optional
+
+logger = logging.getLogger('BetterGI初始化')
+
+# 默认每批最多写入的条数
+DEFAULT_MAX_BATCH_SIZE = 100
+# 默认收到第一条数据后最多等待多久再写入（秒）
+DEFAULT_MAX_DELAY = 0.05
+# 默认队列容量
+DEFAULT_QUEUE_SIZE = 1000
+# 默认队列已满时请求线程最多等待多久（秒）
+DEFAULT_ENQUEUE_TIMEOUT = 1.0
+
+# 通知写入线程退出的标记
+_STOP = object()
+
+
+class _BatchJob:
+    """
+    需要等待写入结果的一组数据，由写入线程单独用一个事务写入
+    """
+
+    def __init__(self, payloads: List[Dict]):
+        self.payloads = payloads
+        self.rows: Optional[List[Dict]] = None
+        self.done = threading.Event()
+
+
+class WebhookWriter:
+    """
+    webhook批量写入器
+    队列已满时 submit 最多阻塞 enqueue_timeout 秒，仍然放不进去则返回False，
+    由调用方拒绝请求（HTTP 503），不会无限堆积内存
+    """
+
+    def __init__(self, db_manager, max_batch_size: int = DEFAULT_MAX_BATCH_SIZE,
+                 max_delay: float = DEFAULT_MAX_DELAY, queue_size: int = DEFAULT_QUEUE_SIZE,
+                 enqueue_timeout: float = DEFAULT_ENQUEUE_TIMEOUT,
+                 on_written: Optional[Callable[[List[Dict]], None]] = None,
+                 prepare: Optional[Callable[[Dict], Dict]] = None,
+                 on_failed: Optional[Callable[[List[Dict]], None]] = None):
+        """
+        初始化批量写入器
+
+        Args:
+            db_manager: 数据库管理器，需要提供 insert_webhook_batch
+            max_batch_size: 每批最多写入的条数
+            max_delay: 收到一批中的第一条数据后最多等待的秒数
+            queue_size: 队列容量
+            enqueue_timeout: 队列已满时最多等待的秒数，0表示立即拒绝
+            on_written: 每批写入成功后以写入的记录调用的回调函数
+            prepare: 写入前在写入线程中对每条数据做的预处理（例如保存截图）
+            on_failed: 一批写入失败时以这批数据调用的回调函数
+        """
+        self.db_manager = db_manager
+        self.max_batch_size = max(1, int(max_batch_size))
+        self.max_delay = max(0.0, float(max_delay))
+        self.enqueue_timeout = max(0.0, float(enqueue_timeout))
+        self.on_written = on_written
+        self.prepare = prepare
+        self.on_failed = on_failed
+        self._queue: queue.Queue = queue.Queue(maxsize=max(1, int(queue_size)))
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+        self._stats = {'written': 0, 'duplicates': 0, 'batches': 0, 'failed': 0, 'rejected': 0}
+
+    @property
+    def is_running(self) -> bool:
+        """写入线程是否正在运行"""
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self) -> None:
+        """
+        启动写入线程，重复调用不会启动多个线程
+        """
+        if self.is_running:
+            return
+        self._thread = threading.Thread(target=self._run, name='webhook-writer', daemon=True)
+        self._thread.start()
+        logger.info(f"webhook批量写入已启动，每批最多 {self.max_batch_size} 条，最长等待 {self.max_delay} 秒")
+
+    def stop(self, timeout: Optional[float] = 5.0) -> None:
+        """
+        停止写入线程，队列中剩余的数据会先写入数据库
+
+        Args:
+            timeout: 等待线程退出的最长时间（秒）
+        """
+        if self._thread is None:
+            return
+        self._queue.put(_STOP)
+        self._thread.join(timeout)
+        self._thread = None
+
+    def submit(self, data_dict: Dict) -> bool:
+        """
+        把一条webhook数据放入写入队列
+
+        Args:
+            data_dict: 已校验的webhook数据
+
+        Returns:
+            bool: 成功放入队列返回True，队列已满返回False（数据没有被接收）
+        """
+        try:
+            if self.enqueue_timeout > 0:
+                self._queue.put(data_dict, timeout=self.enqueue_timeout)
+            else:
+                self._queue.put_nowait(data_dict)
+            return True
+        except queue.Full:
+            with self._lock:
+                self._stats['rejected'] += 1
+            logger.warning("webhook写入队列已满，拒绝本次数据")
+            return False
+
+    def write_batch(self, payloads: List[Dict]) -> Optional[List[Dict]]:
+        """
+        写入一组数据并等待结果，用于需要返回记录id的场景
+        写入线程运行时由写入线程完成预处理和写入，调用方只负责入队和等待；
+        写入线程未运行时在当前线程写入
+
+        Args:
+            payloads: 已校验的webhook数据列表
+
+        Returns:
+            Optional[List[Dict]]: 实际写入的记录（重复数据不在其中），失败或队列已满时返回None
+        """
+        if not self.is_running:
+            return self._write(payloads)
+        job = _BatchJob(payloads)
+        if not self.submit(job):
+            return None
+        while not job.done.wait(0.1):
+            if not self.is_running:
+                logger.warning("webhook写入线程已停止，批量数据没有写入")
+                return None
+        return job.rows
+
+    def flush(self) -> None:
+        """
+        等待已放入队列的数据全部写入数据库
+        """
+        if self.is_running:
+            self._queue.join()
+
+    def stats(self) -> Dict[str, int]:
+        """
+        获取写入统计
+
+        Returns:
+            Dict[str, int]: 已写入条数、被唯一索引忽略的重复条数、批次数、写入失败条数、被拒绝条数和当前队列长度
+        """
+        with self._lock:
+            return {**self._stats, 'pending': self._queue.qsize()}
+
+    def _next_batch(self) -> tuple:
+        """
+        阻塞等待第一条数据，然后在 max_delay 内继续收集，直到凑满一批
+
+        Returns:
+            tuple: (本批数据列表, 是否收到退出标记)
+        """
+        item = self._queue.get()
+        if item is _STOP:
+            return [], True
+        batch = [item]
+        deadline = time.monotonic() + self.max_delay
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.monotonic()
+            try:
+                item = self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if item is _STOP:
+                return batch, True
+            batch.append(item)
+        return batch, False
+
+    def _write(self, batch: List[Dict]) -> Optional[List[Dict]]:
+        try:
+            if self.prepare is not None:
+                batch = [self.prepare(item) for item in batch]
+            rows = self.db_manager.insert_webhook_batch(batch)
+        except Exception as e:
+            logger.error(f"批量写入webhook数据时发生错误: {e}")
+            rows = None
+        with self._lock:
+            if rows is not None:
+                # 幂等键重复的数据被 ON CONFLICT DO NOTHING 忽略，不在返回的记录中
+                self._stats['written'] += len(rows)
+                self._stats['duplicates'] += len(batch) - len(rows)
+                self._stats['batches'] += 1
+            else:
+                self._stats['failed'] += len(batch)
+        callback, argument = (self.on_written, rows) if rows is not None else (self.on_failed, batch)
+        if callback is not None and argument:
+            try:
+                callback(argument)
+            except Exception as e:
+                logger.error(f"执行webhook写入回调时发生错误: {e}")
+        return rows
+
+    def _run(self) -> None:
+        stopping = False
+        while not stopping:
+            batch, stopping = self._next_batch()
+            payloads = [item for item in batch if not isinstance(item, _BatchJob)]
+            if payloads:
+                self._write(payloads)
+            for job in batch:
+                if isinstance(job, _BatchJob):
+                    job.rows = self._write(job.payloads)
+                    job.done.set()
+            # 退出标记也占用一次 task_done，保证 flush 不会一直等待
+            for _ in range(len(batch) + (1 if stopping else 0)):
+                self._queue.task_done()
@@ -101,6 +101,76 @@ class Config:
     def ENABLE_CORS(self):
         return os.environ.get('ENABLE_CORS', 'false').lower() == 'true'
     
+    @property
+    def BACKFILL_WORKERS(self):
+        # 解析历史日志的进程数，0表示自动（最多使用一半的CPU核心）
+        return int(os.environ.get('BACKFILL_WORKERS', '0'))
+    
+    @property
+    def LOG_POLL_INTERVAL(self):
+        # 后台轮询日志目录的间隔（秒），0表示关闭后台入库，改为请求时解析
+        return float(os.environ.get('LOG_POLL_INTERVAL', '10'))
+    
+    @property
+    def LOG_CACHE_TTL(self):
+        # 日志接口结果的复用时间（秒），期间的重复请求直接共享结果，0表示只合并同时到达的请求
+        return float(os.environ.get('LOG_CACHE_TTL', '2'))
+    
+    @property
+    def WEBHOOK_BATCH_SIZE(self):
+        # webhook后台写入每批最多写入的条数
+        return int(os.environ.get('WEBHOOK_BATCH_SIZE', '100'))
+    
+    @property
+    def WEBHOOK_BATCH_DELAY(self):
+        # webhook后台写入收到第一条数据后最多等待多久再提交（秒）
+        return float(os.environ.get('WEBHOOK_BATCH_DELAY', '0.05'))
+    
+    @property
+    def WEBHOOK_QUEUE_SIZE(self):
+        # webhook写入队列容量，队列已满时接口返回503
+        return int(os.environ.get('WEBHOOK_QUEUE_SIZE', '1000'))
+    
+    @property
+    def WEBHOOK_STREAM_QUEUE_SIZE(self):
+        # 每个webhook推送客户端最多缓存的事件数量，超出后改为从数据库补发
+        return int(os.environ.get('WEBHOOK_STREAM_QUEUE_SIZE', '100'))
+    
+    @property
+    def WEBHOOK_STREAM_HEARTBEAT(self):
+        # webhook推送连接空闲时发送心跳的间隔（秒）
+        return float(os.environ.get('WEBHOOK_STREAM_HEARTBEAT', '15'))
+    
+    @property
+    def SCREENSHOT_THUMBNAIL_WIDTH(self):
+        # webhook截图缩略图宽度（像素）
+        return int(os.environ.get('SCREENSHOT_THUMBNAIL_WIDTH', '320'))
+    
+    @property
+    def WEBHOOK_IDEMPOTENCY_CACHE_SIZE(self):
+        # 内存中记住的最近webhook幂等键数量，用于快速拦截重复投递
+        return int(os.environ.get('WEBHOOK_IDEMPOTENCY_CACHE_SIZE', '10000'))
+    
+    @property
+    def WEBHOOK_RETENTION_DAYS(self):
+        # webhook数据保留天数，0表示永久保留
+        return int(os.environ.get('WEBHOOK_RETENTION_DAYS', '3'))
+    
+    @property
+    def MAINTENANCE_INTERVAL(self):
+        # 后台清理过期webhook数据的间隔（秒）
+        return float(os.environ.get('MAINTENANCE_INTERVAL', '3600'))
+    
+    @property
+    def SYSTEM_SAMPLE_INTERVAL(self):
+        # 后台采样CPU和内存使用率的间隔（秒）
+        return float(os.environ.get('SYSTEM_SAMPLE_INTERVAL', '1.0'))
+    
+    @property
+    def SYSTEM_HISTORY_SIZE(self):
+        # 内存中保留的系统指标采样点数量（/api/systemdetail?history=N 最多返回这么多）
+        return int(os.environ.get('SYSTEM_HISTORY_SIZE', '600'))
+    
     @staticmethod
     def init_app(app):
         """
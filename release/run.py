@@ -10,6 +10,8 @@
     python run.py -ssl "cert.pem,key.pem"     # 启用SSL支持（分离的证书和私钥文件）
     python run.py -ssl "combined.pem"         # 启用SSL支持（包含证书和私钥的单个文件）
     python run.py -no                          # 启动时不自动打开浏览器
+    python run.py --rebuild-rollups            # 根据明细数据重建统计汇总表后退出
+    python run.py --enable-incremental-vacuum  # 把旧数据库切换为增量清理模式后退出
 
 环境配置说明:
     - production: 生产环境，默认端口3000，关闭调试模式，关闭CORS
@@ -27,8 +29,10 @@ import os
 import sys
 import argparse
 import logging
+import multiprocessing
 from app import create_app
-from app.api.views import init_controllers
+from app.api.views import init_controllers, start_background_services, stop_background_services
+from app.infrastructure.database import DatabaseManager
 from app.infrastructure.utils import find_bettergi_install_path, open_browser_after_start
 from config import Config
 
@@ -50,6 +54,10 @@ def parse_arguments():
                        help='运行环境 (development/production/testing)，默认为production')
     parser.add_argument('-ssl', '--ssl_cert', default=None, 
                        help='SSL证书文件路径，格式为"cert.pem,key.pem"或单个.pem文件路径')
+    parser.add_argument('--rebuild-rollups', action='store_true',
+                       help='根据物品明细重新生成统计汇总表，完成后退出')
+    parser.add_argument('--enable-incremental-vacuum', action='store_true',
+                       help='执行一次VACUUM把旧数据库切换为增量清理模式，完成后退出')
     # parser.add_argument('-no', '--do_not_open_website', action='store_true', 
     #                    help='默认启动时打开网页，传递此参数以禁用')
     return parser.parse_args()
@@ -142,6 +150,16 @@ def main():
         install_path = setup_bgi_path(args.bgi_path)
         bgi_log_dir = os.path.join(install_path, 'log')
         
+        # 一次性重建统计汇总表
+        if args.rebuild_rollups:
+            db_manager = DatabaseManager(os.path.join(bgi_log_dir, 'CanLiangData.db'))
+            sys.exit(0 if db_manager.rebuild_rollups() else 1)
+        
+        # 一次性把旧数据库切换为增量清理模式
+        if args.enable_incremental_vacuum:
+            db_manager = DatabaseManager(os.path.join(bgi_log_dir, 'CanLiangData.db'))
+            sys.exit(0 if db_manager.enable_incremental_vacuum() else 1)
+        
         # 根据环境参数创建Flask应用
         app = create_app(args.environment)
         
@@ -155,7 +173,10 @@ def main():
         port = config_instance.PORT
         
         # 初始化控制器（不再需要target_app参数）
-        init_controllers(bgi_log_dir)
+        init_controllers(bgi_log_dir, app.config)
+        
+        # 启动后台日志入库服务，在请求到来之前完成解析
+        start_background_services(app.config)
         
         # 如果不禁用，则启动浏览器
         # if not args.do_not_open_website:
@@ -206,6 +227,12 @@ def cleanup_resources():
     except Exception as e:
         logger.error(f"清理推流资源时发生错误: {e}")
     
+    try:
+        # 停止后台日志入库等服务
+        stop_background_services()
+    except Exception as e:
+        logger.error(f"停止后台服务时发生错误: {e}")
+    
     try:
         # 清理其他可能的资源
         logger.info("清理其他资源...")
@@ -215,4 +242,6 @@ def cleanup_resources():
 
 
 if __name__ == "__main__":
+    # 打包后的程序在子进程中解析历史日志时需要
+    multiprocessing.freeze_support()
     main()
\ No newline at end of file
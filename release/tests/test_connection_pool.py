@@ -0,0 +1,77 @@
+"""
+数据库连接池测试模块
+测试连接复用、连接数上限以及归还时回滚未提交的事务
+"""
+import os
+import shutil
+import tempfile
+import unittest
+
+from app.infrastructure.database import DatabaseManager, SQLiteConnectionPool
+
+
+class TestConnectionPool(unittest.TestCase):
+    """
+    连接池测试
+    """
+
+    def setUp(self):
+        """
+        测试前的设置
+        """
+        self.temp_dir = tempfile.mkdtemp()
+        self.db_path = os.path.join(self.temp_dir, 'CanLiangData.db')
+
+    def tearDown(self):
+        """
+        测试后的清理
+        """
+        shutil.rmtree(self.temp_dir)
+
+    def test_connections_are_reused(self):
+        """
+        测试连续操作复用同一个连接，连接池大小为0时每次新建连接
+        """
+        db_manager = DatabaseManager(self.db_path, pool_size=4)
+        with db_manager.get_connection() as first:
+            pass
+        with db_manager.get_connection() as second:
+            pass
+        self.assertIs(first, second)
+        db_manager.close()
+
+        pool = SQLiteConnectionPool(self.db_path, size=0)
+        first, second = pool.acquire(), pool.acquire()
+        self.assertIsNot(first, second)
+        pool.release(first)
+        pool.release(second)
+
+    def test_size_limit(self):
+        """
+        测试借出的连接数达到上限后等待超时
+        """
+        pool = SQLiteConnectionPool(self.db_path, size=2, timeout=0.05)
+        connections = [pool.acquire(), pool.acquire()]
+        with self.assertRaises(TimeoutError):
+            pool.acquire()
+        pool.release(connections.pop())
+        connections.append(pool.acquire())
+        for conn in connections:
+            pool.release(conn)
+        pool.close()
+
+    def test_release_rolls_back(self):
+        """
+        测试归还连接时回滚未提交的事务，下一个借用者看不到未提交的数据
+        """
+        db_manager = DatabaseManager(self.db_path, pool_size=1)
+        with db_manager.get_connection() as conn:
+            conn.execute("INSERT INTO post_data (event) VALUES ('uncommitted')")
+        with db_manager.get_connection() as conn:
+            self.assertFalse(conn.in_transaction)
+            self.assertEqual(conn.execute('SELECT COUNT(*) FROM post_data').fetchone()[0], 0)
+        db_manager.close()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,60 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+性能测试脚本 - 对比每次新建连接与连接池复用连接的数据库操作延迟
+"""
+
+import os
+import statistics
+import tempfile
+import time
+
+from app.infrastructure.database import DatabaseManager
+
+
+def measure_latency(db_manager: DatabaseManager, operation, repeat: int = 300) -> dict:
+    """
+    测量单次数据库操作的延迟（毫秒），返回中位数和P95
+    """
+    samples = []
+    for _ in range(repeat):
+        start_time = time.perf_counter()
+        operation(db_manager)
+        samples.append((time.perf_counter() - start_time) * 1000)
+    samples.sort()
+    return {'p50': statistics.median(samples), 'p95': samples[int(len(samples) * 0.95) - 1]}
+
+
+def read_dates(db_manager: DatabaseManager):
+    assert db_manager.get_stored_dates() == ['20250101']
+
+
+def write_webhook(db_manager: DatabaseManager):
+    assert db_manager.save_webhook_data({'event': 'benchmark', 'result': 'ok', 'message': '性能测试'})
+
+
+def test_pooled_connection_latency():
+    """对比新建连接与连接池的读写延迟（只输出结果，连接复用的行为由 test_connection_pool 验证）"""
+    print("=== 数据库连接池性能测试 ===")
+
+    results = {}
+    with tempfile.TemporaryDirectory() as temp_dir:
+        for pool_size in (0, 4):
+            db_manager = DatabaseManager(os.path.join(temp_dir, f'pool{pool_size}.db'), pool_size=pool_size)
+            db_manager.insert_log_file_data('20250101', 60, [
+                {'name': '摩拉', 'timestamp': '10:00:00.000', 'config_group': None},
+            ])
+            results[pool_size] = {
+                'read': measure_latency(db_manager, read_dates),
+                'write': measure_latency(db_manager, write_webhook),
+            }
+            db_manager.close()
+
+    for operation in ('read', 'write'):
+        baseline, pooled = results[0][operation], results[4][operation]
+        print(f"{operation}: 新建连接 p50={baseline['p50']:.3f} ms p95={baseline['p95']:.3f} ms，"
+              f"连接池 p50={pooled['p50']:.3f} ms p95={pooled['p95']:.3f} ms")
+
+
+if __name__ == "__main__":
+    test_pooled_connection_latency()
@@ -0,0 +1,169 @@
+"""
+日志控制器测试模块
+测试日志接口的请求合并和列式编码
+"""
+import itertools
+import json
+import threading
+import unittest
+
+from app.controllers.logs import LogController, SingleFlight, encode_columnar_items
+
+
+class FakeClock:
+    """
+    可手动推进的时钟
+    """
+
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class TestSingleFlight(unittest.TestCase):
+    """
+    请求合并测试
+    """
+
+    def test_concurrent_calls_share_one_computation(self):
+        """
+        测试同时到达的相同请求只计算一次
+        """
+        flight = SingleFlight(freshness_window=0)
+        started = threading.Event()
+        release = threading.Event()
+        calls = []
+
+        def compute():
+            calls.append(1)
+            started.set()
+            release.wait(5)
+            return {'list': ['20250101']}
+
+        results = []
+        leader = threading.Thread(target=lambda: results.append(flight.do('LogList', compute)))
+        leader.start()
+        started.wait(5)
+        followers = [threading.Thread(target=lambda: results.append(flight.do('LogList', compute))) for _ in range(4)]
+        for thread in followers:
+            thread.start()
+        while flight.stats()['coalesced'] < 4:
+            release.wait(0.01)
+        release.set()
+        for thread in [leader] + followers:
+            thread.join(5)
+
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(len(results), 5)
+        self.assertTrue(all(result is results[0] for result in results))
+        stats = flight.stats()
+        self.assertEqual((stats['misses'], stats['coalesced'], stats['hits']), (1, 4, 0))
+
+    def test_freshness_window(self):
+        """
+        测试复用时间内直接返回缓存结果，过期后重新计算
+        """
+        clock = FakeClock()
+        flight = SingleFlight(freshness_window=2, clock=clock)
+        counter = iter(range(100))
+
+        self.assertEqual(flight.do('LogData', lambda: next(counter)), 0)
+        clock.now = 1.5
+        self.assertEqual(flight.do('LogData', lambda: next(counter)), 0)
+        clock.now = 2.5
+        self.assertEqual(flight.do('LogData', lambda: next(counter)), 1)
+        self.assertEqual(flight.do('LogList', lambda: next(counter)), 2)
+
+        stats = flight.stats()
+        self.assertEqual((stats['misses'], stats['hits']), (3, 1))
+
+    def test_errors_are_not_cached(self):
+        """
+        测试计算失败时不缓存结果
+        """
+        flight = SingleFlight(freshness_window=60)
+
+        def fail():
+            raise RuntimeError('boom')
+
+        with self.assertRaises(RuntimeError):
+            flight.do('LogData', fail)
+        self.assertEqual(flight.do('LogData', lambda: 'ok'), 'ok')
+
+
+class TestLogControllerCoalescing(unittest.TestCase):
+    """
+    日志控制器请求合并测试
+    """
+
+    def test_log_list_is_reused(self):
+        """
+        测试复用时间内重复请求不再访问数据管理器
+        """
+        class Manager:
+            log_list = None
+            calls = 0
+
+            def get_log_list(self):
+                Manager.calls += 1
+                return ['20250101', '20250102']
+
+        controller = LogController('unused', manager=Manager(), freshness_window=60)
+        self.assertEqual(controller.get_log_list(), {'list': ['20250102', '20250101']})
+        self.assertEqual(controller.get_log_list(), {'list': ['20250102', '20250101']})
+        self.assertEqual(Manager.calls, 1)
+        self.assertEqual(controller.get_cache_stats()['hits'], 1)
+
+
+def decode_columnar_items(encoded):
+    """
+    将列式编码的物品数据还原为四个平行列表
+    """
+    names = [encoded['物品名称']['values'][code] for code in encoded['物品名称']['codes']]
+    groups = [encoded['归属配置组']['values'][code] for code in encoded['归属配置组']['codes']]
+    times = ['%02d:%02d:%02d.%03d' % (ms // 3600000, ms // 60000 % 60, ms // 1000 % 60, ms % 1000)
+             for ms in itertools.accumulate(encoded['时间'])]
+    dates = [date_str for date_str, count in encoded['日期'] for _ in range(count)]
+    return {'物品名称': names, '时间': times, '日期': dates, '归属配置组': groups}
+
+
+class TestColumnarEncoding(unittest.TestCase):
+    """
+    物品数据列式编码测试
+    """
+
+    def setUp(self):
+        """
+        生成30天、每天1000条拾取的物品数据
+        """
+        self.item_data = {'物品名称': [], '时间': [], '日期': [], '归属配置组': []}
+        for day in range(30, 0, -1):
+            for index in range(1000):
+                seconds = 3600 + index * 7
+                self.item_data['物品名称'].append(f'物品{index % 40}')
+                self.item_data['时间'].append('%02d:%02d:%02d.%03d' % (seconds // 3600, seconds // 60 % 60, seconds % 60, index % 1000))
+                self.item_data['日期'].append(f'202501{day:02d}')
+                self.item_data['归属配置组'].append(f'配置组{index // 250}' if index % 3 else '')
+
+    def test_round_trip(self):
+        """
+        测试编码后可以无损还原
+        """
+        encoded = encode_columnar_items(self.item_data)
+        self.assertEqual(encoded['count'], 30000)
+        self.assertEqual(len(encoded['日期']), 30)
+        self.assertEqual(decode_columnar_items(encoded), self.item_data)
+
+    def test_payload_is_smaller(self):
+        """
+        测试列式编码的JSON体积至少缩小5倍
+        """
+        plain = len(json.dumps(self.item_data, separators=(',', ':')))
+        columnar = len(json.dumps(encode_columnar_items(self.item_data), separators=(',', ':')))
+        self.assertGreaterEqual(plain / columnar, 5)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,617 @@
+"""
+日志解析测试模块
+测试日志记录切分、解析状态以及今天日志的增量追踪
+"""
+import json
+import os
+import shutil
+import tempfile
+import threading
+import time
+import unittest
+from datetime import datetime
+from unittest.mock import PropertyMock, patch
+
+from app.infrastructure.log_parser import (
+    LOG_PATTERN, FIRST_LINE_PATTERN, ItemDedupIndex, LogParseState, LogRecordSplitter, iter_log_records,
+    split_log_records
+)
+from app.infrastructure.log_chunks import LogChunkState, find_chunk_boundaries, parse_log_chunk
+from app.infrastructure.ingestion import LogIngestionService, seconds_until_next_rollover
+from app.controllers.logs import LogController
+from app.domain.entities import ItemInfo
+from app.infrastructure.manager import LogDataManager, build_log_snapshot
+
+
+def build_log(lines):
+    """
+    按BetterGI的日志格式拼接日志文本
+
+    Args:
+        lines: [(时间戳, 日志内容), ...]
+
+    Returns:
+        str: 日志文本
+    """
+    return ''.join(f'[{timestamp}] [INF] BetterGenshinImpact.Test\n{details}\n\n' for timestamp, details in lines)
+
+
+SAMPLE_LINES = [
+    ('10:00:00.000', '配置组 "自动拾取" 加载完成，共1个脚本，开始执行'),
+    ('10:00:01.000', '交互或拾取："摩拉"'),
+    ('10:00:02.000', '交互或拾取："经验书"'),
+    ('10:00:02.000', '交互或拾取："经验书"'),
+    ('10:00:03.000', '调查'),
+    ('10:20:00.000', '交互或拾取："原石"'),
+    ('10:21:00.000', '配置组 "自动拾取" 执行结束'),
+    ('10:22:00.000', '交互或拾取："摩拉"'),
+]
+
+
+class TestLogRecordSplitter(unittest.TestCase):
+    """
+    日志记录切分器测试
+    """
+
+    def test_split_matches_findall(self):
+        """
+        测试整段切分结果与原有正则匹配一致
+        """
+        content = build_log(SAMPLE_LINES)
+        expected = [FIRST_LINE_PATTERN.match(content).groups()] + LOG_PATTERN.findall(content)
+        self.assertEqual(split_log_records(content), expected)
+
+    def test_feed_in_small_pieces(self):
+        """
+        测试任意切分输入时结果不变
+        """
+        content = build_log(SAMPLE_LINES)
+        expected = split_log_records(content)
+        for size in (1, 7, 64):
+            splitter = LogRecordSplitter()
+            records = []
+            for start in range(0, len(content), size):
+                records.extend(splitter.feed(content[start:start + size]))
+            records.extend(splitter.finish())
+            self.assertEqual(records, expected)
+
+    def test_iter_log_records_from_file(self):
+        """
+        测试分块流式读取文件的结果与整段读取一致（包括CRLF换行）
+        """
+        content = build_log(SAMPLE_LINES)
+        with tempfile.TemporaryDirectory() as temp_dir:
+            file_path = os.path.join(temp_dir, 'better-genshin-impact20250101.log')
+            with open(file_path, 'w', encoding='utf-8', newline='\r\n') as file:
+                file.write(content)
+            self.assertEqual(list(iter_log_records(file_path, chunk_size=5)), split_log_records(content))
+
+
+class TestItemDedupIndex(unittest.TestCase):
+    """
+    物品去重索引测试
+    """
+
+    def test_dedup_per_date(self):
+        """
+        测试同一日期内去重，不同日期互不影响
+        """
+        index = ItemDedupIndex()
+        self.assertTrue(index.add('摩拉', '10:00:00.000', '20250101', '组1'))
+        self.assertFalse(index.add('摩拉', '10:00:00.000', '20250101', '组1'))
+        self.assertTrue(index.add('摩拉', '10:00:00.000', '20250102', '组1'))
+        self.assertTrue(index.add('摩拉', '10:00:00.000', '20250101', None))
+
+        index.reset('20250101')
+        self.assertTrue(index.add('摩拉', '10:00:00.000', '20250101', '组1'))
+
+    def test_evicts_oldest_date(self):
+        """
+        测试超过日期上限时淘汰最久未使用的日期
+        """
+        index = ItemDedupIndex(max_dates=2)
+        index.add('摩拉', '10:00:00.000', '20250101', None)
+        index.add('摩拉', '10:00:00.000', '20250102', None)
+        index.add('摩拉', '10:00:00.000', '20250103', None)
+        self.assertEqual(len(index), 2)
+        self.assertTrue(index.add('摩拉', '10:00:00.000', '20250101', None))
+
+    def test_dedup_does_not_scan_items(self):
+        """
+        测试去重只查询索引：每条拾取调用一次索引，从不遍历已解析的物品列表
+        """
+        class AppendOnlyList(list):
+            def __iter__(self):
+                raise AssertionError('去重时遍历了物品列表')
+
+            def __contains__(self, value):
+                raise AssertionError('去重时遍历了物品列表')
+
+        index = ItemDedupIndex()
+        calls = []
+
+        def is_new_item(*key):
+            calls.append(key)
+            return index.add(*key)
+
+        lines = [('10:00:%02d.000' % (i % 40), f'交互或拾取："物品{i % 7}"') for i in range(300)]
+        state = LogParseState('20250101', items=AppendOnlyList())
+        state.consume(split_log_records(build_log(lines)), is_new_item)
+        self.assertEqual(len(calls), 300)
+        self.assertEqual(len(state.items), 280)
+        self.assertEqual(len(index), 280)
+
+
+class TestTodayLogFollower(unittest.TestCase):
+    """
+    今天日志的增量追踪测试
+    """
+
+    def setUp(self):
+        """
+        测试前的设置
+        """
+        self.temp_dir = tempfile.mkdtemp()
+        self.manager = LogDataManager(self.temp_dir)
+        self.log_path = os.path.join(self.temp_dir, f'better-genshin-impact{self.manager.today_str}.log')
+
+    def tearDown(self):
+        """
+        测试后的清理
+        """
+        shutil.rmtree(self.temp_dir)
+
+    def _write(self, content, mode='w'):
+        with open(self.log_path, mode, encoding='utf-8', newline='') as file:
+            file.write(content)
+
+    def _full_parse(self, content):
+        return LogDataManager(tempfile.mkdtemp(dir=self.temp_dir)).parse_log(content, self.manager.today_str)
+
+    def test_incremental_matches_full_parse(self):
+        """
+        测试分多次追加后的结果与一次性解析一致
+        """
+        content = build_log(SAMPLE_LINES)
+        self._write(content[:150])
+        self.manager._get_today_data()
+        self._write(content[150:], mode='a')
+        duration, items = self.manager._get_today_data()
+
+        expected = self._full_parse(content)
+        self.assertEqual(duration, expected.duration)
+        self.assertEqual(items, expected.items)
+
+    def test_resume_from_checkpoint(self):
+        """
+        测试重启后从检查点继续解析
+        """
+        content = build_log(SAMPLE_LINES)
+        self._write(build_log(SAMPLE_LINES[:4]))
+        self.manager._get_today_data()
+        offset = self.manager._today_follower.offset
+
+        restarted = LogDataManager(self.temp_dir)
+        restarted._get_today_data()
+        self.assertEqual(restarted._today_follower.offset, offset)
+
+        self._write(build_log(SAMPLE_LINES[4:]), mode='a')
+        duration, items = restarted._get_today_data()
+        expected = self._full_parse(content)
+        self.assertEqual(duration, expected.duration)
+        self.assertEqual(items, expected.items)
+
+    def test_checkpoint_excludes_items(self):
+        """
+        测试检查点只保存标量状态，大小不随物品数量增长
+        """
+        self._write(build_log(SAMPLE_LINES[:4]))
+        self.manager._get_today_data()
+        file_name = os.path.basename(self.log_path)
+        small = self.manager.db_manager.get_log_checkpoint(file_name)['state']
+        self.assertNotIn('items', json.loads(small)['parse_state'])
+
+        self._write(build_log([('10:01:%02d.000' % i, '交互或拾取："摩拉"') for i in range(50)]), mode='a')
+        duration, items = self.manager._get_today_data()
+        large = self.manager.db_manager.get_log_checkpoint(file_name)['state']
+        self.assertLess(len(large), len(small) + 100)
+
+        restarted = LogDataManager(self.temp_dir)
+        self.assertEqual(restarted._get_today_data(), (duration, items))
+
+    def test_idle_refresh_reuses_snapshot(self):
+        """
+        测试没有新内容时刷新不再读取历史数据、不再重新生成快照；今天有新内容时只重建快照
+        """
+        self._write(build_log(SAMPLE_LINES[:4]))
+        first = self.manager.refresh()
+
+        with patch.object(self.manager.db_manager, 'get_item_data') as mock_items, \
+                patch('app.infrastructure.manager.build_log_snapshot') as mock_build:
+            self.assertIs(self.manager.refresh(), first)
+            mock_items.assert_not_called()
+            mock_build.assert_not_called()
+
+        self._write(build_log(SAMPLE_LINES[4:]), mode='a')
+        with patch.object(self.manager.db_manager, 'get_item_data') as mock_items:
+            second = self.manager.refresh()
+            mock_items.assert_not_called()
+        self.assertIsNot(second, first)
+        self.assertIn('原石', second.item_data['物品名称'])
+
+    def test_truncated_file_is_reparsed(self):
+        """
+        测试文件被截断或替换后从头解析
+        """
+        self._write(build_log(SAMPLE_LINES))
+        self.manager._get_today_data()
+
+        replacement = build_log([('11:00:00.000', '交互或拾取："树脂"')])
+        self._write(replacement)
+        duration, items = self.manager._get_today_data()
+        self.assertEqual([item.name for item in items], ['树脂'])
+        self.assertEqual(duration, 0)
+
+
+class TestDayRollover(unittest.TestCase):
+    """
+    今天数据的持续入库和跨天定稿测试
+    """
+
+    def setUp(self):
+        """
+        测试前的设置：把“今天”固定为20250101
+        """
+        self.temp_dir = tempfile.mkdtemp()
+        self.log_path = os.path.join(self.temp_dir, 'better-genshin-impact20250101.log')
+        self.today = '20250101'
+        patcher = patch.object(LogDataManager, 'today_str', new_callable=PropertyMock,
+                               side_effect=lambda: self.today)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.manager = LogDataManager(self.temp_dir)
+        self.manager.backfill_workers = 1
+
+    def tearDown(self):
+        """
+        测试后的清理
+        """
+        shutil.rmtree(self.temp_dir)
+
+    def test_today_is_persisted_and_finalized(self):
+        """
+        测试今天的物品持续写入数据库，跨天后定稿且不再整体重新解析
+        """
+        content = build_log(SAMPLE_LINES)
+        with open(self.log_path, 'w', encoding='utf-8', newline='') as file:
+            file.write(content[:200])
+        self.manager.refresh()
+        info = self.manager.db_manager.get_log_file_info('20250101')
+        self.assertTrue(info['provisional'])
+
+        # 最后一条记录没有结尾的空行，只有定稿时才会被处理
+        with open(self.log_path, 'a', encoding='utf-8', newline='') as file:
+            file.write(content[200:] + '[10:30:00.000] [INF] BetterGenshinImpact.Test\n交互或拾取："树脂"\n')
+
+        self.today = '20250102'
+        with patch('app.infrastructure.manager.parse_log_file') as mock_parse:
+            snapshot = self.manager.rollover()
+            mock_parse.assert_not_called()
+
+        info = self.manager.db_manager.get_log_file_info('20250101')
+        self.assertFalse(info['provisional'])
+        expected = LogDataManager(tempfile.mkdtemp(dir=self.temp_dir)).read_log_file(self.log_path, '20250101')
+        self.assertEqual(info['item_count'], len(expected.items))
+        self.assertEqual(info['duration'], expected.duration)
+        self.assertIn('树脂', snapshot.item_data['物品名称'])
+        self.assertEqual(snapshot.log_list, ('20250101',))
+
+    def test_provisional_day_finalized_after_restart(self):
+        """
+        测试程序没有跨天运行时，重启后重新解析前一天的文件，补上停止后追加的物品并定稿
+        """
+        content = build_log(SAMPLE_LINES)
+        with open(self.log_path, 'w', encoding='utf-8', newline='') as file:
+            file.write(content[:200])
+        self.manager.refresh()
+        self.manager.db_manager.close()
+
+        with open(self.log_path, 'a', encoding='utf-8', newline='') as file:
+            file.write(content[200:] + build_log([('10:30:00.000', '交互或拾取："树脂"')]))
+
+        self.today = '20250102'
+        restarted = LogDataManager(self.temp_dir)
+        restarted.backfill_workers = 1
+        snapshot = restarted.refresh()
+
+        info = restarted.db_manager.get_log_file_info('20250101')
+        self.assertFalse(info['provisional'])
+        expected = LogDataManager(tempfile.mkdtemp(dir=self.temp_dir)).read_log_file(self.log_path, '20250101')
+        self.assertEqual(info['item_count'], len(expected.items))
+        self.assertIn('树脂', snapshot.item_data['物品名称'])
+
+    def test_seconds_until_next_rollover(self):
+        """
+        测试距离下一次跨天处理的时间
+        """
+        self.assertEqual(seconds_until_next_rollover(datetime(2025, 1, 1, 23, 59, 0), delay=5), 65)
+
+
+class TestHistoricalBackfill(unittest.TestCase):
+    """
+    历史日志回填测试
+    """
+
+    def setUp(self):
+        """
+        测试前的设置
+        """
+        self.temp_dir = tempfile.mkdtemp()
+        for day in ('20250101', '20250102', '20250103'):
+            with open(os.path.join(self.temp_dir, f'better-genshin-impact{day}.log'), 'w', encoding='utf-8') as file:
+                file.write(build_log(SAMPLE_LINES))
+        with open(os.path.join(self.temp_dir, 'better-genshin-impact20250104.log'), 'w', encoding='utf-8') as file:
+            file.write(build_log([('10:00:00.000', '没有物品')]))
+
+    def tearDown(self):
+        """
+        测试后的清理
+        """
+        shutil.rmtree(self.temp_dir)
+
+    def _backfill(self, workers):
+        data_dir = tempfile.mkdtemp(dir=self.temp_dir)
+        for name in os.listdir(self.temp_dir):
+            if name.endswith('.log'):
+                shutil.copy(os.path.join(self.temp_dir, name), data_dir)
+        manager = LogDataManager(data_dir)
+        manager.backfill_workers = workers
+        return manager._get_historical_data()
+
+    def test_parallel_matches_serial(self):
+        """
+        测试进程池并行回填与串行回填结果一致
+        """
+        serial_duration, serial_items = self._backfill(1)
+        parallel_duration, parallel_items = self._backfill(2)
+
+        self.assertEqual(sorted(serial_duration), ['20250101', '20250102', '20250103'])
+        self.assertEqual(parallel_duration, serial_duration)
+        self.assertEqual(parallel_items, serial_items)
+
+    def test_unchanged_files_are_not_reread(self):
+        """
+        测试未变化的历史文件不再读取，内容变化的文件会重新入库
+        """
+        manager = LogDataManager(self.temp_dir)
+        manager.backfill_workers = 1
+        manager._get_historical_data()
+
+        with patch('app.infrastructure.manager.parse_log_file') as mock_parse:
+            manager._get_historical_data()
+            mock_parse.assert_not_called()
+
+        with open(os.path.join(self.temp_dir, 'better-genshin-impact20250102.log'), 'a', encoding='utf-8') as file:
+            file.write(build_log([('11:00:00.000', '交互或拾取："树脂"')]))
+        duration_data, item_data = manager._get_historical_data()
+        self.assertIn('树脂', item_data['20250102']['物品名称'])
+        self.assertNotIn('树脂', item_data['20250101']['物品名称'])
+
+    def test_shrunk_file_replaces_stored_items(self):
+        """
+        测试历史文件被截断替换后，旧的物品记录被替换而不是保留
+        """
+        manager = LogDataManager(self.temp_dir)
+        manager.backfill_workers = 1
+        manager._get_historical_data()
+
+        with open(os.path.join(self.temp_dir, 'better-genshin-impact20250103.log'), 'w', encoding='utf-8') as file:
+            file.write(build_log([('11:00:00.000', '交互或拾取："树脂"')]))
+        duration_data, item_data = manager._get_historical_data()
+        self.assertEqual(item_data['20250103']['物品名称'], ['树脂'])
+
+
+class TestChunkedParsing(unittest.TestCase):
+    """
+    单个文件分块解析测试
+    """
+
+    def setUp(self):
+        """
+        测试前的设置：生成配置组和时间段跨越多个分块的日志
+        """
+        lines = [('00:00:01.000', '交互或拾取："开头物品"')]
+        seconds = 10
+        for round_index in range(30):
+            group = f'配置组{round_index % 3}'
+            lines.append((seconds, f'配置组 "{group}" 加载完成，共2个脚本，开始执行'))
+            for pickup in range(10):
+                seconds += 7
+                lines.append((seconds, f'交互或拾取："物品{pickup % 4}"'))
+                if pickup == 3:
+                    lines.append((seconds, f'交互或拾取："物品{pickup % 4}"'))
+            if round_index % 4 != 0:
+                lines.append((seconds + 1, f'配置组 "{group}" 执行结束'))
+            seconds += 400 if round_index % 5 == 0 else 30
+        content = build_log([
+            (item if isinstance(item, str) else '%02d:%02d:%02d.000' % (item // 3600, item // 60 % 60, item % 60), details)
+            for item, details in lines
+        ])
+
+        self.temp_dir = tempfile.mkdtemp()
+        self.file_path = os.path.join(self.temp_dir, 'better-genshin-impact20250101.log')
+        with open(self.file_path, 'w', encoding='utf-8', newline='\r\n') as file:
+            file.write(content)
+        self.expected = LogDataManager(self.temp_dir).read_log_file(self.file_path, '20250101')
+
+    def tearDown(self):
+        """
+        测试后的清理
+        """
+        shutil.rmtree(self.temp_dir)
+
+    def _chunk_states(self, chunk_count):
+        boundaries = find_chunk_boundaries(self.file_path, chunk_count)
+        return [parse_log_chunk(self.file_path, start, end) for start, end in zip(boundaries, boundaries[1:])]
+
+    def test_merged_chunks_match_serial(self):
+        """
+        测试不同分块数量下合并结果与串行解析一致
+        """
+        for chunk_count in (1, 2, 5, 17, 40):
+            states = self._chunk_states(chunk_count)
+            merged = LogChunkState()
+            for state in states:
+                merged.merge(state)
+            self.assertFalse(merged.spilled)
+            result = merged.to_result('20250101')
+            self.assertEqual(result.duration, self.expected.duration)
+            self.assertEqual(result.item_count, self.expected.item_count)
+            self.assertEqual(result.items, self.expected.items)
+
+    def test_merge_is_associative(self):
+        """
+        测试先合并后半部分再合并整体，结果不变
+        """
+        states = self._chunk_states(6)
+        middle = len(states) // 2
+        right = LogChunkState()
+        for state in states[middle:]:
+            right.merge(state)
+        left = LogChunkState()
+        for state in states[:middle]:
+            left.merge(state)
+        result = left.merge(right).to_result('20250101')
+        self.assertEqual(result.duration, self.expected.duration)
+        self.assertEqual(result.items, self.expected.items)
+
+
+class TestLogDataSnapshot(unittest.TestCase):
+    """
+    日志数据快照测试
+    """
+
+    def test_build_snapshot_order(self):
+        """
+        测试今天的物品倒序排在最前面，历史物品保持数据库顺序
+        """
+        historical_items = {
+            '20250102': {'物品名称': ['摩拉', '原石'], '时间': ['10:00:00.000', '10:01:00.000'], '归属配置组': ['组1', '']},
+            '20250101': {'物品名称': ['树脂'], '时间': ['09:00:00.000'], '归属配置组': ['组2']},
+        }
+        today_items = [
+            ItemInfo('经验书', '08:00:00.000', '20250103', None),
+            ItemInfo('矿石', '08:01:00.000', '20250103', '组3'),
+        ]
+        snapshot = build_log_snapshot({'20250101': 60, '20250102': 120}, historical_items, '20250103', 30, today_items)
+
+        self.assertEqual(snapshot.log_list, ('20250103', '20250102', '20250101'))
+        self.assertEqual(dict(snapshot.duration_data), {'日期': ('20250103', '20250102', '20250101'), '持续时间': (30, 120, 60)})
+        self.assertEqual(dict(snapshot.item_data), {
+            '物品名称': ('矿石', '经验书', '摩拉', '原石', '树脂'),
+            '时间': ('08:01:00.000', '08:00:00.000', '10:00:00.000', '10:01:00.000', '09:00:00.000'),
+            '日期': ('20250103', '20250103', '20250102', '20250102', '20250101'),
+            '归属配置组': ('组3', '', '组1', '', '组2'),
+        })
+        with self.assertRaises(TypeError):
+            snapshot.item_data['物品名称'] = ()
+
+    def test_log_data_refreshes_once(self):
+        """
+        测试一次LogData请求只刷新一次数据
+        """
+        with tempfile.TemporaryDirectory() as temp_dir:
+            with open(os.path.join(temp_dir, 'better-genshin-impact20250101.log'), 'w', encoding='utf-8') as file:
+                file.write(build_log(SAMPLE_LINES))
+            manager = LogDataManager(temp_dir)
+            manager.backfill_workers = 1
+            controller = LogController(temp_dir, manager=manager)
+
+            with patch.object(manager, '_get_historical_data', wraps=manager._get_historical_data) as mock_load:
+                data = controller.get_log_data()
+                self.assertEqual(mock_load.call_count, 1)
+            self.assertEqual(list(data['duration']['日期']), ['20250101'])
+            self.assertEqual(len(data['item']['物品名称']), len(data['item']['日期']))
+
+    def test_concurrent_refreshes_are_coalesced(self):
+        """
+        测试并发刷新被合并，同一时间只有一次重建
+        """
+        with tempfile.TemporaryDirectory() as temp_dir:
+            manager = LogDataManager(temp_dir)
+            manager.backfill_workers = 1
+            started = threading.Event()
+            release = threading.Event()
+            original = manager._refresh_snapshot
+            calls = []
+
+            def slow_refresh():
+                calls.append(1)
+                started.set()
+                release.wait(5)
+                return original()
+
+            with patch.object(manager, '_refresh_snapshot', side_effect=slow_refresh):
+                threads = [threading.Thread(target=manager.refresh)]
+                threads[0].start()
+                started.wait(5)
+                # 第一轮刷新进行中时到达的请求只需要再等一轮
+                threads += [threading.Thread(target=manager.refresh) for _ in range(5)]
+                for thread in threads[1:]:
+                    thread.start()
+                time.sleep(0.1)
+                release.set()
+                for thread in threads:
+                    thread.join(5)
+            self.assertEqual(len(calls), 2)
+            self.assertIsNotNone(manager.snapshot)
+
+
+class TestLogIngestionService(unittest.TestCase):
+    """
+    后台日志入库服务测试
+    """
+
+    def setUp(self):
+        """
+        测试前的设置
+        """
+        self.temp_dir = tempfile.mkdtemp()
+        with open(os.path.join(self.temp_dir, 'better-genshin-impact20250101.log'), 'w', encoding='utf-8') as file:
+            file.write(build_log(SAMPLE_LINES))
+        self.manager = LogDataManager(self.temp_dir)
+        self.manager.backfill_workers = 1
+
+    def tearDown(self):
+        """
+        测试后的清理
+        """
+        shutil.rmtree(self.temp_dir)
+
+    def test_reads_use_precomputed_state(self):
+        """
+        测试后台刷新完成后，读取接口不再触发解析
+        """
+        service = LogIngestionService(self.manager, poll_interval=60)
+        service.start()
+        try:
+            for _ in range(100):
+                if self.manager.background_refresh:
+                    break
+                service._stop_event.wait(0.05)
+            self.assertTrue(self.manager.background_refresh)
+
+            with patch.object(self.manager, '_refresh_snapshot') as mock_refresh:
+                duration_data = self.manager.get_duration_data()
+                item_data = self.manager.get_item_data()
+                mock_refresh.assert_not_called()
+            self.assertEqual(duration_data['日期'], ['20250101'])
+            self.assertIn('原石', item_data['物品名称'])
+        finally:
+            service.stop()
+        self.assertFalse(service.is_running)
+        self.assertFalse(self.manager.background_refresh)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,114 @@
+"""
+数据库维护测试模块
+测试webhook数据的分批清理、增量清理以及读取接口不再写入数据库
+"""
+import os
+import shutil
+import sqlite3
+import tempfile
+import unittest
+from datetime import datetime, timedelta
+
+from app.infrastructure.database import DatabaseManager
+from app.infrastructure.maintenance import MaintenanceScheduler
+
+
+class TestWebhookRetention(unittest.TestCase):
+    """
+    webhook数据保留测试
+    """
+
+    def setUp(self):
+        """
+        测试前的设置：10条5天前的数据和2条新数据
+        """
+        self.temp_dir = tempfile.mkdtemp()
+        self.db_manager = DatabaseManager(os.path.join(self.temp_dir, 'CanLiangData.db'))
+        old_time = (datetime.now() - timedelta(days=5)).strftime('%Y-%m-%d %H:%M:%S')
+        with self.db_manager.get_connection() as conn:
+            conn.executemany('INSERT INTO post_data (event, message, create_time) VALUES (?, ?, ?)',
+                             [('old', 'x' * 2000, old_time)] * 10)
+            conn.commit()
+        self.db_manager.save_webhook_batch([{'event': 'new'}, {'event': 'new'}])
+
+    def tearDown(self):
+        """
+        测试后的清理
+        """
+        self.db_manager.close()
+        shutil.rmtree(self.temp_dir)
+
+    def _count(self):
+        with self.db_manager.get_connection() as conn:
+            return conn.execute('SELECT COUNT(*) FROM post_data').fetchone()[0]
+
+    def test_read_does_not_delete(self):
+        """
+        测试读取webhook数据时不会清理旧数据
+        """
+        self.assertEqual(len(self.db_manager.get_webhook_data(100)), 12)
+        self.assertEqual(self._count(), 12)
+
+    def test_cleanup_in_batches(self):
+        """
+        测试按批删除过期数据
+        """
+        self.assertEqual(self.db_manager.cleanup_old_webhook_data(3, batch_size=3), 10)
+        self.assertEqual(self._count(), 2)
+        self.assertEqual(self.db_manager.cleanup_old_webhook_data(3, batch_size=3), 0)
+
+    def test_scheduler_vacuums_after_cleanup(self):
+        """
+        测试维护任务删除数据后归还空闲页
+        """
+        with self.db_manager.get_connection() as conn:
+            self.assertEqual(conn.execute('PRAGMA auto_vacuum').fetchone()[0], 2)
+        scheduler = MaintenanceScheduler(self.db_manager, retention_days=3, batch_size=4)
+        self.assertEqual(scheduler.run_once(), 10)
+        with self.db_manager.get_connection() as conn:
+            self.assertEqual(conn.execute('PRAGMA freelist_count').fetchone()[0], 0)
+
+    def test_zero_retention_keeps_everything(self):
+        """
+        测试保留天数为0时不清理数据
+        """
+        self.assertEqual(MaintenanceScheduler(self.db_manager, retention_days=0).run_once(), 0)
+        self.assertEqual(self._count(), 12)
+
+
+class TestIncrementalVacuumMode(unittest.TestCase):
+    """
+    增量清理模式测试
+    """
+
+    def setUp(self):
+        """
+        测试前的设置
+        """
+        self.temp_dir = tempfile.mkdtemp()
+        self.db_path = os.path.join(self.temp_dir, 'CanLiangData.db')
+
+    def tearDown(self):
+        """
+        测试后的清理
+        """
+        shutil.rmtree(self.temp_dir)
+
+    def test_existing_database_switched_explicitly(self):
+        """
+        测试旧数据库启动时不执行VACUUM，保持原模式，显式切换后才开启增量清理
+        """
+        conn = sqlite3.connect(self.db_path)
+        conn.execute('CREATE TABLE legacy (id INTEGER PRIMARY KEY)')
+        conn.commit()
+        conn.close()
+
+        db_manager = DatabaseManager(self.db_path)
+        self.assertFalse(db_manager.incremental_vacuum_enabled())
+        self.assertTrue(db_manager.enable_incremental_vacuum())
+        self.assertTrue(db_manager.incremental_vacuum_enabled())
+        db_manager.close()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,58 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+性能测试脚本 - 测试日志解析耗时随拾取数量的增长情况
+"""
+
+import time
+import tempfile
+
+from app.infrastructure.manager import LogDataManager
+
+
+def build_pickup_log(pickup_count: int) -> str:
+    """
+    生成包含指定数量拾取记录的日志文本（每秒一条，不会触发时间段切分）
+    """
+    lines = ['[00:00:00.000] [INF] BetterGenshinImpact.Test\n配置组 "性能测试" 加载完成，共1个脚本，开始执行\n\n']
+    for i in range(pickup_count):
+        hours, remainder = divmod(i + 1, 3600)
+        minutes, seconds = divmod(remainder, 60)
+        lines.append(f'[{hours:02d}:{minutes:02d}:{seconds:02d}.000] [INF] BetterGenshinImpact.Test\n'
+                     f'交互或拾取："物品{i % 50}"\n\n')
+    return ''.join(lines)
+
+
+def measure_parse_time(pickup_count: int, repeat: int = 3) -> float:
+    """
+    测量解析指定数量拾取记录的最短耗时（秒）
+    """
+    content = build_pickup_log(pickup_count)
+    best = float('inf')
+    with tempfile.TemporaryDirectory() as temp_dir:
+        for _ in range(repeat):
+            manager = LogDataManager(temp_dir)
+            start_time = time.perf_counter()
+            result = manager.parse_log(content, '20250101')
+            best = min(best, time.perf_counter() - start_time)
+            assert len(result.items) == pickup_count
+    return best
+
+
+def test_parse_time_growth():
+    """对比不同拾取数量的解析耗时（只输出结果，去重的复杂度由 test_log_parser 验证）"""
+    print("=== 拾取去重解析性能测试 ===")
+
+    small_count, large_count = 5000, 20000
+    small_time = measure_parse_time(small_count)
+    large_time = measure_parse_time(large_count)
+    ratio = large_time / small_time
+
+    print(f"{small_count} 条拾取: {small_time * 1000:.1f} ms")
+    print(f"{large_count} 条拾取: {large_time * 1000:.1f} ms")
+    # 线性复杂度下耗时约增长4倍，平方复杂度下约增长16倍
+    print(f"数据量增长 {large_count // small_count} 倍，耗时增长 {ratio:.1f} 倍")
+
+
+if __name__ == "__main__":
+    test_parse_time_growth()
@@ -0,0 +1,163 @@
+"""
+webhook截图存储测试模块
+测试截图按内容哈希去重保存、尺寸读取、后台生成缩略图以及清理不再使用的截图
+"""
+import base64
+import os
+import shutil
+import tempfile
+import unittest
+
+import cv2
+import numpy as np
+
+from app.controllers.webhooks import WebhookController
+from app.infrastructure.screenshot_store import ScreenshotStore, decode_base64_image, image_size
+
+
+def encode_image(width, height, extension='.png', seed=0):
+    """
+    生成指定尺寸的图片文件内容
+    """
+    image = np.full((height, width, 3), seed % 256, dtype=np.uint8)
+    image[::7, ::5] = 255
+    return cv2.imencode(extension, image)[1].tobytes()
+
+
+class TestScreenshotStore(unittest.TestCase):
+    """
+    截图存储测试
+    """
+
+    def setUp(self):
+        """
+        测试前的设置
+        """
+        self.temp_dir = tempfile.mkdtemp()
+        self.store = ScreenshotStore(os.path.join(self.temp_dir, 'screenshots'), thumbnail_width=64)
+
+    def tearDown(self):
+        """
+        测试后的清理
+        """
+        shutil.rmtree(self.temp_dir)
+
+    def test_image_size(self):
+        """
+        测试从PNG和JPEG文件头读取尺寸
+        """
+        self.assertEqual(image_size(encode_image(200, 120)), (200, 120))
+        self.assertEqual(image_size(encode_image(33, 17, '.jpg')), (33, 17))
+        self.assertIsNone(image_size(b'not an image'))
+
+    def test_decode_base64(self):
+        """
+        测试解码带或不带 data URI 前缀的base64截图，普通文本保持不变
+        """
+        data = encode_image(10, 10)
+        encoded = base64.b64encode(data).decode()
+        self.assertEqual(decode_base64_image(encoded), data)
+        self.assertEqual(decode_base64_image('data:image/png;base64,' + encoded), data)
+        self.assertIsNone(decode_base64_image('C:/screenshots/a.png'))
+
+    def test_duplicates_stored_once_with_thumbnail(self):
+        """
+        测试相同截图只保存一份，缩略图按宽度等比缩小
+        """
+        data = encode_image(320, 180)
+        first = self.store.store(data)
+        second = self.store.store(data)
+        self.assertEqual(first, second)
+        self.assertEqual((first['width'], first['height']), (320, 180))
+        self.assertEqual(len(os.listdir(os.path.dirname(self.store.original_path(first['hash'])))), 1)
+
+        thumbnail = cv2.imread(self.store.get_thumbnail(first['hash']))
+        self.assertEqual(thumbnail.shape[:2], (36, 64))
+        self.assertEqual(self.store.get_original(first['hash'])[1], 'image/png')
+        self.assertIsNone(self.store.get_original('../' + first['hash']))
+
+    def test_prune_unreferenced(self):
+        """
+        测试只删除不再被引用的截图
+        """
+        kept = self.store.store(encode_image(20, 20, seed=1))['hash']
+        removed = self.store.store(encode_image(20, 20, seed=2))['hash']
+        self.store.wait()
+        self.assertEqual(self.store.prune({kept}, grace_seconds=0), 1)
+        self.assertIsNotNone(self.store.get_original(kept))
+        self.assertIsNone(self.store.get_original(removed))
+        self.assertFalse(os.path.exists(self.store.thumbnail_file(removed)))
+
+    def test_resubmitted_screenshot_renews_grace_period(self):
+        """
+        测试重新提交的旧截图刷新修改时间，清理时仍在保护期内
+        """
+        data = encode_image(20, 20, seed=3)
+        content_hash = self.store.store(data)['hash']
+        path = self.store.original_path(content_hash)
+        os.utime(path, (0, 0))
+        self.store.store(data)
+        self.store.wait()
+        self.assertEqual(self.store.prune(set(), grace_seconds=3600), 0)
+        self.assertIsNotNone(self.store.get_original(content_hash))
+
+
+class TestWebhookScreenshots(unittest.TestCase):
+    """
+    webhook截图保存测试
+    """
+
+    def setUp(self):
+        """
+        测试前的设置
+        """
+        self.temp_dir = tempfile.mkdtemp()
+        self.controller = WebhookController(self.temp_dir, thumbnail_width=64)
+        self.screenshot = base64.b64encode(encode_image(640, 360)).decode()
+
+    def tearDown(self):
+        """
+        测试后的清理
+        """
+        self.controller.stop_writer()
+        shutil.rmtree(self.temp_dir)
+
+    def test_row_keeps_only_hash_and_size(self):
+        """
+        测试数据表中只保存截图哈希和尺寸，列表返回缩略图地址
+        """
+        self.controller.start_writer()
+        self.controller.save_data({'event': 'a', 'screenshot': self.screenshot})
+        self.controller.save_data({'event': 'b', 'screenshot': self.screenshot})
+        self.controller.writer.flush()
+
+        rows = self.controller.query_webhook_data({})['data']
+        self.assertEqual(len({row['screenshot_hash'] for row in rows}), 1)
+        row = rows[0]
+        self.assertEqual((row['screenshot_width'], row['screenshot_height']), (640, 360))
+        self.assertEqual(row['thumbnail_url'], f"/api/screenshots/{row['screenshot_hash']}/thumbnail")
+        with self.controller.db_manager.get_connection() as conn:
+            self.assertEqual(conn.execute('SELECT COUNT(screenshot) FROM post_data').fetchone()[0], 0)
+        path, mimetype = self.controller.get_event_screenshot(row['id'])
+        self.assertEqual((cv2.imread(path).shape[1], mimetype), (64, 'image/jpeg'))
+
+    def test_legacy_base64_rows(self):
+        """
+        测试旧数据中的base64截图在首次请求时转存，并改写为引用截图存储
+        """
+        self.controller.db_manager.save_webhook_data({'event': 'old', 'screenshot': self.screenshot})
+        row = self.controller.query_webhook_data({})['data'][0]
+        self.assertEqual(self.controller.get_webhook_data(10)['data'], [row])
+        self.assertEqual((row['screenshot'], row['thumbnail_url']), (f"/image/{row['id']}", f"/image/{row['id']}"))
+        self.assertNotIn('has_legacy_screenshot', row)
+        self.assertIsNotNone(self.controller.get_event_screenshot(row['id']))
+        self.assertIsNone(self.controller.get_event_screenshot(row['id'] + 1))
+
+        stored = self.controller.db_manager.get_webhook_by_id(row['id'])
+        self.assertIsNone(stored['screenshot'])
+        self.assertEqual((stored['screenshot_width'], stored['screenshot_height']), (640, 360))
+        self.assertEqual(self.controller.db_manager.get_screenshot_hashes(), {stored['screenshot_hash']})
+
+
+if __name__ == '__main__':
+    unittest.main()
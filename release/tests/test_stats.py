@@ -0,0 +1,245 @@
+"""
+统计查询测试模块
+测试基于SQL分组的物品统计、分页以及汇总表的维护
+"""
+import os
+import shutil
+import tempfile
+import unittest
+
+from app.controllers.stats import StatsController, StatsQueryError
+from app.infrastructure.database import DatabaseManager
+
+
+class StatsTestCase(unittest.TestCase):
+    """
+    统计测试基类，准备示例数据
+    """
+
+    def setUp(self):
+        """
+        测试前的设置：三天的物品数据
+        """
+        self.temp_dir = tempfile.mkdtemp()
+        self.db_manager = DatabaseManager(os.path.join(self.temp_dir, 'CanLiangData.db'))
+        self.db_manager.insert_log_file_data('20250101', 600, [
+            {'name': '摩拉', 'timestamp': '10:00:00.000', 'config_group': '组1'},
+            {'name': '摩拉', 'timestamp': '10:00:01.000', 'config_group': '组1'},
+            {'name': '原石', 'timestamp': '10:00:02.000', 'config_group': None},
+        ])
+        self.db_manager.insert_log_file_data('20250102', 1200, [
+            {'name': '摩拉', 'timestamp': '11:00:00.000', 'config_group': '组2'},
+            {'name': '树脂', 'timestamp': '11:00:01.000', 'config_group': '组2'},
+        ])
+        self.db_manager.insert_log_file_data('20250103', 300, [
+            {'name': '经验书', 'timestamp': '12:00:00.000', 'config_group': '组1'},
+        ])
+        self.controller = StatsController(self.temp_dir, db_manager=self.db_manager)
+
+    def tearDown(self):
+        """
+        测试后的清理
+        """
+        shutil.rmtree(self.temp_dir)
+
+
+class TestItemAggregation(StatsTestCase):
+    """
+    物品统计查询测试
+    """
+
+    def test_group_by_item(self):
+        """
+        测试按物品统计，按数量降序
+        """
+        result = self.controller.get_item_counts({'group_by': 'item'})
+        self.assertEqual(result['total'], 4)
+        self.assertEqual(result['rows'][0], {'key': '摩拉', 'count': 3})
+
+    def test_group_by_date_with_range(self):
+        """
+        测试按日期统计并限制日期范围
+        """
+        result = self.controller.get_item_counts({'group_by': 'date', 'start': '20250102', 'end': '20250103'})
+        self.assertEqual(result['rows'], [{'key': '20250103', 'count': 1}, {'key': '20250102', 'count': 2}])
+
+    def test_group_by_config_group(self):
+        """
+        测试按配置组统计，未归属配置组的物品归为空字符串
+        """
+        result = self.controller.get_item_counts({'group_by': 'config_group', 'order': 'key'})
+        self.assertEqual(result['rows'], [
+            {'key': '', 'count': 1}, {'key': '组1', 'count': 3}, {'key': '组2', 'count': 2}
+        ])
+
+    def test_pagination(self):
+        """
+        测试分页只返回当前页
+        """
+        first = self.controller.get_item_counts({'group_by': 'item', 'page_size': '2'})
+        second = self.controller.get_item_counts({'group_by': 'item', 'page_size': '2', 'page': '2'})
+        self.assertEqual(len(first['rows']), 2)
+        self.assertEqual(len(second['rows']), 2)
+        self.assertEqual(first['total'], 4)
+        self.assertFalse({row['key'] for row in first['rows']} & {row['key'] for row in second['rows']})
+
+    def test_top_items(self):
+        """
+        测试前K个物品
+        """
+        result = self.controller.get_top_items({'k': '1', 'config_group': '组1'})
+        self.assertEqual(result['rows'], [{'key': '摩拉', 'count': 2}])
+
+    def test_daily_totals(self):
+        """
+        测试每日汇总
+        """
+        result = self.controller.get_daily_totals({'end': '20250102'})
+        self.assertEqual(result['rows'], [
+            {'date': '20250102', 'item_count': 2, 'distinct_items': 2, 'duration': 1200},
+            {'date': '20250101', 'item_count': 3, 'distinct_items': 2, 'duration': 600},
+        ])
+        self.assertEqual(result['total'], 2)
+
+    def test_invalid_parameters(self):
+        """
+        测试非法参数
+        """
+        with self.assertRaises(StatsQueryError):
+            self.controller.get_item_counts({'group_by': 'timestamp'})
+        with self.assertRaises(StatsQueryError):
+            self.controller.get_daily_totals({'start': '2025-01-01'})
+        with self.assertRaises(StatsQueryError):
+            self.controller.get_top_items({'k': 'abc'})
+
+
+class TestRollups(StatsTestCase):
+    """
+    汇总表测试
+    """
+
+    def _rollup_rows(self):
+        with self.db_manager.get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute('SELECT date_str, name, item_count FROM item_daily_rollup ORDER BY 1, 2')
+            items = cursor.fetchall()
+            cursor.execute('SELECT date_str, name, COUNT(*) FROM items GROUP BY 1, 2 ORDER BY 1, 2')
+            expected_items = cursor.fetchall()
+            cursor.execute('SELECT date_str, config_group, item_count FROM config_group_daily_rollup ORDER BY 1, 2')
+            groups = cursor.fetchall()
+            cursor.execute("SELECT date_str, COALESCE(config_group, ''), COUNT(*) FROM items GROUP BY 1, 2 ORDER BY 1, 2")
+            expected_groups = cursor.fetchall()
+        return [tuple(row) for row in items], [tuple(row) for row in expected_items], \
+            [tuple(row) for row in groups], [tuple(row) for row in expected_groups]
+
+    def assertRollupsMatch(self):
+        items, expected_items, groups, expected_groups = self._rollup_rows()
+        self.assertEqual(items, expected_items)
+        self.assertEqual(groups, expected_groups)
+
+    def test_rollups_follow_inserts_and_deletes(self):
+        """
+        测试追加写入和删除后汇总表与明细一致
+        """
+        self.assertRollupsMatch()
+        self.db_manager.insert_log_file_data('20250101', 900, [
+            {'name': '树脂', 'timestamp': '09:00:00.000', 'config_group': '组3'},
+        ])
+        self.assertRollupsMatch()
+        self.db_manager.delete_log_data('20250102')
+        self.assertRollupsMatch()
+
+        month = self.controller.get_period_totals({'period': 'month'})
+        self.assertEqual(month['rows'], [{
+            'period': '202501', 'start_date': '20250101', 'end_date': '20250131',
+            'item_count': 5, 'duration': 1200, 'day_count': 2,
+        }])
+
+    def test_weekly_totals(self):
+        """
+        测试按ISO周汇总（2025-01-01至2025-01-03同属2025年第1周）
+        """
+        self.db_manager.insert_log_file_data('20250106', 60, [
+            {'name': '摩拉', 'timestamp': '10:00:00.000', 'config_group': None},
+        ])
+        result = self.controller.get_period_totals({'period': 'week'})
+        self.assertEqual([(row['period'], row['item_count'], row['duration']) for row in result['rows']],
+                         [('2025-W02', 1, 60), ('2025-W01', 6, 2100)])
+
+    def test_rebuild_existing_database(self):
+        """
+        测试旧数据库打开时自动生成汇总表，手动重建结果一致
+        """
+        with self.db_manager.get_connection() as conn:
+            conn.execute('DELETE FROM item_daily_rollup')
+            conn.execute('DELETE FROM config_group_daily_rollup')
+            conn.execute('DELETE FROM period_rollup')
+            conn.commit()
+
+        reopened = DatabaseManager(self.db_manager.db_path)
+        self.assertRollupsMatch()
+        self.assertTrue(reopened.rebuild_rollups())
+        self.assertRollupsMatch()
+        self.assertEqual(reopened.get_period_totals('month')['rows'][0]['item_count'], 6)
+
+
+class TestIdempotentIngestion(StatsTestCase):
+    """
+    物品追加写入测试
+    """
+
+    def _items(self, date_str):
+        with self.db_manager.get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute('SELECT id, name, timestamp FROM items WHERE date_str = ? ORDER BY id', (date_str,))
+            return [tuple(row) for row in cursor.fetchall()]
+
+    def test_reingest_appends_only_new_rows(self):
+        """
+        测试重复入库时已有记录保持不变，只追加新增记录
+        """
+        before = self._items('20250101')
+        items = [
+            {'name': '摩拉', 'timestamp': '10:00:00.000', 'config_group': '组1'},
+            {'name': '摩拉', 'timestamp': '10:00:01.000', 'config_group': '组1'},
+            {'name': '原石', 'timestamp': '10:00:02.000', 'config_group': None},
+            {'name': '树脂', 'timestamp': '10:05:00.000', 'config_group': None},
+        ]
+        self.assertTrue(self.db_manager.insert_log_file_data('20250101', 700, items))
+        self.assertTrue(self.db_manager.insert_log_file_data('20250101', 700, items))
+
+        after = self._items('20250101')
+        self.assertEqual(after[:3], before)
+        self.assertEqual([row[1] for row in after[3:]], ['树脂'])
+        self.assertEqual(self.db_manager.get_log_file_info('20250101')['item_count'], 4)
+        self.assertEqual(self.controller.get_item_counts({'group_by': 'config_group', 'order': 'key'})['rows'][0],
+                         {'key': '', 'count': 2})
+
+    def test_replace(self):
+        """
+        测试替换模式删除旧记录
+        """
+        self.db_manager.insert_log_file_data('20250101', 60, [
+            {'name': '树脂', 'timestamp': '10:05:00.000', 'config_group': None},
+        ], replace=True)
+        self.assertEqual([row[1] for row in self._items('20250101')], ['树脂'])
+        self.assertEqual(self.controller.get_top_items({'start': '20250101', 'end': '20250101'})['rows'],
+                         [{'key': '树脂', 'count': 1}])
+
+    def test_legacy_duplicates_are_removed(self):
+        """
+        测试旧数据库中的重复记录在升级时被清理
+        """
+        with self.db_manager.get_connection() as conn:
+            conn.execute('DROP INDEX idx_items_unique')
+            conn.execute("INSERT INTO items (name, timestamp, date_str, config_group) VALUES ('原石', '10:00:02.000', '20250101', NULL)")
+            conn.commit()
+
+        reopened = DatabaseManager(self.db_manager.db_path)
+        self.assertEqual(len(self._items('20250101')), 3)
+        self.assertEqual(reopened.aggregate_items('date', start_date='20250101', end_date='20250101')['rows'],
+                         [{'key': '20250101', 'count': 3}])
+
+
+if __name__ == '__main__':
+    unittest.main()
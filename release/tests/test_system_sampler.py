@@ -0,0 +1,129 @@
+"""
+系统指标采样测试模块
+测试环形缓冲区的覆盖、历史窗口以及控制器不再阻塞读取CPU
+"""
+import unittest
+from types import SimpleNamespace
+
+from app.controllers.system_info import SystemInfoController
+from app.infrastructure.system_sampler import SystemMetricsSampler
+
+
+class FakeMetrics:
+    """
+    按顺序返回预设数值的psutil替身，记录cpu_percent的调用参数
+    """
+
+    def __init__(self, cpu_values, memory_values):
+        self.cpu_values = list(cpu_values)
+        self.memory_values = list(memory_values)
+        self.cpu_intervals = []
+
+    def cpu_percent(self, interval=1.0):
+        self.cpu_intervals.append(interval)
+        return self.cpu_values.pop(0) if self.cpu_values else 0.0
+
+    def virtual_memory(self):
+        return SimpleNamespace(percent=self.memory_values.pop(0) if self.memory_values else 0.0)
+
+
+class FakeClock:
+    """
+    每次调用前进一秒的时钟
+    """
+
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        self.now += 1
+        return self.now
+
+
+class TestSystemMetricsSampler(unittest.TestCase):
+    """
+    采样器测试
+    """
+
+    def setUp(self):
+        """
+        测试前的设置：第一次CPU调用作为基准，之后返回10、20、30……
+        """
+        self.metrics = FakeMetrics([0.0] + [10.0 * i for i in range(1, 8)], [50.0 + i for i in range(1, 8)])
+        self.sampler = SystemMetricsSampler(self.metrics, capacity=4, clock=FakeClock())
+
+    def test_latest(self):
+        """
+        测试尚未采样时返回None，采样后返回最近一次结果
+        """
+        self.assertIsNone(self.sampler.latest())
+        self.assertTrue(self.sampler.sample_once())
+        self.assertTrue(self.sampler.sample_once())
+        self.assertEqual(self.sampler.latest(), {'timestamp': 1002.0, 'cpu_usage': 20.0, 'memory_usage': 52.0})
+        self.assertTrue(all(interval is None for interval in self.metrics.cpu_intervals))
+
+    def test_ring_buffer_overwrites_oldest(self):
+        """
+        测试写满后覆盖最旧的采样点，历史按时间从旧到新排列
+        """
+        for _ in range(6):
+            self.sampler.sample_once()
+        self.assertEqual(self.sampler.sample_count, 4)
+        self.assertEqual(self.sampler.history(), {
+            'timestamp': [1003.0, 1004.0, 1005.0, 1006.0],
+            'cpu_usage': [30.0, 40.0, 50.0, 60.0],
+            'memory_usage': [53.0, 54.0, 55.0, 56.0],
+        })
+        self.assertEqual(self.sampler.history(2)['cpu_usage'], [50.0, 60.0])
+        self.assertEqual(self.sampler.history(100)['cpu_usage'], [30.0, 40.0, 50.0, 60.0])
+        self.assertEqual(self.sampler.history(0)['cpu_usage'], [])
+
+    def test_background_thread(self):
+        """
+        测试后台线程按间隔采样，停止后不再运行
+        """
+        sampler = SystemMetricsSampler(FakeMetrics([5.0] * 100, [40.0] * 100), interval=0.1)
+        sampler.start()
+        try:
+            for _ in range(50):
+                if sampler.sample_count >= 2:
+                    break
+                sampler._stop_event.wait(0.05)
+        finally:
+            sampler.stop()
+        self.assertFalse(sampler.is_running)
+        self.assertGreaterEqual(sampler.sample_count, 2)
+
+
+class TestSystemInfoController(unittest.TestCase):
+    """
+    系统信息控制器测试
+    """
+
+    def test_uses_latest_sample(self):
+        """
+        测试有采样结果时直接返回，不再调用psutil
+        """
+        metrics = FakeMetrics([0.0, 25.0], [60.0])
+        sampler = SystemMetricsSampler(metrics, clock=lambda: 1.0)
+        sampler.sample_once()
+        calls = len(metrics.cpu_intervals)
+
+        controller = SystemInfoController(metrics, sampler=sampler)
+        self.assertEqual(controller.get_system_info(), {'memory_usage': 60.0, 'cpu_usage': 25.0, 'timestamp': 1.0})
+        self.assertEqual(len(metrics.cpu_intervals), calls)
+        self.assertEqual(controller.get_history(5), {'timestamp': [1.0], 'cpu_usage': [25.0], 'memory_usage': [60.0]})
+
+    def test_fallback_is_non_blocking(self):
+        """
+        测试没有采样器时以非阻塞方式读取CPU
+        """
+        metrics = FakeMetrics([12.0], [34.0])
+        controller = SystemInfoController(metrics)
+        self.assertEqual(controller.get_system_info(), {'memory_usage': 34.0, 'cpu_usage': 12.0})
+        self.assertEqual(metrics.cpu_intervals, [None])
+        self.assertEqual(controller.get_history(10), {'timestamp': [], 'cpu_usage': [], 'memory_usage': []})
+
+
+if __name__ == '__main__':
+    unittest.main()
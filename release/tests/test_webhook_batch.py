@@ -0,0 +1,119 @@
+"""
+批量webhook测试模块
+测试JSON数组和NDJSON请求体的解析，以及逐条返回结果的批量写入
+"""
+import os
+import shutil
+import tempfile
+import threading
+import unittest
+
+from app.controllers.webhooks import WebhookBatchError, WebhookController, parse_batch_body
+from app.infrastructure.database import DatabaseManager
+
+
+class TestParseBatchBody(unittest.TestCase):
+    """
+    批量请求体解析测试
+    """
+
+    def test_json_array(self):
+        """
+        测试解析JSON数组
+        """
+        self.assertEqual(parse_batch_body(' [{"event": "a"}, {"event": "b"}] '), [{'event': 'a'}, {'event': 'b'}])
+
+    def test_ndjson_with_bad_line(self):
+        """
+        测试NDJSON中无法解析的行作为单条错误，不影响其他行
+        """
+        items = parse_batch_body('{"event": "a"}\n\n{bad json}\n{"event": "c"}\n')
+        self.assertEqual(len(items), 3)
+        self.assertEqual(items[0], {'event': 'a'})
+        self.assertEqual(items[2], {'event': 'c'})
+
+    def test_invalid_bodies(self):
+        """
+        测试空请求体和格式错误的JSON数组
+        """
+        for body in ('', '  \n', '[]', '[{"event": "a"},'):
+            with self.assertRaises(WebhookBatchError):
+                parse_batch_body(body)
+
+
+class TestSaveBatch(unittest.TestCase):
+    """
+    批量写入测试
+    """
+
+    def setUp(self):
+        """
+        测试前的设置
+        """
+        self.temp_dir = tempfile.mkdtemp()
+        self.controller = WebhookController(self.temp_dir)
+
+    def tearDown(self):
+        """
+        测试后的清理
+        """
+        self.controller.stop_writer()
+        shutil.rmtree(self.temp_dir)
+
+    def test_per_item_results(self):
+        """
+        测试逐条返回结果，合法数据全部写入并返回id
+        """
+        payloads = parse_batch_body('{"event": "a"}\n{"result": "ok"}\n[1]\nnot json\n{"event": "b", "result": "ok"}')
+        result = self.controller.save_batch(payloads)
+
+        self.assertEqual((result['success'], result['saved'], result['failed']), (False, 2, 3))
+        self.assertEqual([item['success'] for item in result['results']], [True, False, False, False, True])
+        self.assertEqual(result['results'][1]['message'], '缺少必需的event字段')
+        self.assertEqual(result['results'][2]['message'], '数据必须是JSON对象')
+        rows = self.controller.query_webhook_data({})['data']
+        self.assertEqual({row['id']: row['event'] for row in rows},
+                         {result['results'][0]['id']: 'a', result['results'][4]['id']: 'b'})
+
+    def test_batch_is_published(self):
+        """
+        测试批量写入的数据推送给订阅者
+        """
+        subscription = self.controller.events.subscribe()
+        self.controller.save_batch([{'event': 'a'}, {'event': 'b'}])
+        self.assertEqual([subscription.get(0)['event'], subscription.get(0)['event']], ['a', 'b'])
+
+    def test_prepared_on_writer_thread(self):
+        """
+        测试写入线程运行时，批量数据的截图保存等预处理在写入线程中完成，并返回记录id
+        """
+        threads = []
+        prepare = self.controller.writer.prepare
+        self.controller.writer.prepare = lambda payload: threads.append(threading.current_thread().name) or prepare(payload)
+        self.controller.start_writer()
+
+        result = self.controller.save_batch([{'event': 'a'}, {'event': 'b'}])
+        self.assertEqual(result['saved'], 2)
+        self.assertTrue(all('id' in item for item in result['results']))
+        self.assertEqual(threads, ['webhook-writer', 'webhook-writer'])
+
+    def test_single_transaction(self):
+        """
+        测试整批数据在一个事务中写入，只提交一次
+        """
+        db_manager = DatabaseManager(os.path.join(self.temp_dir, 'batch.db'), pool_size=1)
+        controller = WebhookController(self.temp_dir, db_manager=db_manager)
+        statements = []
+        with db_manager.get_connection() as conn:
+            conn.set_trace_callback(statements.append)
+
+        result = controller.save_batch([{'event': f'e{i}'} for i in range(50)])
+        self.assertEqual(result['saved'], 50)
+        keywords = [statement.split()[0].upper() for statement in statements]
+        self.assertEqual(keywords.count('BEGIN'), 1)
+        self.assertEqual(keywords.count('COMMIT'), 1)
+        db_manager.close()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,63 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+性能测试脚本 - 对比逐条提交webhook与批量提交的吞吐量
+"""
+
+import json
+import tempfile
+import time
+
+from app.controllers.webhooks import WebhookController, parse_batch_body
+
+
+def build_events(count: int) -> list:
+    """
+    生成指定数量的webhook事件
+    """
+    return [{'event': 'pickup', 'result': 'success', 'message': f'拾取物品{i % 50}'} for i in range(count)]
+
+
+def measure_single(count: int) -> float:
+    """
+    逐条提交（每条数据单独解析、校验并提交事务）的吞吐量（条/秒）
+    """
+    bodies = [json.dumps(event) for event in build_events(count)]
+    with tempfile.TemporaryDirectory() as temp_dir:
+        controller = WebhookController(temp_dir)
+        start_time = time.perf_counter()
+        for body in bodies:
+            assert controller.save_data(json.loads(body))['success']
+        elapsed = time.perf_counter() - start_time
+    return count / elapsed
+
+
+def measure_batch(count: int) -> float:
+    """
+    一次批量提交（NDJSON请求体，一个事务写入）的吞吐量（条/秒）
+    """
+    body = '\n'.join(json.dumps(event) for event in build_events(count))
+    with tempfile.TemporaryDirectory() as temp_dir:
+        controller = WebhookController(temp_dir)
+        start_time = time.perf_counter()
+        result = controller.save_batch(parse_batch_body(body))
+        elapsed = time.perf_counter() - start_time
+        assert result['saved'] == count
+    return count / elapsed
+
+
+def test_batch_throughput():
+    """对比逐条提交与批量提交的吞吐量（只输出结果，单事务写入由 test_webhook_batch 验证）"""
+    print("=== 批量webhook吞吐量测试 ===")
+
+    count = 2000
+    single = measure_single(count)
+    batch = measure_batch(count)
+
+    print(f"逐条提交: {single:.0f} 条/秒")
+    print(f"批量提交: {batch:.0f} 条/秒")
+    print(f"批量提交快 {batch / single:.1f} 倍")
+
+
+if __name__ == "__main__":
+    test_batch_throughput()
@@ -0,0 +1,93 @@
+"""
+webhook历史查询测试模块
+测试按id游标分页、过滤条件以及只统计数量的查询
+"""
+import shutil
+import tempfile
+import unittest
+
+from app.controllers.webhooks import WebhookController, WebhookQueryError
+
+
+class TestWebhookHistory(unittest.TestCase):
+    """
+    webhook历史查询测试
+    """
+
+    def setUp(self):
+        """
+        测试前的设置：25条数据，事件交替为 start/pickup，每5条一条失败
+        """
+        self.temp_dir = tempfile.mkdtemp()
+        self.controller = WebhookController(self.temp_dir)
+        self.controller.db_manager.save_webhook_batch([
+            {'event': 'start' if index % 2 else 'pickup', 'result': 'fail' if index % 5 == 0 else 'ok',
+             'message': str(index)}
+            for index in range(1, 26)
+        ])
+
+    def tearDown(self):
+        """
+        测试后的清理
+        """
+        shutil.rmtree(self.temp_dir)
+
+    def _ids(self, result):
+        return [row['id'] for row in result['data']]
+
+    def test_walk_history_with_before_id(self):
+        """
+        测试沿 next_before_id 向前翻页可以不重不漏地取完全部数据
+        """
+        ids = []
+        args = {'limit': '10'}
+        while True:
+            page = self.controller.query_webhook_data(args)
+            ids.extend(self._ids(page))
+            if not page['has_more']:
+                break
+            args = {'limit': '10', 'before_id': str(page['next_before_id'])}
+        self.assertEqual(ids, list(range(25, 0, -1)))
+
+    def test_poll_with_after_id(self):
+        """
+        测试 after_id 只返回更新的数据，并从最接近游标的数据开始
+        """
+        page = self.controller.query_webhook_data({'after_id': '20', 'limit': '3'})
+        self.assertEqual(self._ids(page), [23, 22, 21])
+        self.assertTrue(page['has_more'])
+        page = self.controller.query_webhook_data({'after_id': str(page['last_id'])})
+        self.assertEqual(self._ids(page), [25, 24])
+        empty = self.controller.query_webhook_data({'after_id': '25'})
+        self.assertEqual((empty['data'], empty['last_id']), ([], 25))
+
+    def test_filters(self):
+        """
+        测试按事件、结果和时间范围过滤
+        """
+        page = self.controller.query_webhook_data({'event': 'start', 'result': 'fail'})
+        self.assertEqual([row['message'] for row in page['data']], ['25', '15', '5'])
+        page = self.controller.query_webhook_data({'event': 'pickup', 'before_id': '10', 'limit': '2'})
+        self.assertEqual(self._ids(page), [8, 6])
+        self.assertEqual(self.controller.query_webhook_data({'until': '2000-01-01'})['count'], 0)
+        self.assertEqual(self.controller.query_webhook_data({'since': '2000-01-01T00:00:00'})['count'], 25)
+
+    def test_count_only(self):
+        """
+        测试只统计数量
+        """
+        self.assertEqual(self.controller.query_webhook_data({'result': 'fail', 'count_only': '1'}),
+                         {'success': True, 'count': 5})
+
+    def test_invalid_parameters(self):
+        """
+        测试非法参数
+        """
+        with self.assertRaises(WebhookQueryError):
+            self.controller.query_webhook_data({'before_id': 'abc'})
+        with self.assertRaises(WebhookQueryError):
+            self.controller.query_webhook_data({'since': '2025/01/01'})
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,123 @@
+"""
+webhook幂等测试模块
+测试幂等键的计算、LRU缓存以及数据库唯一索引兜底
+"""
+import shutil
+import tempfile
+import unittest
+
+from app.controllers.webhooks import WebhookController
+from app.infrastructure.idempotency import IdempotencyCache, derive_idempotency_key
+
+
+class TestIdempotencyCache(unittest.TestCase):
+    """
+    幂等键缓存测试
+    """
+
+    def test_lru_eviction(self):
+        """
+        测试超出容量时淘汰最久未使用的键
+        """
+        cache = IdempotencyCache(capacity=2)
+        self.assertTrue(cache.add('a'))
+        self.assertTrue(cache.add('b'))
+        self.assertFalse(cache.add('a'))
+        self.assertTrue(cache.add('c'))
+        self.assertEqual(len(cache), 2)
+        self.assertTrue(cache.add('b'))
+        self.assertFalse(cache.add('c'))
+
+    def test_derived_key(self):
+        """
+        测试由事件内容计算幂等键，没有时间戳时不计算
+        """
+        event = {'event': 'pickup', 'timestamp': '10:00:00.000', 'result': 'ok', 'message': '摩拉'}
+        self.assertEqual(derive_idempotency_key(event), derive_idempotency_key(dict(event)))
+        self.assertNotEqual(derive_idempotency_key(event), derive_idempotency_key({**event, 'message': '原石'}))
+        self.assertIsNone(derive_idempotency_key({'event': 'pickup'}))
+
+
+class TestWebhookDeduplication(unittest.TestCase):
+    """
+    webhook去重测试
+    """
+
+    def setUp(self):
+        """
+        测试前的设置
+        """
+        self.temp_dir = tempfile.mkdtemp()
+        self.controller = WebhookController(self.temp_dir)
+        self.event = {'event': 'pickup', 'timestamp': '10:00:00.000', 'result': 'ok', 'message': '摩拉'}
+
+    def tearDown(self):
+        """
+        测试后的清理
+        """
+        self.controller.stop_writer()
+        shutil.rmtree(self.temp_dir)
+
+    def _count(self):
+        return self.controller.query_webhook_data({'count_only': '1'})['count']
+
+    def test_retries_are_stored_once(self):
+        """
+        测试相同事件重复投递只保存一次
+        """
+        self.assertNotIn('duplicate', self.controller.save_data(self.event))
+        self.assertTrue(self.controller.save_data(dict(self.event))['duplicate'])
+        self.assertNotIn('duplicate', self.controller.save_data({**self.event, 'message': '原石'}))
+        self.assertEqual(self._count(), 2)
+
+    def test_header_key_with_writer(self):
+        """
+        测试请求头中的幂等键，写入线程运行时同样去重
+        """
+        self.controller.start_writer()
+        self.assertTrue(self.controller.save_data({'event': 'a'}, 'key-1')['queued'])
+        self.assertTrue(self.controller.save_data({'event': 'b'}, 'key-1')['duplicate'])
+        self.controller.writer.flush()
+        self.assertEqual(self._count(), 1)
+
+    def test_database_backstop(self):
+        """
+        测试缓存中没有记录时（例如重启后），由唯一索引拦截重复数据
+        """
+        self.controller.save_data(self.event)
+        restarted = WebhookController(self.temp_dir)
+        self.assertTrue(restarted.save_data(self.event)['duplicate'])
+        result = restarted.save_batch([self.event, {**self.event, 'message': '原石'}, {'event': 'x'}])
+        self.assertEqual((result['saved'], result['duplicates'], result['failed']), (2, 1, 0))
+        self.assertTrue(result['results'][0]['duplicate'])
+        self.assertEqual(self._count(), 3)
+
+    def test_writer_stats_count_backstop_duplicates(self):
+        """
+        测试被唯一索引拦截的数据计入重复条数，不计入已写入条数
+        """
+        self.controller.save_data(self.event)
+        restarted = WebhookController(self.temp_dir)
+        restarted.start_writer()
+        try:
+            self.assertTrue(restarted.save_data(self.event)['queued'])
+            self.assertTrue(restarted.save_data({'event': 'x'})['queued'])
+            restarted.writer.flush()
+            stats = restarted.get_writer_stats()
+        finally:
+            restarted.stop_writer()
+        self.assertEqual((stats['written'], stats['duplicates'], stats['failed']), (1, 1, 0))
+
+    def test_batch_duplicates_within_request(self):
+        """
+        测试同一批中的重复数据
+        """
+        result = self.controller.save_batch([
+            {'event': 'a', 'idempotency_key': 'k'}, {'event': 'b', 'idempotency_key': 'k'}, self.event,
+        ])
+        self.assertEqual([item.get('duplicate', False) for item in result['results']], [False, True, False])
+        self.assertEqual(self._count(), 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,94 @@
+"""
+webhook事件统计测试模块
+测试小时汇总表的增量累加、清理明细后保留统计以及按时间范围查询
+"""
+import shutil
+import tempfile
+import unittest
+
+from app.controllers.webhooks import WebhookController, WebhookQueryError
+from app.infrastructure.database import DatabaseManager
+
+
+class TestWebhookStats(unittest.TestCase):
+    """
+    webhook事件统计测试
+    """
+
+    def setUp(self):
+        """
+        测试前的设置
+        """
+        self.temp_dir = tempfile.mkdtemp()
+        self.controller = WebhookController(self.temp_dir)
+        self.db_manager = self.controller.db_manager
+
+    def tearDown(self):
+        """
+        测试后的清理
+        """
+        shutil.rmtree(self.temp_dir)
+
+    def _insert_at(self, create_time, *events):
+        """
+        直接写入指定创建时间的数据，并重新生成汇总表
+        """
+        with self.db_manager.get_connection() as conn:
+            conn.executemany(
+                'INSERT INTO post_data (event, result, create_time) VALUES (?, ?, ?)',
+                [(event, result, create_time) for event, result in events])
+            conn.commit()
+        self.db_manager.rebuild_webhook_rollups()
+
+    def test_counts_are_maintained_on_insert(self):
+        """
+        测试写入时累加到当前小时
+        """
+        self.controller.save_batch([{'event': 'task', 'result': 'error'}, {'event': 'task', 'result': 'error'},
+                                    {'event': 'domain'}])
+        stats = self.controller.get_webhook_stats({})
+        self.assertEqual(stats['total'], 3)
+        self.assertEqual({(row['event'], row['result']): row['count'] for row in stats['rows']},
+                         {('task', 'error'): 2, ('domain', ''): 1})
+
+    def test_range_and_buckets(self):
+        """
+        测试按时间范围、事件过滤以及按天统计
+        """
+        self._insert_at('2025-01-01 10:15:00', ('task', 'error'), ('task', 'ok'))
+        self._insert_at('2025-01-01 10:45:00', ('task', 'error'))
+        self._insert_at('2025-01-01 23:59:59', ('task', 'error'))
+        self._insert_at('2025-01-02 00:00:00', ('domain', 'end'))
+
+        stats = self.controller.get_webhook_stats({'since': '2025-01-01 10:30:00', 'until': '2025-01-02',
+                                                   'event': 'task', 'result': 'error'})
+        self.assertEqual([(row['bucket'], row['count']) for row in stats['rows']],
+                         [('2025-01-01 10:00:00', 2), ('2025-01-01 23:00:00', 1)])
+
+        daily = self.controller.get_webhook_stats({'since': '2025-01-01', 'until': '2025-01-03', 'bucket': 'day'})
+        self.assertEqual([(row['bucket'], row['event'], row['result'], row['count']) for row in daily['rows']],
+                         [('2025-01-01', 'task', 'error', 3), ('2025-01-01', 'task', 'ok', 1),
+                          ('2025-01-02', 'domain', 'end', 1)])
+
+    def test_counts_survive_retention(self):
+        """
+        测试清理webhook明细后统计数据仍然保留，重新打开数据库不会重建汇总表
+        """
+        self._insert_at('2025-01-01 10:15:00', ('task', 'error'))
+        self.assertEqual(self.db_manager.cleanup_old_webhook_data(3), 1)
+        DatabaseManager(self.db_manager.db_path)
+        stats = self.controller.get_webhook_stats({'since': '2025-01-01', 'until': '2025-01-02'})
+        self.assertEqual(stats['total'], 1)
+
+    def test_invalid_parameters(self):
+        """
+        测试非法参数
+        """
+        with self.assertRaises(WebhookQueryError):
+            self.controller.get_webhook_stats({'bucket': 'minute'})
+        with self.assertRaises(WebhookQueryError):
+            self.controller.get_webhook_stats({'since': '2025-01-02', 'until': '2025-01-01'})
+
+
+if __name__ == '__main__':
+    unittest.main()
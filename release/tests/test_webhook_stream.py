@@ -0,0 +1,103 @@
+"""
+webhook事件推送测试模块
+测试发布订阅的有界队列、Last-Event-ID续传、心跳以及慢客户端从数据库补发
+"""
+import json
+import shutil
+import tempfile
+import unittest
+
+from app.controllers.webhooks import WebhookController
+from app.infrastructure.webhook_events import WebhookEventBroker
+
+
+def event_ids(messages):
+    """
+    提取SSE消息中的id
+    """
+    return [int(message.split('\n')[0][4:]) for message in messages if message.startswith('id: ')]
+
+
+class TestWebhookEventBroker(unittest.TestCase):
+    """
+    发布订阅测试
+    """
+
+    def test_fan_out_and_bounded_queue(self):
+        """
+        测试事件发给所有订阅者，队列已满时标记落后而不是继续增长
+        """
+        broker = WebhookEventBroker(queue_size=2)
+        fast, slow = broker.subscribe(), broker.subscribe()
+        broker.publish([{'id': 1}])
+        self.assertEqual(fast.get(0), {'id': 1})
+        broker.publish([{'id': 2}, {'id': 3}])
+        self.assertFalse(fast.lagging)
+        self.assertTrue(slow.lagging)
+        self.assertEqual([slow.get(0), slow.get(0), slow.get(0)], [{'id': 1}, {'id': 2}, None])
+
+        slow.reset()
+        self.assertFalse(slow.lagging)
+        broker.unsubscribe(slow)
+        self.assertEqual(broker.subscriber_count, 1)
+
+
+class TestWebhookStream(unittest.TestCase):
+    """
+    SSE推送测试
+    """
+
+    def setUp(self):
+        """
+        测试前的设置：数据库中已有3条数据
+        """
+        self.temp_dir = tempfile.mkdtemp()
+        self.controller = WebhookController(self.temp_dir, stream_queue_size=2, heartbeat_interval=0.01)
+        for index in range(3):
+            self.controller.save_data({'event': f'old{index}'})
+
+    def tearDown(self):
+        """
+        测试后的清理
+        """
+        shutil.rmtree(self.temp_dir)
+
+    def test_resume_from_last_event_id(self):
+        """
+        测试带 Last-Event-ID 时先补发之后的数据
+        """
+        stream = self.controller.stream_events('1')
+        self.assertEqual(next(stream), 'retry: 3000\n\n')
+        messages = [next(stream), next(stream)]
+        self.assertEqual(event_ids(messages), [2, 3])
+        self.assertEqual(json.loads(messages[0].split('data: ')[1])['event'], 'old1')
+        stream.close()
+        self.assertEqual(self.controller.events.subscriber_count, 0)
+
+    def test_live_events_and_heartbeat(self):
+        """
+        测试新客户端只收到之后写入的数据，空闲时发送心跳
+        """
+        stream = self.controller.stream_events()
+        next(stream)
+        self.assertEqual(next(stream), ': heartbeat\n\n')
+        self.controller.save_data({'event': 'new'})
+        self.assertEqual(event_ids([next(stream)]), [4])
+        stream.close()
+
+    def test_slow_client_is_refilled_from_database(self):
+        """
+        测试慢客户端的队列溢出后从数据库补齐，不丢失也不重复
+        """
+        stream = self.controller.stream_events()
+        next(stream)
+        self.assertEqual(next(stream), ': heartbeat\n\n')
+        for index in range(6):
+            self.controller.save_data({'event': f'burst{index}'})
+        self.assertEqual(event_ids([next(stream) for _ in range(6)]), [4, 5, 6, 7, 8, 9])
+        self.assertEqual(next(stream), ': heartbeat\n\n')
+        stream.close()
+
+
+if __name__ == '__main__':
+    unittest.main()
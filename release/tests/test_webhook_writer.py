@@ -0,0 +1,145 @@
+"""
+webhook批量写入测试模块
+测试后台写入线程的分批提交、队列已满时的拒绝以及停止时的数据落盘
+"""
+import os
+import shutil
+import tempfile
+import threading
+import unittest
+
+from app.controllers.webhooks import WebhookController
+from app.infrastructure.database import DatabaseManager
+from app.infrastructure.webhook_writer import WebhookWriter
+
+
+class RecordingStorage:
+    """
+    记录每一批写入数据的假存储，可以在写入时阻塞
+    """
+
+    def __init__(self):
+        self.batches = []
+        self.release = threading.Event()
+        self.release.set()
+        self.entered = threading.Event()
+
+    def insert_webhook_batch(self, batch):
+        self.entered.set()
+        self.release.wait(5)
+        self.batches.append([item['event'] for item in batch])
+        return batch
+
+
+class TestWebhookWriter(unittest.TestCase):
+    """
+    批量写入器测试
+    """
+
+    def test_burst_is_written_in_batches(self):
+        """
+        测试突发数据按最大批量分批写入
+        """
+        storage = RecordingStorage()
+        storage.release.clear()
+        writer = WebhookWriter(storage, max_batch_size=4, max_delay=1, queue_size=100)
+        writer.start()
+        # 第一条数据让写入线程阻塞在数据库中，其余数据在队列中堆积
+        writer.submit({'event': 'e0'})
+        storage.entered.wait(5)
+        for index in range(1, 10):
+            self.assertTrue(writer.submit({'event': f'e{index}'}))
+        storage.release.set()
+        writer.flush()
+        writer.stop()
+
+        self.assertEqual([len(batch) for batch in storage.batches], [1, 4, 4, 1])
+        self.assertEqual(sum(storage.batches, []), [f'e{index}' for index in range(10)])
+        self.assertEqual(writer.stats()['written'], 10)
+        self.assertEqual(writer.stats()['batches'], 4)
+
+    def test_full_queue_rejects(self):
+        """
+        测试队列已满时拒绝新数据
+        """
+        storage = RecordingStorage()
+        storage.release.clear()
+        writer = WebhookWriter(storage, max_batch_size=1, queue_size=2, enqueue_timeout=0)
+        writer.start()
+        writer.submit({'event': 'e0'})
+        storage.entered.wait(5)
+        self.assertTrue(writer.submit({'event': 'e1'}))
+        self.assertTrue(writer.submit({'event': 'e2'}))
+        self.assertFalse(writer.submit({'event': 'e3'}))
+        self.assertEqual(writer.stats()['rejected'], 1)
+        storage.release.set()
+        writer.stop()
+        self.assertEqual(sum(storage.batches, []), ['e0', 'e1', 'e2'])
+
+    def test_stop_drains_queue(self):
+        """
+        测试停止时先写入队列中剩余的数据
+        """
+        storage = RecordingStorage()
+        writer = WebhookWriter(storage, max_batch_size=50, max_delay=10)
+        writer.start()
+        for index in range(5):
+            writer.submit({'event': f'e{index}'})
+        writer.stop()
+        self.assertEqual(sum(storage.batches, []), [f'e{index}' for index in range(5)])
+        self.assertFalse(writer.is_running)
+
+
+class TestWebhookControllerWriter(unittest.TestCase):
+    """
+    webhook控制器后台写入测试
+    """
+
+    def setUp(self):
+        """
+        测试前的设置
+        """
+        self.temp_dir = tempfile.mkdtemp()
+        self.controller = WebhookController(self.temp_dir, writer_options={'max_delay': 0.01})
+
+    def tearDown(self):
+        """
+        测试后的清理
+        """
+        self.controller.stop_writer()
+        shutil.rmtree(self.temp_dir)
+
+    def test_queued_payloads_reach_database(self):
+        """
+        测试写入线程运行时数据先入队，随后写入数据库
+        """
+        self.controller.start_writer()
+        result = self.controller.save_data({'event': 'pickup', 'result': 'ok', 'message': '拾取'})
+        self.assertEqual(result, {'success': True, 'message': '数据已接收', 'queued': True})
+        self.assertFalse(self.controller.save_data({'result': 'ok'})['success'])
+        self.controller.writer.flush()
+
+        rows = self.controller.get_webhook_data(10)['data']
+        self.assertEqual([(row['event'], row['result'], row['message'], row['screenshot']) for row in rows],
+                         [('pickup', 'ok', '拾取', None)])
+
+    def test_synchronous_without_writer(self):
+        """
+        测试未启动写入线程时直接写入数据库
+        """
+        result = self.controller.save_data({'event': 'start'})
+        self.assertEqual(result, {'success': True, 'message': '数据保存成功'})
+        self.assertEqual(self.controller.get_webhook_data(10)['count'], 1)
+
+    def test_batch_insert_is_atomic(self):
+        """
+        测试批量写入失败时整批回滚
+        """
+        db_manager = DatabaseManager(os.path.join(self.temp_dir, 'CanLiangData.db'))
+        self.assertTrue(db_manager.save_webhook_batch([{'event': 'a'}, {'event': 'b', 'result': 'ok'}]))
+        self.assertFalse(db_manager.save_webhook_batch([{'event': 'c'}, {'event': None}]))
+        self.assertEqual(sorted(row['event'] for row in db_manager.get_webhook_data(10)), ['a', 'b'])
+
+
+if __name__ == '__main__':
+    unittest.main()